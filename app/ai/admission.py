@@ -0,0 +1,121 @@
+"""
+Admission control for Ollama generations.
+
+Limits how many generations run at once and keeps a bounded FIFO queue of
+waiting requests. Requests that cannot be admitted are rejected quickly
+with a Retry-After hint instead of piling onto the model.
+"""
+import asyncio
+import math
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Import central config
+try:
+    from app.config import config
+    from app.metrics import metrics
+except ImportError:
+    from config import config
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Request was not admitted; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded FIFO wait queue and a queue deadline"""
+
+    def __init__(self, max_concurrent: int = None, max_queue: int = None, queue_timeout: float = None):
+        self.max_concurrent = max(1, config.max_concurrent_generations if max_concurrent is None else max_concurrent)
+        self.max_queue = config.generation_queue_size if max_queue is None else max_queue
+        self.queue_timeout = config.generation_queue_timeout if queue_timeout is None else queue_timeout
+
+        self._in_flight = 0
+        self._waiters = deque()
+        # Running estimate of how long one generation holds a slot
+        self._avg_hold = 10.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new arrival"""
+        rounds = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(self._avg_hold * rounds))
+
+    def _publish(self):
+        metrics.set_gauge("generation_queue_depth", len(self._waiters))
+        metrics.set_gauge("generation_in_flight", self._in_flight)
+
+    async def acquire(self):
+        start = time.perf_counter()
+
+        if self._in_flight < self.max_concurrent and not self._waiters:
+            self._in_flight += 1
+            metrics.observe("generation_queue_wait", 0.0)
+            self._publish()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            metrics.incr("admission_rejected_queue_full")
+            raise AdmissionRejected(429, "Too many questions are waiting. Please try again shortly.", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            metrics.incr("admission_rejected_timeout")
+            raise AdmissionRejected(503, "The assistant is busy. Please try again shortly.", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away; hand on a slot we may have been given meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._publish()
+
+        metrics.observe("generation_queue_wait", time.perf_counter() - start)
+
+    def release(self):
+        # Hand the slot straight to the oldest live waiter (FIFO)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                self._publish()
+                return
+        self._in_flight = max(0, self._in_flight - 1)
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+            self.release()
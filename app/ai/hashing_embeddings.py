@@ -0,0 +1,41 @@
+"""
+Deterministic stand-in embeddings based on feature hashing.
+
+Used by the offline benchmarks and the fake Ollama server so retrieval can
+be exercised without a running model. It mirrors the embed_documents /
+embed_query interface of the langchain Ollama embeddings.
+"""
+import hashlib
+import math
+import re
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings:
+    """Signed feature hashing of word unigrams and bigrams, L2-normalized"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
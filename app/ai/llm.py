@@ -1,14 +1,19 @@
-import requests
 import json
 import re
 import logging
 import time
+from typing import Iterator
 
 # Import central config
 try:
     from app.config import config
+    from app.lazy_imports import lazy_import
 except ImportError:
     from config import config
+    from lazy_imports import lazy_import
+
+# Loaded with the first Ollama call, not at import
+requests = lazy_import("requests")
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -85,36 +90,10 @@ STRICT INSTRUCTIONS:
         if not context:
             return "I cannot find relevant information in the library documents."
 
-        # Truncate context if it's too long
-        max_context_length = 3000
-        if len(context) > max_context_length:
-            context = context[:max_context_length] + "... [truncated]"
-        
-        user_message = f"CONTEXT:\n{context}\n\nQUESTION:\n{prompt}"
-
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-
         try:
             logger.info(f"Sending request to Ollama ({self.model})...")
             
-            # Optimized parameters for speed
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": config.ollama_temperature,
-                    "num_ctx": 2048,  # Reduced from 4096
-                    "num_predict": 512,  # Reduced from 1024
-                    "top_k": 20,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1,
-                    "stop": ["\n\n", "Question:", "Context:", "Answer:"]
-                }
-            }
+            payload = self._build_payload(prompt, context, stream=False)
             
             start_time = time.time()
             
@@ -164,6 +143,84 @@ Quick fixes:
             logger.error(f"Unexpected error in OllamaClient: {e}")
             return f"Error: {str(e)[:200]}"
 
+    def _build_payload(self, prompt: str, context: str, stream: bool) -> dict:
+        """Build the /api/chat payload shared by blocking and streaming calls"""
+        # Truncate context if it's too long
+        max_context_length = 3000
+        if len(context) > max_context_length:
+            context = context[:max_context_length] + "... [truncated]"
+        
+        user_message = f"CONTEXT:\n{context}\n\nQUESTION:\n{prompt}"
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+        # Optimized parameters for speed
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": config.ollama_keep_alive,
+            "options": {
+                "temperature": config.ollama_temperature,
+                "num_ctx": 2048,  # Reduced from 4096
+                "num_predict": 512,  # Reduced from 1024
+                "top_k": 20,
+                "top_p": 0.9,
+                "repeat_penalty": 1.1,
+                "stop": ["\n\n", "Question:", "Context:", "Answer:"]
+            }
+        }
+
+    def stream_response(self, prompt: str, context: str = "") -> Iterator[str]:
+        """Yield the answer piece by piece as Ollama generates it"""
+        if not context:
+            yield "I cannot find relevant information in the library documents."
+            return
+
+        payload = self._build_payload(prompt, context, stream=True)
+        logger.info(f"Streaming request to Ollama ({self.model})...")
+        start_time = time.time()
+
+        try:
+            with requests.post(
+                f"{self.base_url}/api/chat",
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                if response.status_code == 404:
+                    yield f"Error: Model '{self.model}' not found. Please install it using: ollama pull {self.model}"
+                    return
+                if response.status_code != 200:
+                    logger.error(f"Ollama API Error {response.status_code}: {response.text[:200]}")
+                    yield f"Error: AI Service returned {response.status_code}. Please try again."
+                    return
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    piece = data.get("message", {}).get("content", "")
+                    if piece:
+                        yield piece
+                    if data.get("done"):
+                        break
+
+            logger.info(f"Ollama stream finished in {time.time() - start_time:.2f} seconds")
+
+        except requests.exceptions.Timeout:
+            logger.error(f"Ollama stream timed out after {self.timeout}s.")
+            yield f"\n[The model '{self.model}' is taking too long to respond.]"
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Connection error to {self.base_url}")
+            yield "Error: Cannot connect to Ollama. Please make sure Ollama is running ('ollama serve')."
+        except Exception as e:
+            logger.error(f"Unexpected error in OllamaClient stream: {e}")
+            yield f"Error: {str(e)[:200]}"
+
     def _clean_response(self, text: str) -> str:
         text = text.strip()
         patterns = [
@@ -0,0 +1,152 @@
+"""
+Dimensionality reduction of embeddings, fitted at ingest time.
+
+"pca" fits a faiss.PCAMatrix on the corpus embeddings. "matryoshka" keeps
+the leading dimensions and re-normalizes. Only use it with models trained
+for truncation, such as nomic-embed-text v1.5. The fitted projection is
+saved next to the index and applied to every query vector. The retained
+recall is reported when the projection is fitted: how many of each sample
+chunk's 10 nearest neighbours in full space are still its neighbours after
+reduction.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+# Import config
+try:
+    from app.config import config
+except ImportError:
+    from config import config
+
+logger = logging.getLogger(__name__)
+
+REDUCTION_METHODS = ("none", "pca", "matryoshka")
+_SETTINGS_FILE = "reduction.json"
+_PCA_FILE = "pca_matrix.bin"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype("float32")
+
+
+class Reducer:
+    """A fitted projection from input_dim to output_dim"""
+
+    def __init__(self, method: str, input_dim: int, output_dim: int, pca: Optional[faiss.PCAMatrix] = None):
+        self.method = method
+        self.input_dim = input_dim
+        self.output_dim = output_dim
+        self.pca = pca
+        self.retained_recall: Optional[float] = None
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if vectors.shape[1] != self.input_dim:
+            raise ValueError(f"Expected {self.input_dim}-d vectors, got {vectors.shape[1]}-d; "
+                             f"the embedding model no longer matches the index")
+        if self.method == "pca":
+            return self.pca.apply(vectors)
+        return _normalize(vectors[:, :self.output_dim])
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "input_dim": self.input_dim,
+            "output_dim": self.output_dim,
+            "retained_recall@10": self.retained_recall
+        }
+
+    def save(self, directory: Path):
+        if self.pca is not None:
+            faiss.write_VectorTransform(self.pca, str(directory / _PCA_FILE) + ".tmp")
+            os.replace(str(directory / _PCA_FILE) + ".tmp", directory / _PCA_FILE)
+        with open(directory / _SETTINGS_FILE, "w") as f:
+            json.dump(self.describe(), f)
+
+    @staticmethod
+    def remove(directory: Path):
+        for name in (_SETTINGS_FILE, _PCA_FILE):
+            if (directory / name).exists():
+                os.remove(directory / name)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["Reducer"]:
+        try:
+            with open(directory / _SETTINGS_FILE, "r") as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            return None
+        pca = None
+        if settings["method"] == "pca":
+            pca = faiss.read_VectorTransform(str(directory / _PCA_FILE))
+        reducer = cls(settings["method"], settings["input_dim"], settings["output_dim"], pca)
+        reducer.retained_recall = settings.get("retained_recall@10")
+        return reducer
+
+
+def fit_reducer(vectors: np.ndarray, method: Optional[str] = None,
+                target_dim: Optional[int] = None) -> Optional[Reducer]:
+    """Fit the configured reduction on corpus embeddings, or None when it does not apply"""
+    method = method or config.reduction_method
+    target_dim = target_dim or config.reduction_dim
+    if method not in REDUCTION_METHODS:
+        raise ValueError(f"Unknown reduction {method!r}, expected one of {', '.join(REDUCTION_METHODS)}")
+    count, dimension = vectors.shape
+    if method == "none" or target_dim >= dimension:
+        return None
+
+    if method == "pca":
+        if count <= target_dim:
+            logger.warning(f"⚠️  {count} chunks are too few to fit a {target_dim}-d PCA, keeping {dimension}-d")
+            return None
+        pca = faiss.PCAMatrix(dimension, target_dim)
+        pca.train(np.ascontiguousarray(vectors, dtype="float32"))
+        reducer = Reducer("pca", dimension, target_dim, pca)
+    else:
+        reducer = Reducer("matryoshka", dimension, target_dim)
+
+    reducer.retained_recall = retained_recall(vectors, reducer)
+    logger.info(f"📉 {method} {dimension}-d → {target_dim}-d retains recall@10 {reducer.retained_recall:.3f}")
+    return reducer
+
+
+def retained_recall(vectors: np.ndarray, reducer: Reducer, k: int = 10, samples: int = 200,
+                    seed: int = 5) -> float:
+    """Overlap of each sample's k nearest neighbours before and after reduction (self excluded)"""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    count = len(vectors)
+    k = min(k, count - 1)
+    if k < 1:
+        return 1.0
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(count, size=min(samples, count), replace=False)
+
+    def neighbours(space: np.ndarray) -> np.ndarray:
+        index = faiss.IndexFlatL2(space.shape[1])
+        index.add(space)
+        _, found = index.search(space[sample], k + 1)
+        return found
+
+    full = neighbours(vectors)
+    reduced = neighbours(reducer.apply(vectors))
+    overlaps = []
+    for row, query_id in enumerate(sample):
+        exact = [i for i in full[row] if i != query_id][:k]
+        approx = [i for i in reduced[row] if i != query_id][:k]
+        overlaps.append(len(set(exact) & set(approx)) / k)
+    return round(float(np.mean(overlaps)), 4)
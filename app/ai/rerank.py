@@ -0,0 +1,218 @@
+"""
+Second-stage reranking of vector search candidates under a CPU time budget.
+
+The cross-encoder is loaded by the warm-up path, never inside a request:
+until it is ready, requests use the lexical scorer. Cross-encoder batches
+are sized from the measured cost per pair, so that a batch does not start
+unless it is expected to finish within the remaining budget.
+"""
+import math
+import re
+import threading
+import time
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+
+# Import central config
+try:
+    from app.config import config
+    from app.utils import extract_key_query_terms
+    from app.metrics import metrics
+except ImportError:
+    from config import config
+    from utils import extract_key_query_terms
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+MAX_BATCH = 32
+# Margin on the measured per-pair cost when sizing a batch
+BATCH_HEADROOM = 1.25
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class RerankBudgetExceeded(Exception):
+    """Raised internally when scoring runs past the request budget"""
+
+
+class Reranker:
+    """
+    Rescores search candidates with a local cross-encoder when one is
+    configured, otherwise with a cheap lexical/feature scorer. If scoring
+    runs past the budget the original vector order is returned.
+    """
+
+    def __init__(self, model_name: str = None, budget_ms: int = None):
+        self.model_name = config.rerank_model if model_name is None else model_name
+        self.budget_ms = config.rerank_budget_ms if budget_ms is None else budget_ms
+        self._cross_encoder = None
+        self._cross_encoder_failed = False
+        self._load_lock = threading.Lock()
+        self._loading = False
+        # Seconds per (query, chunk) pair, measured at warm-up and updated after each batch
+        self._pair_seconds = None
+
+    def _get_cross_encoder(self):
+        """Load the optional cross-encoder once (warm-up path; blocks while loading)"""
+        if not self.model_name or self._cross_encoder_failed:
+            return None
+        with self._load_lock:
+            if self._cross_encoder is None and not self._cross_encoder_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._cross_encoder = CrossEncoder(self.model_name, device="cpu")
+                    logger.info(f"✅ Loaded rerank model: {self.model_name}")
+                except Exception as e:
+                    logger.warning(f"Rerank model unavailable, using lexical scorer: {e}")
+                    self._cross_encoder_failed = True
+        return self._cross_encoder
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Load the cross-encoder and measure its cost per pair"""
+        if not self.model_name:
+            return {"model": None, "ok": True, "method": "lexical"}
+        start = time.perf_counter()
+        encoder = self._get_cross_encoder()
+        if encoder is None:
+            return {"model": self.model_name, "ok": False, "method": "lexical"}
+        pairs = [("warm-up query", "warm-up passage about library opening hours")] * 4
+        predict_start = time.perf_counter()
+        encoder.predict(pairs)
+        self._observe_pair_cost(time.perf_counter() - predict_start, len(pairs))
+        return {"model": self.model_name, "ok": True, "method": "cross_encoder",
+                "elapsed_seconds": round(time.perf_counter() - start, 3),
+                "pair_ms": round(self._pair_seconds * 1000, 3)}
+
+    def _ready_cross_encoder(self):
+        """The cross-encoder if already loaded; otherwise start loading it off the request path"""
+        if self._cross_encoder is not None or not self.model_name or self._cross_encoder_failed:
+            return self._cross_encoder
+        # Never wait on _load_lock here: a warm-up may hold it for the whole load
+        if not self._loading:
+            self._loading = True
+            threading.Thread(target=self.warm_up, name="rerank-warmup", daemon=True).start()
+        return None
+
+    def _observe_pair_cost(self, elapsed: float, pairs: int):
+        cost = elapsed / max(1, pairs)
+        # Smoothed, but a slower batch raises the estimate at once
+        if self._pair_seconds is None or cost > self._pair_seconds:
+            self._pair_seconds = cost
+        else:
+            self._pair_seconds = 0.8 * self._pair_seconds + 0.2 * cost
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return the best top_k results and a small report of what happened"""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000.0
+        info = {"candidates": len(results), "method": "none", "fallback": False}
+
+        if len(results) <= 1:
+            return results[:top_k], info
+
+        try:
+            encoder = self._ready_cross_encoder()
+            if encoder is not None:
+                info["method"] = "cross_encoder"
+                scores = self._cross_encoder_scores(encoder, query, results, deadline)
+            else:
+                info["method"] = "lexical"
+                scores = self._lexical_scores(query, results, deadline)
+
+            order = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)
+            reranked = []
+            for i in order[:top_k]:
+                result = dict(results[i])
+                result["rerank_score"] = float(scores[i])
+                reranked.append(result)
+        except RerankBudgetExceeded:
+            info["fallback"] = True
+            metrics.incr("rerank_budget_exceeded")
+            reranked = results[:top_k]
+        except Exception as e:
+            logger.error(f"❌ Rerank failed, keeping vector order: {e}")
+            info["fallback"] = True
+            metrics.incr("rerank_errors")
+            reranked = results[:top_k]
+
+        elapsed = time.perf_counter() - start
+        metrics.observe("rerank_latency", elapsed)
+        info["latency_ms"] = round(elapsed * 1000, 2)
+        logger.info(f"🔀 Rerank ({info['method']}) {len(results)} → {len(reranked)} in {info['latency_ms']}ms"
+                    f"{' [fallback]' if info['fallback'] else ''}")
+        return reranked, info
+
+    def _cross_encoder_scores(self, encoder, query: str, results: List[Dict[str, Any]], deadline: float) -> List[float]:
+        scores = []
+        while len(scores) < len(results):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise RerankBudgetExceeded()
+            if self._pair_seconds is None:
+                batch_size = 1
+            else:
+                # Only as many pairs as are expected to finish before the deadline
+                batch_size = min(MAX_BATCH, int(remaining / (self._pair_seconds * BATCH_HEADROOM)))
+                if batch_size < 1:
+                    raise RerankBudgetExceeded()
+            batch = results[len(scores):len(scores) + batch_size]
+            pairs = [(query, r.get("content", "")) for r in batch]
+            batch_start = time.perf_counter()
+            scores.extend(float(s) for s in encoder.predict(pairs))
+            self._observe_pair_cost(time.perf_counter() - batch_start, len(pairs))
+        if time.perf_counter() > deadline:
+            raise RerankBudgetExceeded()
+        return scores
+
+    def _lexical_scores(self, query: str, results: List[Dict[str, Any]], deadline: float) -> List[float]:
+        """BM25 over the candidate set blended with key-term coverage and vector score"""
+        query_terms = set(_tokenize(query))
+        key_terms = extract_key_query_terms(query)
+        query_lower = query.lower().strip()
+
+        docs = []
+        doc_freq = Counter()
+        for result in results:
+            tokens = _tokenize(result.get("content", ""))
+            docs.append(tokens)
+            doc_freq.update(set(tokens) & query_terms)
+        if time.perf_counter() > deadline:
+            raise RerankBudgetExceeded()
+
+        n_docs = len(docs)
+        avg_len = (sum(len(d) for d in docs) / n_docs) or 1.0
+        k1, b = 1.2, 0.75
+
+        bm25 = []
+        coverage = []
+        phrase = []
+        for result, tokens in zip(results, docs):
+            if time.perf_counter() > deadline:
+                raise RerankBudgetExceeded()
+
+            tf = Counter(t for t in tokens if t in query_terms)
+            score = 0.0
+            for term, freq in tf.items():
+                idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * freq * (k1 + 1) / (freq + k1 * (1 - b + b * len(tokens) / avg_len))
+            bm25.append(score)
+
+            content_lower = result.get("content", "").lower()
+            hits = sum(1 for term in key_terms if term in content_lower)
+            coverage.append(hits / len(key_terms) if key_terms else 0.0)
+            phrase.append(1.0 if query_lower and query_lower in content_lower else 0.0)
+
+        max_bm25 = max(bm25) or 1.0
+        return [
+            0.45 * (bm25[i] / max_bm25)
+            + 0.25 * coverage[i]
+            + 0.10 * phrase[i]
+            + 0.20 * float(results[i].get("score", 0.0))
+            for i in range(n_docs)
+        ]
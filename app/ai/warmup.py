@@ -0,0 +1,144 @@
+"""
+Model warm-up and keep-alive for Ollama.
+
+Loads the configured chat and embedding models ahead of the first user,
+and pings them periodically so Ollama's idle unload never hits a student.
+The reranker's cross-encoder, if one is configured, is loaded here too.
+"""
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional
+
+# Import central config
+try:
+    from app.config import config
+    from app.metrics import metrics
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from config import config
+    from metrics import metrics
+    from lazy_imports import lazy_import
+
+# Imported by the warm-up thread, off the startup path
+requests = lazy_import("requests")
+
+logger = logging.getLogger(__name__)
+
+# A load_duration above this means Ollama had to (re)load the model
+COLD_LOAD_SECONDS = 0.5
+
+
+class ModelWarmer:
+    """Warms models on demand and keeps them resident with a background ping"""
+
+    def __init__(self, reranker=None):
+        self.reranker = reranker
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_warmup: Dict[str, Any] = {}
+
+    def _record(self, kind: str, model: str, elapsed: float, load_duration_ns: int) -> Dict[str, Any]:
+        load_seconds = (load_duration_ns or 0) / 1e9
+        cold = load_seconds >= COLD_LOAD_SECONDS
+        if cold:
+            metrics.incr("model_cold_loads")
+            metrics.observe("model_load", load_seconds)
+            logger.warning(f"❄️  Cold load of {kind} model '{model}': loaded in {load_seconds:.2f}s "
+                           f"(request took {elapsed:.2f}s)")
+        else:
+            logger.info(f"🔥 {kind.capitalize()} model '{model}' is resident ({elapsed:.2f}s)")
+        return {"model": model, "ok": True, "cold": cold, "load_seconds": round(load_seconds, 3),
+                "elapsed_seconds": round(elapsed, 3)}
+
+    def warm_chat_model(self, model: str) -> Dict[str, Any]:
+        """An empty chat request makes Ollama load the model without generating"""
+        start = time.time()
+        try:
+            response = requests.post(
+                f"{config.ollama_base_url}/api/chat",
+                json={"model": model, "messages": [], "keep_alive": config.ollama_keep_alive},
+                timeout=config.ollama_timeout
+            )
+            if response.status_code != 200:
+                logger.warning(f"Warm-up of chat model '{model}' returned {response.status_code}")
+                return {"model": model, "ok": False, "error": f"HTTP {response.status_code}"}
+            return self._record("chat", model, time.time() - start, response.json().get("load_duration", 0))
+        except Exception as e:
+            logger.warning(f"Warm-up of chat model '{model}' failed: {e}")
+            return {"model": model, "ok": False, "error": str(e)}
+
+    def warm_embedding_model(self, model: str) -> Dict[str, Any]:
+        start = time.time()
+        try:
+            response = requests.post(
+                f"{config.ollama_base_url}/api/embed",
+                json={"model": model, "input": "warm-up", "keep_alive": config.ollama_keep_alive},
+                timeout=config.ollama_timeout
+            )
+            if response.status_code == 404 and "model" not in response.text.lower():
+                # Older Ollama without /api/embed
+                response = requests.post(
+                    f"{config.ollama_base_url}/api/embeddings",
+                    json={"model": model, "prompt": "warm-up", "keep_alive": config.ollama_keep_alive},
+                    timeout=config.ollama_timeout
+                )
+            if response.status_code != 200:
+                logger.warning(f"Warm-up of embedding model '{model}' returned {response.status_code}")
+                return {"model": model, "ok": False, "error": f"HTTP {response.status_code}"}
+            return self._record("embedding", model, time.time() - start, response.json().get("load_duration", 0))
+        except Exception as e:
+            logger.warning(f"Warm-up of embedding model '{model}' failed: {e}")
+            return {"model": model, "ok": False, "error": str(e)}
+
+    def warm_up(self, chat_model: str = None, embedding_model: str = None) -> Dict[str, Any]:
+        """Warm the given models, defaulting to the configured pair"""
+        chat_model = chat_model or config.chat_model
+        embedding_model = embedding_model or config.embedding_model
+        result = {
+            "chat": self.warm_chat_model(chat_model),
+            "embedding": self.warm_embedding_model(embedding_model),
+            "timestamp": time.time()
+        }
+        if self.reranker is not None and config.rerank_enabled:
+            result["rerank"] = self.warm_rerank_model()
+        self.last_warmup = result
+        return result
+
+    def warm_rerank_model(self) -> Dict[str, Any]:
+        try:
+            return self.reranker.warm_up()
+        except Exception as e:
+            logger.warning(f"Warm-up of rerank model failed: {e}")
+            return {"model": self.reranker.model_name, "ok": False, "error": str(e)}
+
+    def warm_up_in_background(self, chat_model: str = None, embedding_model: str = None):
+        threading.Thread(
+            target=self.warm_up,
+            kwargs={"chat_model": chat_model, "embedding_model": embedding_model},
+            name="model-warmup",
+            daemon=True
+        ).start()
+
+    def _keepalive_loop(self):
+        interval = config.keepalive_interval
+        while not self._stop.wait(interval):
+            self.warm_up()
+
+    def start(self):
+        """Warm up now (if enabled) and start the periodic keep-alive ping"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            if config.warmup_on_startup:
+                self.warm_up()
+            if config.keepalive_interval > 0:
+                self._keepalive_loop()
+
+        self._thread = threading.Thread(target=run, name="model-keepalive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
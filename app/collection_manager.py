@@ -0,0 +1,188 @@
+"""
+Named document collections, each with its own index directory.
+
+The default collection is the vector store in vector_store/ that the rest of
+the app already uses. Other collections live in collections_dir/<name>/, are
+loaded on their first query and are evicted least-recently-used first once
+the loaded ones exceed the configured memory budget.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Import config
+try:
+    from app.config import config
+    from app.shared_state import shared_state, INDEX_VERSION
+    from app.utils import VectorStore
+except ImportError:
+    from config import config
+    from shared_state import shared_state, INDEX_VERSION
+    from utils import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class UnknownCollection(KeyError):
+    """Raised for a collection name with no directory on disk"""
+
+
+def collection_version_key(name: str) -> str:
+    return INDEX_VERSION if name == DEFAULT_COLLECTION else f"{INDEX_VERSION}:{name}"
+
+
+class CollectionManager:
+    """Lazy, memory-bounded access to named vector stores"""
+
+    def __init__(self, default_store: VectorStore, root: Optional[Path] = None,
+                 memory_budget_mb: Optional[int] = None, track_shared_versions: bool = False,
+                 store_factory: Callable[..., VectorStore] = VectorStore):
+        self.default_store = default_store
+        self.root = Path(root) if root else config.collections_dir
+        self.memory_budget_mb = config.collections_memory_mb if memory_budget_mb is None else memory_budget_mb
+        self.track_shared_versions = track_shared_versions
+        self.store_factory = store_factory
+        self._stores: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def resolve(name: Optional[str]) -> str:
+        name = (name or DEFAULT_COLLECTION).strip().lower()
+        if not _NAME_RE.match(name):
+            raise UnknownCollection(name)
+        return name
+
+    def collection_path(self, name: str) -> Path:
+        return self.default_store.path if name == DEFAULT_COLLECTION else self.root / name
+
+    def names(self) -> List[str]:
+        found = []
+        if self.root.exists():
+            found = sorted(p.name for p in self.root.iterdir() if p.is_dir() and _NAME_RE.match(p.name))
+        return [DEFAULT_COLLECTION] + [n for n in found if n != DEFAULT_COLLECTION]
+
+    def exists(self, name: Optional[str]) -> bool:
+        try:
+            name = self.resolve(name)
+        except UnknownCollection:
+            return False
+        return name == DEFAULT_COLLECTION or self.collection_path(name).is_dir()
+
+    def peek(self, name: Optional[str] = None) -> Optional[VectorStore]:
+        """The store if it is already in memory, without loading or touching LRU order"""
+        name = self.resolve(name)
+        if name == DEFAULT_COLLECTION:
+            return self.default_store
+        with self._lock:
+            return self._stores.get(name)
+
+    def get(self, name: Optional[str] = None) -> VectorStore:
+        """The store for a collection, loading it on first use (blocking; call off the event loop)"""
+        name = self.resolve(name)
+        if name == DEFAULT_COLLECTION:
+            return self.default_store
+
+        with self._lock:
+            store = self._stores.get(name)
+            if store is not None:
+                self._stores.move_to_end(name)
+                self._last_used[name] = time.time()
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        if store is not None:
+            if self.track_shared_versions and self._is_stale(store):
+                with load_lock:
+                    if self._is_stale(store):
+                        store.load()
+                        logger.info(f"🔄 Reloaded collection {name} version {store.shared_version}")
+            return store
+
+        with load_lock:
+            # Another request may have loaded it while this one waited
+            with self._lock:
+                store = self._stores.get(name)
+            if store is not None:
+                return store
+
+            path = self.collection_path(name)
+            if not path.is_dir():
+                raise UnknownCollection(name)
+            start = time.perf_counter()
+            store = self.store_factory(path=path, version_key=collection_version_key(name))
+            store.load()
+            self.loads += 1
+            logger.info(f"📚 Loaded collection {name} ({len(store.chunks)} chunks, "
+                        f"{store.memory_bytes() / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+
+            with self._lock:
+                self._stores[name] = store
+                self._last_used[name] = time.time()
+            self._evict_over_budget(keep=name)
+        return store
+
+    def _is_stale(self, store: VectorStore) -> bool:
+        try:
+            return shared_state.get(store.version_key, 0) != store.shared_version
+        except Exception as e:
+            logger.warning(f"Could not read shared version for {store.path}: {e}")
+            return False
+
+    def _evict_over_budget(self, keep: str):
+        budget = self.memory_budget_mb * 1024 * 1024
+        with self._lock:
+            total = sum(store.memory_bytes() for store in self._stores.values())
+            for name in list(self._stores):
+                if total <= budget:
+                    break
+                if name == keep:
+                    continue
+                total -= self._stores[name].memory_bytes()
+                self._drop(name)
+                logger.info(f"♻️  Evicted collection {name} (memory budget {self.memory_budget_mb} MB)")
+
+    def _drop(self, name: str):
+        # In-flight searches hold their own references to the index
+        self._stores.pop(name, None)
+        self._last_used.pop(name, None)
+        self.evictions += 1
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if name not in self._stores:
+                return False
+            self._drop(name)
+            return True
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = {name: store for name, store in self._stores.items()}
+            last_used = dict(self._last_used)
+        collections = []
+        for name in self.names():
+            store = self.default_store if name == DEFAULT_COLLECTION else loaded.get(name)
+            collections.append({
+                "name": name,
+                "path": str(self.collection_path(name)),
+                "loaded": bool(store and store.loaded),
+                "chunks": len(store.chunks) if store and store.loaded else None,
+                "memory_mb": round(store.memory_bytes() / 1e6, 1) if store else 0.0,
+                "last_used": last_used.get(name)
+            })
+        return {
+            "collections": collections,
+            "memory_budget_mb": self.memory_budget_mb,
+            "loaded_mb": round(sum(s.memory_bytes() for s in loaded.values()) / 1e6, 1),
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
@@ -20,7 +20,13 @@ class Config:
             # CHANGED: Default to all-minilm for CPU stability
             "embedding_model": "all-minilm:latest", 
             "timeout": 300, # Increased timeout
-            "temperature": 0.1
+            "temperature": 0.1,
+            "max_concurrent_generations": 1,
+            "generation_queue_size": 8,
+            "generation_queue_timeout": 60,
+            "keep_alive": 1800,  # Seconds Ollama keeps a model loaded after a call
+            "warmup_on_startup": True,
+            "keepalive_interval": 240  # Seconds between keep-alive pings, 0 disables
         },
         
         # Vector store settings
@@ -28,7 +34,32 @@ class Config:
             "path": "vector_store",
             "chunk_size": 800,
             "chunk_overlap": 100,
-            "batch_size": 5 # Reduced batch size for stability
+            "batch_size": 5, # Reduced batch size for stability
+            "mmap_index": True,  # Map the index file read-only so workers share its pages
+            "collections_dir": "collections",  # One sub-directory per named collection
+            "collections_memory_mb": 1024,  # Loaded collections beyond this are evicted (LRU)
+            "index_type": "flat",  # flat (float32), sq8 (1 byte/dim) or pq (pq_m codes of pq_nbits)
+            "pq_m": 64,
+            "pq_nbits": 8,
+            "rescore": True,  # Re-rank compressed-index candidates with exact distances
+            "rescore_factor": 4,  # Candidates fetched per requested result when re-scoring
+            "reduction": "none",  # none, pca, or matryoshka (only for models trained for truncation)
+            "reduction_dim": 256,  # Target dimension when reducing
+            "shard_max_chunks": 20000,  # Chunks per shard; sources are packed together up to this size
+            "search_threads": 4  # Shards searched in parallel per query
+        },
+        
+        # Ingestion settings
+        "ingestion": {
+            "dedup_enabled": True,
+            "dedup_threshold": 0.85,  # Estimated Jaccard similarity
+            "dedup_num_perm": 64,
+            "dedup_shingle_size": 3,
+            "auto_ingest_uploads": True,  # Index changed uploads incrementally
+            "watch_pdfs_dir": True,  # Pick up PDFs copied into pdfs_dir directly
+            "watch_debounce": 2.0,  # Seconds a file must be quiet before ingesting
+            "watch_poll_interval": 5.0,  # Used when watchdog is not installed
+            "extract_cache": True  # Reuse extracted page text of unchanged PDFs
         },
         
         # File paths
@@ -42,13 +73,29 @@ class Config:
         # Server settings
         "server": {
             "host": "0.0.0.0",
-            "port": 8000
+            "port": 8000,
+            "workers": 1,
+            "ready_retry_after": 2,  # Retry-After seconds on 503s while the index loads
+            "import_budget_ms": 1500  # Cold `import app.main` limit checked by test_import_budget.py
         },
         
         # Search settings
         "search": {
             "default_k": 5,
-            "max_context_length": 3000
+            "max_context_length": 3000,
+            "rerank_enabled": False,
+            "rerank_candidates": 30,
+            "rerank_budget_ms": 150,
+            "rerank_model": ""  # Empty uses the built-in lexical scorer
+        },
+        
+        # Background task settings
+        "tasks": {
+            "persist": True,  # Keep task progress in the shared SQLite store
+            "persist_interval": 1.0,  # Min seconds between stored progress updates per task
+            "max_completed": 50,
+            "max_logs": 100,
+            "events_heartbeat": 15  # Seconds between SSE keep-alive comments
         },
         
         # Application settings
@@ -60,6 +107,8 @@ class Config:
     }
     
     def __init__(self, config_file: Optional[str] = None):
+        # LIBRARY_AI_CONFIG lets test harnesses point the app at another config file
+        config_file = config_file or os.environ.get("LIBRARY_AI_CONFIG")
         self._config_file = Path(config_file) if config_file else Path("config.json")
         self.config = self._load_config()
         self._ensure_directories()
@@ -111,6 +160,18 @@ class Config:
     @property
     def ollama_temperature(self) -> float: return self.config["ollama"]["temperature"]
     @property
+    def max_concurrent_generations(self) -> int: return self.config["ollama"]["max_concurrent_generations"]
+    @property
+    def generation_queue_size(self) -> int: return self.config["ollama"]["generation_queue_size"]
+    @property
+    def generation_queue_timeout(self) -> float: return self.config["ollama"]["generation_queue_timeout"]
+    @property
+    def ollama_keep_alive(self) -> int: return self.config["ollama"]["keep_alive"]
+    @property
+    def warmup_on_startup(self) -> bool: return self.config["ollama"]["warmup_on_startup"]
+    @property
+    def keepalive_interval(self) -> int: return self.config["ollama"]["keepalive_interval"]
+    @property
     def pdfs_dir(self) -> Path: return Path(self.config["paths"]["pdfs_dir"])
     @property
     def data_dir(self) -> Path: return Path(self.config["paths"]["data_dir"])
@@ -125,14 +186,86 @@ class Config:
     @property
     def batch_size(self) -> int: return self.config["vector_store"]["batch_size"]
     @property
+    def mmap_index(self) -> bool: return self.config["vector_store"]["mmap_index"]
+    @property
+    def collections_dir(self) -> Path: return Path(self.config["vector_store"]["collections_dir"])
+    @property
+    def collections_memory_mb(self) -> int: return self.config["vector_store"]["collections_memory_mb"]
+    @property
+    def index_type(self) -> str: return self.config["vector_store"]["index_type"]
+    @property
+    def pq_m(self) -> int: return self.config["vector_store"]["pq_m"]
+    @property
+    def pq_nbits(self) -> int: return self.config["vector_store"]["pq_nbits"]
+    @property
+    def rescore_enabled(self) -> bool: return self.config["vector_store"]["rescore"]
+    @property
+    def rescore_factor(self) -> int: return self.config["vector_store"]["rescore_factor"]
+    @property
+    def reduction_method(self) -> str: return self.config["vector_store"]["reduction"]
+    @property
+    def reduction_dim(self) -> int: return self.config["vector_store"]["reduction_dim"]
+    @property
+    def shard_max_chunks(self) -> int: return self.config["vector_store"]["shard_max_chunks"]
+    @property
+    def search_threads(self) -> int: return self.config["vector_store"]["search_threads"]
+    @property
+    def dedup_enabled(self) -> bool: return self.config["ingestion"]["dedup_enabled"]
+    @property
+    def dedup_threshold(self) -> float: return self.config["ingestion"]["dedup_threshold"]
+    @property
+    def dedup_num_perm(self) -> int: return self.config["ingestion"]["dedup_num_perm"]
+    @property
+    def dedup_shingle_size(self) -> int: return self.config["ingestion"]["dedup_shingle_size"]
+    @property
+    def auto_ingest_uploads(self) -> bool: return self.config["ingestion"]["auto_ingest_uploads"]
+    @property
+    def watch_pdfs_dir(self) -> bool: return self.config["ingestion"]["watch_pdfs_dir"]
+    @property
+    def watch_debounce(self) -> float: return self.config["ingestion"]["watch_debounce"]
+    @property
+    def watch_poll_interval(self) -> float: return self.config["ingestion"]["watch_poll_interval"]
+    @property
+    def extract_cache_enabled(self) -> bool: return self.config["ingestion"]["extract_cache"]
+    @property
     def search_default_k(self) -> int: return self.config["search"]["default_k"]
     @property
     def max_context_length(self) -> int: return self.config["search"]["max_context_length"]
     @property
+    def rerank_enabled(self) -> bool: return self.config["search"]["rerank_enabled"]
+    @property
+    def rerank_candidates(self) -> int: return self.config["search"]["rerank_candidates"]
+    @property
+    def rerank_budget_ms(self) -> int: return self.config["search"]["rerank_budget_ms"]
+    @property
+    def rerank_model(self) -> str: return self.config["search"]["rerank_model"]
+    @property
     def server_host(self) -> str: return self.config["server"]["host"]
     @property
     def server_port(self) -> int: return self.config["server"]["port"]
     @property
+    def server_workers(self) -> int:
+        # run.py --workers exports LIBRARY_AI_WORKERS so every worker process agrees
+        return int(os.environ.get("LIBRARY_AI_WORKERS", self.config["server"]["workers"]))
+    @property
+    def ready_retry_after(self) -> int: return self.config["server"]["ready_retry_after"]
+    @property
+    def import_budget_ms(self) -> int: return self.config["server"]["import_budget_ms"]
+    @property
+    def shared_state_path(self) -> Path: return self.data_dir / "shared_state.db"
+    @property
+    def extract_cache_path(self) -> Path: return self.data_dir / "extract_cache.db"
+    @property
+    def task_persist(self) -> bool: return self.config["tasks"]["persist"]
+    @property
+    def task_persist_interval(self) -> float: return self.config["tasks"]["persist_interval"]
+    @property
+    def task_max_completed(self) -> int: return self.config["tasks"]["max_completed"]
+    @property
+    def task_max_logs(self) -> int: return self.config["tasks"]["max_logs"]
+    @property
+    def task_events_heartbeat(self) -> float: return self.config["tasks"]["events_heartbeat"]
+    @property
     def app_name(self) -> str: return self.config["app"]["name"]
     @property
     def app_version(self) -> str: return self.config["app"]["version"]
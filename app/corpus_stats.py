@@ -0,0 +1,138 @@
+"""
+Corpus statistics for the vector store.
+
+Computed once at ingestion and kept up to date as chunks are added or
+removed, so the dashboard reads counters instead of rescanning every chunk.
+The counters are persisted in the index manifest next to the FAISS index.
+"""
+import re
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+# Keywords the dashboard has always reported (substring match, case-insensitive)
+TRACKED_KEYWORDS = ['myloft', 'library', 'borrowing', 'e-resources', 'plagiarism']
+
+# Upper bounds (characters) of the chunk length histogram buckets
+LENGTH_BUCKETS = [250, 500, 1000, 2000, 4000]
+
+_TERM_RE = re.compile(r"[a-z0-9][a-z0-9'-]+")
+_PROCEDURE_RE = re.compile(r'\b(step|procedure|how to|instructions?)\b', re.I)
+_CRITICAL_RE = re.compile(r'past exam|exam paper|critical|important', re.I)
+
+
+def _bucket_label(length: int) -> str:
+    lower = 0
+    for upper in LENGTH_BUCKETS:
+        if length < upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f"{lower}+"
+
+
+def chunk_flags(text: str, metadata: Dict[str, Any]) -> Tuple[bool, bool]:
+    """(is_procedure, is_critical); older ingest scripts store the flags, otherwise apply the same patterns"""
+    is_procedure = metadata.get('is_procedure')
+    if is_procedure is None:
+        is_procedure = bool(_PROCEDURE_RE.search(text))
+    is_critical = metadata.get('is_critical')
+    if is_critical is None:
+        is_critical = bool(_CRITICAL_RE.search(text))
+    return bool(is_procedure), bool(is_critical)
+
+
+class CorpusStats:
+    """Counters that can be updated one chunk at a time in either direction"""
+
+    def __init__(self):
+        self.total_chunks = 0
+        self.total_chars = 0
+        self.keyword_counts = Counter({k: 0 for k in TRACKED_KEYWORDS})
+        self.term_df = Counter()
+        self.source_counts = Counter()
+        self.length_histogram = Counter()
+        self.procedure_chunks = 0
+        self.critical_chunks = 0
+
+    @classmethod
+    def from_chunks(cls, chunks: List[str], metadata: List[Dict[str, Any]]) -> "CorpusStats":
+        stats = cls()
+        for i, text in enumerate(chunks):
+            stats.add(text, metadata[i] if i < len(metadata) else {})
+        return stats
+
+    def add(self, text: str, metadata: Dict[str, Any] = None):
+        self._apply(text, metadata or {}, 1)
+
+    def remove(self, text: str, metadata: Dict[str, Any] = None):
+        self._apply(text, metadata or {}, -1)
+
+    def _apply(self, text: str, metadata: Dict[str, Any], sign: int):
+        lowered = text.lower()
+        self.total_chunks += sign
+        self.total_chars += sign * len(text)
+
+        for keyword in TRACKED_KEYWORDS:
+            if keyword in lowered:
+                self.keyword_counts[keyword] += sign
+
+        for term in set(_TERM_RE.findall(lowered)):
+            self._bump(self.term_df, term, sign)
+
+        self._bump(self.source_counts, metadata.get('source', 'unknown'), sign)
+        self._bump(self.length_histogram, _bucket_label(len(text)), sign)
+
+        is_procedure, is_critical = chunk_flags(text, metadata)
+        self.procedure_chunks += sign * int(is_procedure)
+        self.critical_chunks += sign * int(is_critical)
+
+    @staticmethod
+    def _bump(counter: Counter, key: str, sign: int):
+        counter[key] += sign
+        # Drop an entry once it reaches zero so removed sources and terms do not linger
+        if sign < 0 and counter[key] <= 0:
+            del counter[key]
+
+    def document_frequency(self, term: str) -> int:
+        return self.term_df.get(term.lower(), 0)
+
+    def summary(self, top_terms: int = 20) -> Dict[str, Any]:
+        """Dashboard view of the counters"""
+        return {
+            "total_chunks": self.total_chunks,
+            "avg_chunk_length": round(self.total_chars / self.total_chunks, 1) if self.total_chunks else 0,
+            "keyword_counts": dict(self.keyword_counts),
+            "source_counts": dict(self.source_counts.most_common()),
+            "length_histogram": {
+                label: self.length_histogram.get(label, 0)
+                for label in [_bucket_label(b - 1) for b in LENGTH_BUCKETS] + [f"{LENGTH_BUCKETS[-1]}+"]
+            },
+            "procedure_chunks": self.procedure_chunks,
+            "critical_chunks": self.critical_chunks,
+            "vocabulary_size": len(self.term_df),
+            "top_terms": dict(self.term_df.most_common(top_terms))
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_chunks": self.total_chunks,
+            "total_chars": self.total_chars,
+            "keyword_counts": dict(self.keyword_counts),
+            "term_df": dict(self.term_df),
+            "source_counts": dict(self.source_counts),
+            "length_histogram": dict(self.length_histogram),
+            "procedure_chunks": self.procedure_chunks,
+            "critical_chunks": self.critical_chunks
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusStats":
+        stats = cls()
+        stats.total_chunks = data.get("total_chunks", 0)
+        stats.total_chars = data.get("total_chars", 0)
+        stats.keyword_counts.update(data.get("keyword_counts", {}))
+        stats.term_df = Counter(data.get("term_df", {}))
+        stats.source_counts = Counter(data.get("source_counts", {}))
+        stats.length_histogram = Counter(data.get("length_histogram", {}))
+        stats.procedure_chunks = data.get("procedure_chunks", 0)
+        stats.critical_chunks = data.get("critical_chunks", 0)
+        return stats
@@ -0,0 +1,148 @@
+"""
+Metadata filters evaluated inside the FAISS scan.
+
+Per-field bitmaps (one bool per chunk position) are built when the index is
+loaded: one per source, one per boolean flag, and a page-number column for
+range checks. A filter combines them into a single mask, which is packed
+into a faiss.IDSelectorBitmap so the index only scores matching vectors,
+and top-k is never spent on chunks the caller excluded.
+
+Filter spec (all keys optional, combined with AND):
+    {"source": "guide.pdf" | ["a.pdf", "b.pdf"],
+     "page": 3 | [min, max] | {"min": 1, "max": 10},
+     "is_procedure": true, "is_critical": false}
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+try:
+    from app.corpus_stats import chunk_flags
+except ImportError:
+    from corpus_stats import chunk_flags
+
+FLAG_FIELDS = ("is_procedure", "is_critical")
+FILTER_FIELDS = ("source", "page") + FLAG_FIELDS
+
+
+class FilterError(ValueError):
+    """A filter spec that cannot be applied"""
+
+
+def _as_int(value: Any, field: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise FilterError(f"{field} must be an integer, got {value!r}")
+
+
+def _as_bool(value: Any, field: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "1", "yes", "false", "0", "no"):
+        return value.lower() in ("true", "1", "yes")
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise FilterError(f"{field} must be true or false, got {value!r}")
+
+
+def parse_filters(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Validate and normalize a filter spec; None or {} means no filtering"""
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise FilterError("filters must be an object")
+    unknown = set(raw) - set(FILTER_FIELDS)
+    if unknown:
+        raise FilterError(f"Unknown filter fields: {', '.join(sorted(unknown))}")
+
+    spec: Dict[str, Any] = {}
+    if raw.get("source") is not None:
+        sources = raw["source"]
+        sources = [sources] if isinstance(sources, str) else list(sources)
+        if not sources or not all(isinstance(s, str) for s in sources):
+            raise FilterError("source must be a file name or a list of file names")
+        spec["source"] = sorted(set(sources))
+
+    if raw.get("page") is not None:
+        page = raw["page"]
+        if isinstance(page, dict):
+            low, high = page.get("min"), page.get("max")
+        elif isinstance(page, (list, tuple)) and len(page) == 2:
+            low, high = page
+        else:
+            low = high = page
+        low = _as_int(low, "page min") if low is not None else None
+        high = _as_int(high, "page max") if high is not None else None
+        if low is not None and high is not None and low > high:
+            raise FilterError(f"page range is empty ({low} > {high})")
+        spec["page"] = [low, high]
+
+    for field in FLAG_FIELDS:
+        if raw.get(field) is not None:
+            spec[field] = _as_bool(raw[field], field)
+
+    return spec or None
+
+
+class MetadataBitmaps:
+    """Column-wise view of chunk metadata for fast mask building"""
+
+    def __init__(self, chunks: List[str], metadata: List[Dict[str, Any]]):
+        self.size = len(chunks)
+        source_positions: Dict[str, List[int]] = {}
+        self.pages = np.full(self.size, -1, dtype=np.int32)
+        self.flags = {field: np.zeros(self.size, dtype=bool) for field in FLAG_FIELDS}
+
+        for i, text in enumerate(chunks):
+            meta = metadata[i] if i < len(metadata) else {}
+            source_positions.setdefault(meta.get("source", "unknown"), []).append(i)
+            page = meta.get("page")
+            if isinstance(page, int):
+                self.pages[i] = page
+            is_procedure, is_critical = chunk_flags(text, meta)
+            self.flags["is_procedure"][i] = is_procedure
+            self.flags["is_critical"][i] = is_critical
+
+        self.sources: Dict[str, np.ndarray] = {}
+        for source, positions in source_positions.items():
+            bitmap = np.zeros(self.size, dtype=bool)
+            bitmap[positions] = True
+            self.sources[source] = bitmap
+
+    def mask(self, spec: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        if "source" in spec:
+            wanted = np.zeros(self.size, dtype=bool)
+            for source in spec["source"]:
+                bitmap = self.sources.get(source)
+                if bitmap is not None:
+                    wanted |= bitmap
+            mask &= wanted
+        if "page" in spec:
+            low, high = spec["page"]
+            mask &= self.pages >= (low if low is not None else 0)
+            if high is not None:
+                mask &= self.pages <= high
+        for field in FLAG_FIELDS:
+            if field in spec:
+                mask &= self.flags[field] if spec[field] else ~self.flags[field]
+        return mask
+
+
+class IndexFilter:
+    """A packed mask as FAISS search parameters; keeps the bit buffer alive during the search"""
+
+    def __init__(self, mask: np.ndarray):
+        self.matches = int(mask.sum())
+        self._bits = np.packbits(mask, bitorder="little")
+        self.selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(self._bits))
+        self.params = faiss.SearchParameters(sel=self.selector)
@@ -0,0 +1,151 @@
+"""
+Incremental ingestion of individual PDFs.
+
+Changed files are queued by name and handled by one background thread:
+the new version is extracted and chunked with the same helpers as
+ingest.py, only its chunks are embedded, and they replace the file's old
+chunks in a single swap. Repeated events for the same file collapse into one.
+
+The upload manifest lists the content the index holds, so a file's hash is
+recorded (or its entry removed) only after its ingest has been saved. A
+failed ingest is therefore retried by the next upload or watcher scan.
+"""
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Import config
+try:
+    from app.config import config
+    from app.uploads import hash_file
+except ImportError:
+    from config import config
+    from uploads import hash_file
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+REMOVE = "remove"
+
+
+class IngestQueue:
+    """Single-consumer queue of per-file index updates"""
+
+    def __init__(self, vector_store, pdfs_dir: Optional[Path] = None,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None, manifest=None):
+        self.vector_store = vector_store
+        self.pdfs_dir = Path(pdfs_dir) if pdfs_dir else config.pdfs_dir
+        self.on_progress = on_progress
+        # Upload manifest (app.uploads.FileManifest), updated once an ingest is saved
+        self.manifest = manifest
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.current: Optional[str] = None
+        self.processed = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    def enqueue(self, filename: str, action: str = UPSERT):
+        """Queue a file; a later action for the same file replaces a pending one"""
+        with self._lock:
+            already_queued = filename in self._pending
+            self._pending[filename] = action
+            self._ensure_worker()
+        if not already_queued:
+            self._queue.put(filename)
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ingest-queue", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = dict(self._pending)
+        return {
+            "pending": pending,
+            "current": self.current,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_error": self.last_error
+        }
+
+    def _run(self):
+        while True:
+            filename = self._queue.get()
+            with self._lock:
+                action = self._pending.pop(filename, None)
+            if action is None:
+                continue
+
+            self.current = filename
+            start = time.perf_counter()
+            try:
+                result = self._apply(filename, action)
+                self.processed += 1
+                result["seconds"] = round(time.perf_counter() - start, 2)
+                logger.info(f"📥 Incremental ingest {action} {filename}: {result}")
+                self._report(dict(result, file=filename, action=action, status="completed"))
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"{filename}: {e}"
+                logger.error(f"❌ Incremental ingest of {filename} failed: {e}")
+                self._report({"file": filename, "action": action, "status": "failed", "error": str(e)})
+            finally:
+                self.current = None
+
+    def _report(self, event: Dict[str, Any]):
+        if self.on_progress:
+            try:
+                self.on_progress(event)
+            except Exception as e:
+                logger.warning(f"Ingest progress callback failed: {e}")
+
+    def _apply(self, filename: str, action: str) -> Dict[str, Any]:
+        path = self.pdfs_dir / filename
+        chunks = []
+        sha256 = None
+        if action == UPSERT and path.exists():
+            # Hashed before extracting: a copy landing meanwhile gets a new hash and a new ingest
+            sha256, size = hash_file(path), path.stat().st_size
+            if self._already_indexed(filename, sha256):
+                return {"removed_chunks": 0, "added_chunks": 0, "unchanged": True}
+            chunks = self._extract(filename)
+
+        # Other workers may have saved since this one loaded; the lock reloads first
+        with self.vector_store.exclusive_update():
+            # Old and new chunks swap in one step, so searches never see the file missing
+            removed, added = self.vector_store.replace_source(
+                filename, [c['content'] for c in chunks], chunks, persist=False)
+
+            if removed or added:
+                self.vector_store.save()
+
+        if self.manifest is not None:
+            if sha256:
+                self.manifest.record(filename, sha256, size)
+            else:
+                self.manifest.remove(filename)
+        return {"removed_chunks": removed, "added_chunks": added}
+
+    def _already_indexed(self, filename: str, sha256: str) -> bool:
+        """Same content as the manifest records, and the index still holds the file"""
+        entry = self.manifest.get(filename) if self.manifest is not None else None
+        if not entry or entry["sha256"] != sha256:
+            return False
+        return any(meta.get('source') == filename for meta in self.vector_store.metadata)
+
+    def _extract(self, filename: str) -> List[Dict[str, Any]]:
+        # ingest.py lives in the project root and pulls in PyPDF2; import on first use
+        import ingest
+        from app.pdf.dedup import deduplicate_chunks
+
+        chunks = ingest.extract_pdf_chunks(self.pdfs_dir / filename, filename)
+        if chunks and config.dedup_enabled:
+            chunks, _ = deduplicate_chunks(chunks)
+        return chunks
@@ -0,0 +1,45 @@
+"""
+Deferred imports of heavy dependencies.
+
+faiss, numpy, requests and psutil together add a few hundred milliseconds
+to every process that imports app.main, including CLIs that never search.
+`faiss = lazy_import("faiss")` stands in for `import faiss`: the module is
+imported on the first attribute access, and each attribute is cached on the
+proxy after that, so later lookups cost what a normal module lookup costs.
+Modules that annotate with these types use `from __future__ import
+annotations`, so that annotations do not trigger the import.
+"""
+import importlib
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """The module itself if something already imported it, otherwise a lazy stand-in"""
+    return sys.modules.get(name) or LazyModule(name)
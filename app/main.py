@@ -1,24 +1,22 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
 import os
 import shutil
 from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
-import uvicorn
 from pathlib import Path
-import subprocess
 import asyncio
 import sys
 import logging
 import json
 import threading
 import time
-import psutil
-import requests
 import traceback
+import re
+from contextlib import asynccontextmanager
 
 # Setup logging
 logging.basicConfig(
@@ -38,6 +36,7 @@ sys.path.insert(0, str(project_root))
 # Import configuration FIRST
 try:
     from app.config import config
+    from app.lazy_imports import lazy_import
     logger.info("✓ Configuration loaded")
 except ImportError as e:
     logger.error(f"Failed to import config: {e}")
@@ -47,40 +46,123 @@ except ImportError as e:
 try:
     from app.utils import VectorStore, format_context
     from app.ai.llm import OllamaClient
+    from app.ai.rerank import Reranker
+    from app.ai.admission import AdmissionController, AdmissionRejected
+    from app.metrics import metrics, monitor_event_loop_lag
+    from app.singleflight import SingleFlight
+    from app.ai.warmup import ModelWarmer
+    from app.shared_state import shared_state, INDEX_VERSION, CONFIG_VERSION
+    from app.tasks import TaskRegistry, TERMINAL_STATUSES
+    from app.task_events import task_events, format_sse
+    from app.subprocess_stream import StreamedProcess, process_manager
+    from app.uploads import FileManifest, store_upload
+    from app.ingest_queue import IngestQueue, UPSERT, REMOVE
+    from app.watcher import PdfWatcher, claim_watch_lock
+    from app.pdf.extract_cache import extract_cache
+    from app.collection_manager import CollectionManager, UnknownCollection, DEFAULT_COLLECTION
+    from app.filters import parse_filters, FilterError
+    from app.readiness import Readiness
     logger.info("✓ Imported modules")
 except ImportError as e:
     logger.error(f"Import failed: {e}")
     sys.exit(1)
 
+# Only the status endpoints and Ollama checks use these; they load on first use
+psutil = lazy_import("psutil")
+requests = lazy_import("requests")
+
 # Initialize components
 try:
     vector_store = VectorStore()
     llm_client = OllamaClient()
+    reranker = Reranker()
+    generation_limiter = AdmissionController()
     
-    # Try to load vector store immediately
-    vector_store.load()
-    
-    if vector_store.loaded:
-        logger.info(f"✓ Vector store loaded with {len(vector_store.chunks)} chunks")
-    else:
-        logger.info("✓ Vector store initialized (not loaded yet - run ingestion first)")
-    
+    # The index is loaded in the background once the server is up (see lifespan)
     logger.info(f"✓ Components initialized with model: {config.chat_model}")
     
 except Exception as e:
     logger.error(f"Failed to initialize components: {e}")
     vector_store = None
     llm_client = None
+    reranker = None
+    generation_limiter = None
+
+# Coalesces identical in-flight chat requests
+chat_flight = SingleFlight()
+
+# Keeps the configured Ollama models (and the rerank model) loaded
+model_warmer = ModelWarmer(reranker=reranker)
+
+# With several workers, index/config changes and task progress go through shared_state
+multi_worker = config.server_workers > 1
 
-# Global variables for task tracking
-progress_data = {}
-task_lock = threading.Lock()
+# Named collections besides the default index, loaded on first query
+collection_manager = CollectionManager(vector_store, track_shared_versions=multi_worker) if vector_store else None
+
+# Background task tracking
+task_registry = TaskRegistry(
+    max_completed=config.task_max_completed,
+    max_logs=config.task_max_logs,
+    store=shared_state if (config.task_persist or multi_worker) else None,
+    persist_interval=config.task_persist_interval
+)
+# Other workers may still be running the tasks they persisted; only a dead owner's are interrupted
+task_registry.restore(mark_interrupted=not multi_worker)
+# Push progress to /tasks/events subscribers
+task_registry.add_listener(task_events.publish)
+worker_sync_lock = asyncio.Lock()
+seen_config_version = shared_state.versions()[CONFIG_VERSION] if multi_worker else 0
+
+# Startup phase: requests other than health checks wait for the index load
+readiness = Readiness()
+
+async def load_index_in_background():
+    """Load the index off the event loop, then start what depends on it"""
+    readiness.begin()
+    try:
+        if not vector_store:
+            raise RuntimeError("Vector store not initialized")
+        await run_in_threadpool(vector_store.load)
+        if vector_store.loaded:
+            logger.info(f"✓ Vector store loaded with {len(vector_store.chunks)} chunks")
+        else:
+            logger.info("✓ Vector store initialized (not loaded yet - run ingestion first)")
+        
+        # Index on disk built with another model than the configured one (one worker rebuilds it)
+        if vector_store.needs_reembedding and not multi_worker:
+            start_reembedding(config.embedding_model)
+        # Reconciles against the indexed sources, so it needs the loaded index
+        start_pdf_watcher()
+    except Exception as e:
+        readiness.mark_failed(str(e))
+        return
+    readiness.mark_ready()
+    try:
+        await run_in_threadpool(sync_upload_manifest)
+    except Exception as e:
+        logger.warning(f"Could not sync the upload manifest: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the chat and embedding models before the first question
+    model_warmer.start()
+    # The port is bound as soon as this yields; the index loads behind /health/ready
+    index_loader = asyncio.create_task(load_index_in_background())
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    yield
+    index_loader.cancel()
+    lag_monitor.cancel()
+    if pdf_watcher:
+        pdf_watcher.stop()
+    model_warmer.stop()
 
 # Initialize FastAPI
 app = FastAPI(
     title=config.app_name,
     version=config.app_version,
-    description="University of Embu Library Support AI"
+    description="University of Embu Library Support AI",
+    lifespan=lifespan
 )
 
 # Add middleware
@@ -95,6 +177,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def sync_worker_state():
+    """Reload the index or config if another worker (or ingest.py) changed them"""
+    global seen_config_version
+    versions = shared_state.versions()
+    index_stale = vector_store is not None and versions[INDEX_VERSION] != vector_store.shared_version
+    config_stale = versions[CONFIG_VERSION] != seen_config_version
+    if not index_stale and not config_stale:
+        return
+    
+    async with worker_sync_lock:
+        if config_stale and versions[CONFIG_VERSION] != seen_config_version:
+            config.reload()
+            if llm_client:
+                llm_client.model = config.chat_model
+            # A loaded index keeps its model until the re-embedded index is published
+            if vector_store and not vector_store.loaded and vector_store.embedding_model != config.embedding_model:
+                vector_store.embedding_model = config.embedding_model
+                vector_store._init_embeddings()
+            seen_config_version = versions[CONFIG_VERSION]
+            logger.info(f"🔄 Picked up config version {seen_config_version}")
+        
+        if index_stale and versions[INDEX_VERSION] != vector_store.shared_version:
+            await run_in_threadpool(vector_store.load)
+            logger.info(f"🔄 Reloaded index version {vector_store.shared_version}")
+
+@app.middleware("http")
+async def worker_state_middleware(request: Request, call_next):
+    if multi_worker and not request.url.path.startswith("/static/"):
+        try:
+            await sync_worker_state()
+        except Exception as e:
+            logger.warning(f"Shared state check failed: {e}")
+    return await call_next(request)
+
+@app.middleware("http")
+async def readiness_middleware(request: Request, call_next):
+    # Registered last so it runs first: nothing else touches the index while it loads
+    if readiness.gating and not readiness.is_ungated(request.url.path):
+        metrics.incr("not_ready_rejections")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Index is still loading, retry shortly", "phase": readiness.phase},
+            headers={"Retry-After": str(config.ready_retry_after)}
+        )
+    return await call_next(request)
+
 # Directories
 pdfs_dir = config.pdfs_dir
 data_dir = config.data_dir
@@ -103,7 +231,52 @@ templates_dir = config.templates_dir
 # Templates
 if not templates_dir.exists():
     os.makedirs(templates_dir, exist_ok=True)
-templates = Jinja2Templates(directory=str(templates_dir))
+_templates = None
+
+def get_templates():
+    """Jinja2 environment, created for the first page render rather than at import"""
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=str(templates_dir))
+    return _templates
+
+# Content hashes of the PDFs, to tell changed uploads from re-uploads
+upload_manifest = FileManifest()
+
+def sync_upload_manifest():
+    """Hash PDFs the manifest does not know yet (reads every new file, so it runs after startup)"""
+    # The watcher reconciles on start instead, so files added while down still get ingested
+    sources = _indexed_sources()
+    if not config.watch_pdfs_dir and sources:
+        upload_manifest.sync(pdfs_dir, sources)
+
+def _on_incremental_ingest(event: Dict[str, Any]):
+    metrics.incr(f"incremental_ingest_{event['status']}")
+
+# Re-indexes single changed files without a full ingestion run
+ingest_queue = IngestQueue(vector_store, pdfs_dir, on_progress=_on_incremental_ingest,
+                           manifest=upload_manifest) if vector_store else None
+
+def _indexed_sources():
+    if not vector_store or not vector_store.loaded:
+        return None
+    return {meta.get('source') for meta in vector_store.metadata if meta.get('source')}
+
+# Picks up PDFs copied straight into pdfs_dir (SFTP etc.)
+pdf_watcher = PdfWatcher(pdfs_dir, ingest_queue, upload_manifest, indexed_sources=_indexed_sources) if ingest_queue else None
+watch_lock = None
+
+def start_pdf_watcher():
+    """Start watching in one process only; other workers pick the changes up via the index version"""
+    global watch_lock
+    if not pdf_watcher or not config.watch_pdfs_dir:
+        return
+    watch_lock = claim_watch_lock(data_dir / "watcher.lock")
+    if watch_lock is None:
+        logger.info("👀 Another worker is watching the PDF directory")
+        return
+    pdf_watcher.start()
 
 def format_file_size(bytes):
     if bytes == 0: return "0 Bytes"
@@ -118,33 +291,7 @@ def format_file_size(bytes):
 
 def update_task_progress(task_id: str, progress: int, message: str, status: str = "running"):
     """Update task progress in a thread-safe way"""
-    with task_lock:
-        if task_id not in progress_data:
-            progress_data[task_id] = {
-                "task_id": task_id,
-                "progress": 0,
-                "message": "",
-                "status": "pending",
-                "start_time": datetime.now(timezone.utc).isoformat(),
-                "logs": []
-            }
-        
-        progress_data[task_id]["progress"] = progress
-        progress_data[task_id]["message"] = message
-        progress_data[task_id]["status"] = status
-        
-        if status in ["completed", "failed", "cancelled"]:
-            progress_data[task_id]["end_time"] = datetime.now(timezone.utc).isoformat()
-            progress_data[task_id]["duration"] = (
-                datetime.now(timezone.utc) - 
-                datetime.fromisoformat(progress_data[task_id]["start_time"].replace('Z', '+00:00'))
-            ).total_seconds()
-        
-        # Keep log of last 100 messages
-        log_entry = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
-        progress_data[task_id]["logs"].append(log_entry)
-        if len(progress_data[task_id]["logs"]) > 100:
-            progress_data[task_id]["logs"] = progress_data[task_id]["logs"][-100:]
+    task_registry.update(task_id, progress, message, status)
 
 def reindex_task(task_id: str):
     """Background task for reindexing documents"""
@@ -161,6 +308,8 @@ def reindex_task(task_id: str):
         
         # Simulate processing (in production, replace with actual ingestion)
         for i, pdf_file in enumerate(pdf_files):
+            if task_registry.is_cancelled(task_id):
+                return
             progress = int((i / total_files) * 100)
             update_task_progress(task_id, progress, f"Processing {pdf_file.name} ({i+1}/{total_files})")
             
@@ -179,71 +328,112 @@ def reindex_task(task_id: str):
         logger.error(f"Reindexing failed: {e}")
         update_task_progress(task_id, 0, f"Reindexing failed: {str(e)}", "failed")
 
-def install_model_task(task_id: str, model_name: str):
-    """Background task for installing models"""
+# One shadow build at a time; a newer model switch waits for the running one
+reembed_lock = threading.Lock()
+
+def reembed_task(task_id: str, embedding_model: str):
+    """Background task: re-embed the stored chunks with a new model, then swap indexes"""
+    with reembed_lock:
+        try:
+            if config.embedding_model != embedding_model:
+                update_task_progress(task_id, 100, f"Superseded by a switch to {config.embedding_model}", "cancelled")
+                return
+            if vector_store.embedding_model == embedding_model:
+                update_task_progress(task_id, 100, f"Index already uses {embedding_model}", "completed")
+                return
+            
+            total = len(vector_store.chunks)
+            update_task_progress(task_id, 0, f"Re-embedding {total} chunks with {embedding_model} "
+                                             f"(still serving {vector_store.embedding_model})")
+            
+            def progress(done: int, total: int):
+                update_task_progress(task_id, min(99, int(done / total * 100)), f"Embedded {done}/{total} chunks")
+            
+            result = vector_store.build_shadow(embedding_model, progress_callback=progress)
+            update_task_progress(task_id, 100, f"Switched index from {result['previous_model']} to "
+                                               f"{embedding_model} (dimension {result['dimension']})", "completed")
+        except Exception as e:
+            logger.error(f"Re-embedding failed: {e}")
+            update_task_progress(task_id, 0, f"Re-embedding failed: {str(e)}", "failed")
+
+def start_reembedding(embedding_model: str) -> str:
+    task_id = f"reembed_{int(time.time())}"
+    update_task_progress(task_id, 0, f"Queued re-embedding with {embedding_model}")
+    threading.Thread(target=reembed_task, args=(task_id, embedding_model), daemon=True).start()
+    return task_id
+
+# Child processes started for tasks, so cancelling a task can stop its process
+task_processes: Dict[str, StreamedProcess] = {}
+
+_PERCENT_RE = re.compile(r"(\d{1,3})%")
+
+async def install_model_task(task_id: str, model_name: str):
+    """Background task for installing models (runs on the event loop, never blocks it)"""
     try:
         update_task_progress(task_id, 0, f"Starting installation of {model_name}")
         
         # Check if Ollama is available
         try:
-            response = requests.get(f"{config.ollama_base_url}/api/tags", timeout=5)
+            response = await run_in_threadpool(requests.get, f"{config.ollama_base_url}/api/tags", timeout=5)
             if response.status_code != 200:
                 update_task_progress(task_id, 0, "Ollama is not running or not accessible", "failed")
                 return
-        except:
+        except Exception:
             update_task_progress(task_id, 0, "Ollama is not running or not accessible", "failed")
             return
         
         # Run ollama pull command
-        process = subprocess.Popen(
-            ["ollama", "pull", model_name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
+        process = await StreamedProcess(f"ollama pull {model_name}", ["ollama", "pull", model_name]).start()
+        task_processes[task_id] = process
         
         # Stream output and update progress
         line_count = 0
-        max_lines = 50  # Estimated max lines for a pull operation
+        max_lines = 50  # Estimated max lines when ollama prints no percentage
+        last_update = 0.0
+        last_progress = -1
         
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
-                
-            if line:
-                line_count += 1
-                progress = min(95, int((line_count / max_lines) * 100))
-                
-                # Parse progress from ollama output
-                line_lower = line.lower()
-                if "pulling" in line_lower or "downloading" in line_lower:
-                    update_task_progress(task_id, progress, f"Downloading {model_name}: {line.strip()}")
-                elif "verifying" in line_lower:
-                    update_task_progress(task_id, progress, f"Verifying {model_name}: {line.strip()}")
-                elif "success" in line_lower or "complete" in line_lower or "pulled" in line_lower:
-                    update_task_progress(task_id, 95, f"Finalizing {model_name}: {line.strip()}")
-                else:
-                    update_task_progress(task_id, progress, f"Installing {model_name}: {line.strip()}")
-        
-        process.wait()
-        
-        if process.returncode == 0:
+        async for line in process.listen():
+            line_count += 1
+            percent = _PERCENT_RE.search(line)
+            progress = min(95, int(percent.group(1)) if percent else int((line_count / max_lines) * 100))
+            
+            # Progress bars redraw many times a second; a few updates per second is plenty
+            now = time.monotonic()
+            if progress == last_progress and now - last_update < 0.5:
+                continue
+            last_update, last_progress = now, progress
+            
+            # Parse progress from ollama output
+            line_lower = line.lower()
+            if "pulling" in line_lower or "downloading" in line_lower:
+                update_task_progress(task_id, progress, f"Downloading {model_name}: {line.strip()}")
+            elif "verifying" in line_lower:
+                update_task_progress(task_id, progress, f"Verifying {model_name}: {line.strip()}")
+            elif "success" in line_lower or "complete" in line_lower or "pulled" in line_lower:
+                update_task_progress(task_id, 95, f"Finalizing {model_name}: {line.strip()}")
+            else:
+                update_task_progress(task_id, progress, f"Installing {model_name}: {line.strip()}")
+        
+        returncode = await process.wait()
+        
+        if process.cancelled:
+            return
+        if returncode == 0:
             update_task_progress(task_id, 100, f"Successfully installed {model_name}", "completed")
         else:
-            update_task_progress(task_id, 0, f"Failed to install {model_name} (exit code: {process.returncode})", "failed")
+            update_task_progress(task_id, 0, f"Failed to install {model_name} (exit code: {returncode})", "failed")
             
     except Exception as e:
         logger.error(f"Model installation failed: {e}")
         update_task_progress(task_id, 0, f"Installation failed: {str(e)}", "failed")
+    finally:
+        task_processes.pop(task_id, None)
 
 # ==================== ROUTES ====================
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {
+    return get_templates().TemplateResponse("index.html", {
         "request": request,
         "app_name": config.app_name,
         "app_version": config.app_version,
@@ -268,7 +458,7 @@ async def manage_files(request: Request):
     vector_status = "Ready" if vector_store and vector_store.loaded else "Not processed"
     total_size = format_file_size(sum(f["size"] for f in files) if files else 0)
 
-    return templates.TemplateResponse("files.html", {
+    return get_templates().TemplateResponse("files.html", {
         "request": request,
         "files": files,
         "total_files": len(files),
@@ -281,150 +471,277 @@ async def manage_files(request: Request):
 @app.get("/chat", response_class=HTMLResponse)
 async def chat_page(request: Request):
     files_count = len([f for f in os.listdir(pdfs_dir) if f.endswith(".pdf")]) if pdfs_dir.exists() else 0
-    return templates.TemplateResponse("chat.html", {
+    return get_templates().TemplateResponse("chat.html", {
         "request": request,
         "total_files": files_count,
         "current_model": config.chat_model
     })
 
-@app.post("/chat")
-async def chat_api(request_data: dict):
-    user_message = request_data.get("message") or request_data.get("query") or ""
-    if not user_message:
-        return {"response": "Please enter a question."}
-    
+def _chat_flight_key(user_message: str, streamed: bool = False, collection: str = DEFAULT_COLLECTION,
+                     filters: Optional[Dict[str, Any]] = None) -> str:
+    """Coalescing key: normalized question plus everything that changes the answer"""
+    normalized = " ".join(user_message.lower().split())
+    store = collection_manager.peek(collection) if collection_manager else None
+    index_version = store.index_version if store else 0
+    embedding_model = store.embedding_model if store else config.embedding_model
+    mode = "stream" if streamed else "chat"
+    filter_key = json.dumps(filters, sort_keys=True) if filters else ""
+    return f"{mode}|{collection}|{filter_key}|{config.chat_model}|{embedding_model}|{index_version}|{normalized}"
+
+def _requested_collection(data: Dict[str, Any]) -> str:
+    """Collection named in a request, validated; raises 404 for unknown ones"""
+    name = data.get("collection")
+    if collection_manager is None or not collection_manager.exists(name):
+        if name and name != DEFAULT_COLLECTION:
+            raise HTTPException(404, f"Unknown collection: {name}")
+        return DEFAULT_COLLECTION
+    return collection_manager.resolve(name)
+
+def _requested_filters(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Validated metadata filter spec; raises 400 for malformed ones"""
     try:
-        # Check if vector store is loaded
-        if not vector_store:
-            return {
-                "response": "Vector store not initialized. Please restart the application.",
-                "context_used": False,
-                "model_used": config.chat_model
-            }
-        
+        return parse_filters(raw)
+    except FilterError as e:
+        raise HTTPException(400, str(e))
+
+async def _retrieve_context(user_message: str, collection: str = DEFAULT_COLLECTION,
+                            filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Search and build context; returns {"context": ...} or an early {"response": ...}"""
+    # Check if vector store is loaded
+    if not vector_store:
+        return {
+            "response": "Vector store not initialized. Please restart the application.",
+            "context_used": False,
+            "model_used": config.chat_model
+        }
+    
+    if collection == DEFAULT_COLLECTION:
+        store = vector_store
         # Load vector store if not already loaded
-        if not vector_store.loaded:
-            vector_store.load()
-        
-        if not vector_store.loaded:
-            return {
-                "response": "No documents have been processed yet. Please upload and process PDF files first.",
-                "context_used": False,
-                "model_used": config.chat_model
-            }
-        
-        # Check if Ollama is connected
-        try:
-            response = requests.get(f"{config.ollama_base_url}/api/tags", timeout=5)
-            if response.status_code != 200:
-                return {
-                    "response": "Ollama is not connected. Please ensure Ollama is running.",
-                    "context_used": False,
-                    "model_used": config.chat_model
-                }
-        except:
+        if not store.loaded:
+            await run_in_threadpool(store.load)
+    else:
+        store = await run_in_threadpool(collection_manager.get, collection)
+    
+    if not store.loaded:
+        return {
+            "response": "No documents have been processed yet. Please upload and process PDF files first.",
+            "context_used": False,
+            "model_used": config.chat_model
+        }
+    
+    # Check if Ollama is connected (search, rerank and this probe all block, so none run on the event loop)
+    try:
+        response = await run_in_threadpool(requests.get, f"{config.ollama_base_url}/api/tags", timeout=5)
+        if response.status_code != 200:
             return {
                 "response": "Ollama is not connected. Please ensure Ollama is running.",
                 "context_used": False,
                 "model_used": config.chat_model
             }
-        
-        # 1. Search
-        search_results = vector_store.search(user_message, k=config.search_default_k)
-        logger.info(f"Chat search for '{user_message}' found {len(search_results)} results")
-        
-        if not search_results:
-            return {
-                "response": "I cannot find relevant information in the library documents.",
-                "context_used": False,
-                "model_used": config.chat_model
-            }
-        
-        # 2. Format context
-        context = format_context(search_results, max_length=config.max_context_length)
-        logger.info(f"Chat formatted context length: {len(context)}")
-        
-        if not context or len(context.strip()) < 50:
-            logger.warning(f"Context too short: {len(context)} chars")
-            return {
-                "response": "I found some information but it doesn't seem relevant to your question.",
-                "context_used": False,
-                "model_used": config.chat_model
-            }
-        
-        # 3. Generate response
-        response = llm_client.generate_response(prompt=user_message, context=context)
-        
+    except:
         return {
-            "response": response,
-            "context_used": len(context) > 0,
+            "response": "Ollama is not connected. Please ensure Ollama is running.",
+            "context_used": False,
+            "model_used": config.chat_model
+        }
+    
+    # 1. Search (over-fetch candidates when reranking)
+    use_rerank = config.rerank_enabled and reranker is not None
+    fetch_k = max(config.rerank_candidates, config.search_default_k) if use_rerank else config.search_default_k
+    with metrics.timer("search_latency"):
+        search_results = await run_in_threadpool(store.search, user_message, k=fetch_k, filters=filters)
+    logger.info(f"Chat search for '{user_message}' ({collection}) found {len(search_results)} results")
+    
+    if use_rerank and search_results:
+        search_results, _ = await run_in_threadpool(reranker.rerank, user_message, search_results,
+                                                    config.search_default_k)
+    
+    if not search_results:
+        return {
+            "response": "I cannot find relevant information in the library documents.",
+            "context_used": False,
+            "model_used": config.chat_model
+        }
+    
+    # 2. Format context
+    context = format_context(search_results, max_length=config.max_context_length)
+    logger.info(f"Chat formatted context length: {len(context)}")
+    
+    if not context or len(context.strip()) < 50:
+        logger.warning(f"Context too short: {len(context)} chars")
+        return {
+            "response": "I found some information but it doesn't seem relevant to your question.",
+            "context_used": False,
             "model_used": config.chat_model
         }
+    
+    return {"context": context}
+
+async def _run_chat_pipeline(user_message: str, collection: str = DEFAULT_COLLECTION,
+                             filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    prepared = await _retrieve_context(user_message, collection, filters)
+    if "response" in prepared:
+        return prepared
+    context = prepared["context"]
+    
+    # 3. Generate response (admission-controlled, off the event loop)
+    async with generation_limiter.slot():
+        with metrics.timer("generation_latency"):
+            response = await run_in_threadpool(llm_client.generate_response, prompt=user_message, context=context)
+    
+    return {
+        "response": response,
+        "context_used": len(context) > 0,
+        "model_used": config.chat_model
+    }
+
+async def _stream_chat_pipeline(user_message: str, collection: str = DEFAULT_COLLECTION,
+                                filters: Optional[Dict[str, Any]] = None):
+    try:
+        prepared = await _retrieve_context(user_message, collection, filters)
+        if "response" in prepared:
+            yield prepared["response"]
+            return
+        
+        async with generation_limiter.slot():
+            with metrics.timer("generation_latency"):
+                pieces = llm_client.stream_response(prompt=user_message, context=prepared["context"])
+                async for piece in iterate_in_threadpool(pieces):
+                    yield piece
+    except AdmissionRejected as e:
+        logger.warning(f"Streamed chat rejected ({e.status_code})")
+        yield f"{e.detail} (retry after {e.retry_after}s)"
+
+@app.post("/chat")
+async def chat_api(request_data: dict):
+    user_message = request_data.get("message") or request_data.get("query") or ""
+    if not user_message:
+        return {"response": "Please enter a question."}
+    collection = _requested_collection(request_data)
+    filters = _requested_filters(request_data.get("filters"))
+    
+    try:
+        # Identical in-flight questions share one pipeline run
+        result, _ = await chat_flight.do(
+            _chat_flight_key(user_message, collection=collection, filters=filters),
+            lambda: _run_chat_pipeline(user_message, collection, filters)
+        )
+        return result
         
+    except AdmissionRejected as e:
+        logger.warning(f"Chat rejected ({e.status_code}): queue depth {generation_limiter.queue_depth}")
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"response": e.detail, "error": e.detail, "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Chat error: {e}")
         return {"response": f"System error: {str(e)}", "error": str(e)}
 
+@app.post("/chat/stream")
+async def chat_stream_api(request_data: dict):
+    """Stream the answer as plain text while it is generated"""
+    user_message = request_data.get("message") or request_data.get("query") or ""
+    if not user_message:
+        return StreamingResponse(iter(["Please enter a question."]), media_type="text/plain")
+    collection = _requested_collection(request_data)
+    filters = _requested_filters(request_data.get("filters"))
+    
+    stream = chat_flight.stream(
+        _chat_flight_key(user_message, streamed=True, collection=collection, filters=filters),
+        lambda: _stream_chat_pipeline(user_message, collection, filters)
+    )
+    return StreamingResponse(stream, media_type="text/plain")
+
 # --- STREAMING INGESTION ENDPOINT ---
+async def _after_ingestion(returncode: int) -> List[str]:
+    """Final lines for every /ingest/stream listener; reloads the index once per run"""
+    if returncode == 0:
+        lines = ["\n✅ Ingestion Completed Successfully!\n"]
+        # Reload vector store in memory so the new data is available immediately
+        if vector_store:
+            await run_in_threadpool(vector_store.load)
+            lines.append(f"✅ Vector store reloaded with {len(vector_store.chunks) if vector_store.loaded else 0} chunks\n")
+        return lines
+    if returncode < 0:
+        return ["\n⏹️ Ingestion cancelled\n"]
+    return [f"\n❌ Process failed with exit code {returncode}\n"]
+
 @app.get("/ingest/stream")
 async def stream_ingestion():
-    """Run ingestion script and stream logs to client"""
+    """Run ingestion script and stream logs to client (joins a run already in progress)"""
+    ingest_script = project_root / "ingest.py"
     
     async def log_generator():
-        ingest_script = project_root / "ingest.py"
-        
         if not ingest_script.exists():
             yield "❌ Error: ingest.py not found\n"
             return
         
         # Run python script unbuffered
-        process = subprocess.Popen(
-            ["python3", "-u", str(ingest_script)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+        process, started = await process_manager.start_or_attach(
+            "ingest",
+            [sys.executable, "-u", str(ingest_script)],
+            cwd=str(project_root),
+            on_exit=_after_ingestion
         )
-
-        yield "🚀 Starting ingestion process...\n"
-        
-        # Stream output line by line
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
-            if line:
-                yield line
-
-        # Final status
-        if process.returncode == 0:
-            yield "\n✅ Ingestion Completed Successfully!\n"
-            # Reload vector store in memory so the new data is available immediately
-            if vector_store:
-                vector_store.load()
-                yield f"✅ Vector store reloaded with {len(vector_store.chunks) if vector_store.loaded else 0} chunks\n"
+        
+        if started:
+            yield "🚀 Starting ingestion process...\n"
         else:
-            yield f"\n❌ Process failed with exit code {process.returncode}\n"
-
+            yield "📎 Ingestion already running, attaching to its output...\n"
+        
+        # Stream output line by line; disconnecting leaves the ingestion running
+        async for line in process.listen():
+            yield line
+    
     return StreamingResponse(log_generator(), media_type="text/plain")
 
+@app.delete("/ingest/stream")
+async def cancel_ingestion():
+    """Stop a running ingestion"""
+    if await process_manager.terminate("ingest"):
+        return {"status": "cancelled"}
+    return {"status": "not_running"}
+
 @app.post("/upload")
 async def upload_files(files: List[UploadFile] = File(...)):
+    """Stream PDFs into place and queue incremental ingestion for changed ones"""
     uploaded = []
+    queued = []
     for file in files:
         if file.filename.lower().endswith('.pdf'):
-            path = pdfs_dir / file.filename
-            with open(path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            uploaded.append({"name": file.filename})
-    return {"status": "success", "uploaded": uploaded}
+            # Copy + hash in the threadpool; large scans never block the event loop
+            result = await run_in_threadpool(store_upload, file.file, file.filename, pdfs_dir, upload_manifest)
+            await file.close()
+            uploaded.append(result)
+            
+            if result["status"] in ("new", "updated") and ingest_queue and config.auto_ingest_uploads:
+                ingest_queue.enqueue(result["name"], UPSERT)
+                queued.append(result["name"])
+    return {"status": "success", "uploaded": uploaded, "ingest_queued": queued}
+
+@app.get("/ingest/queue")
+async def ingest_queue_status():
+    """Incremental ingestion backlog"""
+    if not ingest_queue:
+        return {"status": "not_initialized"}
+    status = ingest_queue.status()
+    status["watcher"] = pdf_watcher.status() if pdf_watcher else None
+    status["extract_cache"] = extract_cache.report()
+    return status
 
 @app.delete("/files/{filename}")
 async def delete_file(filename: str):
     path = pdfs_dir / filename
     if path.exists():
         os.remove(path)
+        if ingest_queue and config.auto_ingest_uploads:
+            # The queue drops the manifest entry once the chunks are out of the index
+            ingest_queue.enqueue(filename, REMOVE)
+        else:
+            upload_manifest.remove(filename)
         return {"status": "deleted"}
     raise HTTPException(404, "File not found")
 
@@ -434,7 +751,10 @@ async def clear_all_files():
         # Clear PDFs
         if pdfs_dir.exists():
             for f in os.listdir(pdfs_dir):
-                os.remove(pdfs_dir / f)
+                # Sub-directories hold named collections' PDFs
+                if (pdfs_dir / f).is_file():
+                    os.remove(pdfs_dir / f)
+        upload_manifest.clear()
         # Clear Data
         if config.vector_store_path.exists():
             shutil.rmtree(config.vector_store_path)
@@ -505,6 +825,7 @@ async def get_configuration():
 @app.put("/config/model")
 async def update_model(data: dict):
     """Update model configuration"""
+    global seen_config_version
     try:
         success = True
         changes = {}
@@ -515,18 +836,37 @@ async def update_model(data: dict):
             if llm_client:
                 llm_client.model = data["chat_model"]
         
+        reembed_task_id = None
         if "embedding_model" in data:
             changes["embedding_model"] = data["embedding_model"]
             success &= config.update_config("ollama", "embedding_model", data["embedding_model"])
-            if vector_store:
+            if vector_store and vector_store.needs_reembedding:
+                # Old index/model pair keeps serving until the shadow index is ready
+                reembed_task_id = start_reembedding(data["embedding_model"])
+            elif vector_store and not vector_store.loaded:
                 vector_store.embedding_model = data["embedding_model"]
+                vector_store._init_embeddings()
         
         if success:
-            return {
+            if changes and multi_worker:
+                seen_config_version = shared_state.bump(CONFIG_VERSION)
+            if changes:
+                # Load the new models now rather than on the next question
+                model_warmer.warm_up_in_background(
+                    chat_model=changes.get("chat_model"),
+                    embedding_model=changes.get("embedding_model")
+                )
+            response = {
                 "success": True,
                 "message": "Models updated successfully. Changes will take effect immediately.",
                 "updated": changes
             }
+            if reembed_task_id:
+                response["message"] = ("Models updated. Documents are being re-embedded with the new "
+                                       "embedding model; search switches over when that finishes.")
+                response["reembed_task_id"] = reembed_task_id
+                response["monitor_url"] = f"/tasks/progress/{reembed_task_id}"
+            return response
         else:
             return {
                 "success": False,
@@ -604,8 +944,9 @@ async def reload_vector_store():
             "chunks_count": len(vector_store.chunks) if vector_store.loaded else 0,
             "vector_store_path": str(config.vector_store_path),
             "path_exists": config.vector_store_path.exists(),
-            "index_exists": (config.vector_store_path / "vector_index.bin").exists(),
-            "metadata_exists": (config.vector_store_path / "metadata.pkl").exists()
+            "index_exists": ((config.vector_store_path / "shards.json").exists()
+                             or (config.vector_store_path / "vector_index.bin").exists()),
+            "shards": len(vector_store.shards)
         }
     except Exception as e:
         logger.error(f"Failed to reload vector store: {e}")
@@ -649,8 +990,7 @@ async def system_status():
     process_mem = process.memory_info()
     
     # Get number of active tasks
-    with task_lock:
-        active_tasks = sum(1 for task in progress_data.values() if task["status"] == "running")
+    active_tasks = task_registry.active_count()
     
     # Check Ollama status
     ollama_connected = False
@@ -690,7 +1030,7 @@ async def system_status():
         },
         "system": {
             "active_tasks": active_tasks,
-            "total_tasks": len(progress_data),
+            "total_tasks": len(task_registry),
             "ollama_connected": ollama_connected,
             "ollama_models_count": len(ollama_models),
             "vector_store_ready": vector_store.loaded if vector_store else False,
@@ -724,7 +1064,8 @@ async def health_check():
             vector_store_chunks = len(vector_store.chunks)
     
     return {
-        "status": "healthy" if ollama_ok and vector_store else "degraded",
+        "status": "healthy" if ollama_ok and vector_store and readiness.ready else "degraded",
+        "phase": readiness.phase,
         "vector_store_ready": vector_store_ready,
         "vector_store_chunks": vector_store_chunks,
         "ollama_connected": ollama_ok,
@@ -735,6 +1076,76 @@ async def health_check():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and serving (no dependency checks)"""
+    return {"status": "alive", "phase": readiness.phase}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: the startup index load has finished"""
+    status = readiness.status()
+    status["vector_store_loaded"] = bool(vector_store and vector_store.loaded)
+    status["vector_store_chunks"] = len(vector_store.chunks) if vector_store and vector_store.loaded else 0
+    if readiness.ready:
+        return status
+    headers = {"Retry-After": str(config.ready_retry_after)} if readiness.gating else None
+    return JSONResponse(status_code=503, content=status, headers=headers)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request pipeline metrics (search, rerank and generation latency)"""
+    return metrics.snapshot()
+
+@app.get("/search")
+async def search_api(q: str, k: Optional[int] = None, collection: Optional[str] = None,
+                     source: Optional[List[str]] = Query(None), page_min: Optional[int] = None,
+                     page_max: Optional[int] = None, is_procedure: Optional[bool] = None,
+                     is_critical: Optional[bool] = None):
+    """Raw vector search (no generation) over one collection, optionally filtered by metadata"""
+    name = _requested_collection({"collection": collection})
+    page = [page_min, page_max] if page_min is not None or page_max is not None else None
+    filters = _requested_filters({"source": source, "page": page,
+                                  "is_procedure": is_procedure, "is_critical": is_critical})
+    if not vector_store:
+        return {"status": "not_initialized"}
+    store = await run_in_threadpool(collection_manager.get, name)
+    if name == DEFAULT_COLLECTION and not store.loaded:
+        await run_in_threadpool(store.load)
+    with metrics.timer("search_latency"):
+        results = await run_in_threadpool(store.search, q, k, filters)
+    return {
+        "query": q,
+        "collection": name,
+        "filters": filters,
+        "count": len(results),
+        "results": [{
+            "content": r["content"],
+            "score": float(r["score"]),
+            "metadata": r["metadata"],
+            "index": int(r["index"])
+        } for r in results]
+    }
+
+@app.get("/collections")
+async def list_collections():
+    """Known collections, which are loaded, and memory use against the budget"""
+    if not collection_manager:
+        return {"status": "not_initialized"}
+    return collection_manager.status()
+
+@app.get("/vector-store/stats")
+async def vector_store_stats():
+    """Corpus statistics maintained at ingestion time"""
+    if not vector_store:
+        return {"status": "not_initialized"}
+    return vector_store.get_stats()
+
+@app.post("/models/warmup")
+async def warmup_models():
+    """Warm the configured chat and embedding models and report load timing"""
+    return await run_in_threadpool(model_warmer.warm_up)
+
 @app.post("/install-model")
 async def install_model(request: Request, background_tasks: BackgroundTasks):
     """Install a model via Ollama"""
@@ -803,76 +1214,139 @@ async def start_task(task_type: str, request: Request, background_tasks: Backgro
 @app.get("/tasks/progress/{task_id}")
 async def get_task_progress(task_id: str):
     """Get progress of a long-running task"""
-    with task_lock:
-        if task_id in progress_data:
-            task_info = progress_data[task_id].copy()
-            
-            # Calculate estimated time remaining if still running
-            if task_info["status"] == "running":
-                start_time = datetime.fromisoformat(task_info["start_time"].replace('Z', '+00:00'))
-                elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
-                
-                if task_info["progress"] > 0:
-                    estimated_total = elapsed / (task_info["progress"] / 100)
-                    remaining = estimated_total - elapsed
-                    task_info["estimated_remaining_seconds"] = max(0, int(remaining))
-                    task_info["elapsed_seconds"] = int(elapsed)
-            
-            return task_info
-        else:
-            raise HTTPException(404, f"Task {task_id} not found")
+    # May hit the task store for tasks from another worker or before a restart
+    task_info = await run_in_threadpool(task_registry.get, task_id)
+    if not task_info:
+        raise HTTPException(404, f"Task {task_id} not found")
+    
+    # Calculate estimated time remaining if still running
+    if task_info["status"] == "running":
+        start_time = datetime.fromisoformat(task_info["start_time"].replace('Z', '+00:00'))
+        elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+        
+        if task_info["progress"] > 0:
+            estimated_total = elapsed / (task_info["progress"] / 100)
+            remaining = estimated_total - elapsed
+            task_info["estimated_remaining_seconds"] = max(0, int(remaining))
+            task_info["elapsed_seconds"] = int(elapsed)
+    
+    return task_info
 
 @app.get("/tasks/active")
 async def get_active_tasks():
     """Get list of active tasks"""
-    with task_lock:
-        active_tasks = [
-            {
-                "task_id": task_id,
-                "type": task_id.split('_')[0],
-                "progress": info["progress"],
-                "message": info["message"],
-                "status": info["status"],
-                "start_time": info["start_time"]
-            }
-            for task_id, info in progress_data.items()
-            if info["status"] == "running"
-        ]
-        
-        completed_tasks = [
-            {
-                "task_id": task_id,
-                "type": task_id.split('_')[0],
-                "progress": info["progress"],
-                "status": info["status"],
-                "start_time": info["start_time"],
-                "end_time": info.get("end_time"),
-                "duration": info.get("duration")
-            }
-            for task_id, info in progress_data.items()
-            if info["status"] in ["completed", "failed", "cancelled"]
-        ][-10:]  # Last 10 completed tasks
-        
-        return {
-            "active": active_tasks,
-            "recent": completed_tasks,
-            "total_tasks": len(progress_data)
+    running = task_registry.active()
+    if multi_worker:
+        # Tasks running on other workers
+        local_ids = {info["task_id"] for info in running}
+        remote = await run_in_threadpool(shared_state.list_tasks, 50, "running")
+        running += [info for info in remote if info["task_id"] not in local_ids]
+    
+    active_tasks = [
+        {
+            "task_id": info["task_id"],
+            "type": info["task_id"].split('_')[0],
+            "progress": info["progress"],
+            "message": info["message"],
+            "status": info["status"],
+            "start_time": info["start_time"]
+        }
+        for info in running
+    ]
+    
+    completed_tasks = [
+        {
+            "task_id": info["task_id"],
+            "type": info["task_id"].split('_')[0],
+            "progress": info["progress"],
+            "status": info["status"],
+            "start_time": info["start_time"],
+            "end_time": info.get("end_time"),
+            "duration": info.get("duration")
         }
+        for info in task_registry.recent(10)  # Last 10 completed tasks
+    ]
+    
+    return {
+        "active": active_tasks,
+        "recent": completed_tasks,
+        "total_tasks": len(task_registry)
+    }
+
+def _last_event_id(request: Request) -> Optional[int]:
+    """Resume offset from the Last-Event-ID header (sent by EventSource on reconnect) or ?last_event_id="""
+    value = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+def _sse_response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _store_task_events(task_id: str, interval: float = 1.0):
+    """Task running on another worker: follow its snapshots in the shared store instead"""
+    yield "retry: 3000\n\n"
+    last = None
+    idle = 0.0
+    while True:
+        info = await run_in_threadpool(shared_state.get_task, task_id)
+        if info and info != last:
+            event = "snapshot" if last is None else "progress"
+            yield format_sse(info, event=event)
+            last = info
+            idle = 0.0
+            if info["status"] in TERMINAL_STATUSES:
+                return
+        elif idle >= config.task_events_heartbeat:
+            yield ": heartbeat\n\n"
+            idle = 0.0
+        await asyncio.sleep(interval)
+        idle += interval
+
+@app.get("/tasks/events")
+async def all_task_events(request: Request):
+    """Multiplexed SSE stream of progress for every task on this worker"""
+    def snapshot():
+        return {"active": task_registry.active(), "recent": task_registry.recent(10)}
+    
+    return _sse_response(task_events.stream(
+        last_event_id=_last_event_id(request),
+        snapshot=snapshot,
+        heartbeat=config.task_events_heartbeat
+    ))
+
+@app.get("/tasks/{task_id}/events")
+async def task_event_stream(task_id: str, request: Request):
+    """SSE stream of one task's progress; ends when the task finishes"""
+    if not await run_in_threadpool(task_registry.get, task_id):
+        raise HTTPException(404, f"Task {task_id} not found")
+    
+    if multi_worker and not task_registry.has(task_id):
+        return _sse_response(_store_task_events(task_id))
+    
+    return _sse_response(task_events.stream(
+        task_id=task_id,
+        last_event_id=_last_event_id(request),
+        snapshot=lambda: task_registry.get(task_id),
+        heartbeat=config.task_events_heartbeat
+    ))
 
 @app.delete("/tasks/{task_id}")
 async def cancel_task(task_id: str):
     """Cancel a running task"""
-    with task_lock:
-        if task_id in progress_data:
-            if progress_data[task_id]["status"] == "running":
-                progress_data[task_id]["status"] = "cancelled"
-                progress_data[task_id]["message"] = "Task cancelled by user"
-                progress_data[task_id]["end_time"] = datetime.now(timezone.utc).isoformat()
-                return {"status": "cancelled", "task_id": task_id}
-            else:
-                return {"status": "not_running", "task_id": task_id}
-        else:
-            raise HTTPException(404, f"Task {task_id} not found")
+    status = task_registry.cancel(task_id)
+    if status is None:
+        raise HTTPException(404, f"Task {task_id} not found")
+    
+    process = task_processes.get(task_id)
+    if status == "cancelled" and process:
+        await process.terminate()
+    return {"status": status, "task_id": task_id}
 
 @app.get("/api/files")
 async def api_files():
@@ -897,4 +1371,6 @@ async def test_endpoint():
     return {"status": "ok", "message": "Server is running"}
 
 if __name__ == "__main__":
+    # run.py / the uvicorn CLI import this module; only direct runs need uvicorn here
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
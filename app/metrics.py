@@ -0,0 +1,90 @@
+"""
+In-process metrics: counters, gauges and latency windows
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any
+
+
+class Metrics:
+    """Thread-safe metrics registry exposed through /metrics"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, deque] = {}
+        self._timing_counts: Dict[str, int] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Record one latency sample in seconds"""
+        with self._lock:
+            if name not in self._timings:
+                self._timings[name] = deque(maxlen=self._window)
+                self._timing_counts[name] = 0
+            self._timings[name].append(seconds * 1000.0)
+            self._timing_counts[name] += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: sorted(values) for name, values in self._timings.items()}
+            counts = dict(self._timing_counts)
+
+        timings = {}
+        for name, values in samples.items():
+            if not values:
+                continue
+            timings[name] = {
+                "count": counts[name],
+                "avg_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "max_ms": round(values[-1], 3)
+            }
+
+        return {"counters": counters, "gauges": gauges, "timings": timings}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+metrics = Metrics()
+
+
+async def monitor_event_loop_lag(interval: float = 0.1):
+    """Sample how late the event loop wakes up; a blocked loop shows up as lag"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        metrics.observe("event_loop_lag", lag)
+        metrics.set_gauge("event_loop_lag_ms", round(lag * 1000, 3))
@@ -0,0 +1,176 @@
+"""
+Near-duplicate chunk elimination for ingestion.
+
+Chunks are reduced to MinHash signatures over word shingles, candidate pairs
+are found with LSH banding, and pairs whose estimated Jaccard similarity is
+above the threshold are merged. Only chunks of the same source are merged:
+removal and source filters go by each chunk's own 'source', so a chunk that
+stood in for another PDF's text would vanish with the wrong file. The
+surviving chunk keeps the provenance of every chunk folded into it.
+"""
+import re
+import hashlib
+import logging
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+# Import config
+try:
+    from app.config import config
+except ImportError:
+    from config import config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_EMPTY_SLOT = np.iinfo(np.uint64).max
+_PROVENANCE_KEYS = ("source", "page", "section", "chunk_id")
+
+
+def _shingles(text: str, size: int) -> set:
+    """Word n-gram shingles of normalized text"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _hash_shingles(shingles: set) -> np.ndarray:
+    """Stable 64-bit hashes for a set of shingles"""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+         for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) so the LSH S-curve crosses below the threshold"""
+    # Bias towards recall; candidates are verified against the threshold anyway
+    target = max(0.05, threshold - 0.15)
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if bands == 0:
+            break
+        gap = abs((1.0 / bands) ** (1.0 / rows) - target)
+        if gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class MinHasher:
+    """MinHash signatures using multiply-shift hashing over uint64"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Odd multipliers keep multiply-shift hashing universal
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str, shingle_size: int = 3) -> np.ndarray:
+        hashes = _hash_shingles(_shingles(text, shingle_size))
+        if hashes.size == 0:
+            return np.full(self.num_perm, _EMPTY_SLOT, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            mixed = self._a[:, None] * hashes[None, :] + self._b[:, None]
+        return (mixed >> np.uint64(32)).min(axis=1)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def deduplicate_chunks(chunks: List[Dict[str, Any]],
+                       threshold: float = None,
+                       num_perm: int = None,
+                       shingle_size: int = None,
+                       text_key: str = "content") -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Merge near-duplicate chunks within each source.
+
+    Args:
+        chunks: Chunk dicts as produced by the ingest scripts.
+        threshold: Minimum estimated Jaccard similarity for two chunks to merge.
+        num_perm: Number of MinHash permutations per signature.
+        shingle_size: Words per shingle.
+        text_key: Key holding the chunk text.
+
+    Returns:
+        (kept_chunks, report) where each kept chunk lists every merged chunk
+        under 'merged_sources' and report counts the vectors saved.
+    """
+    threshold = config.dedup_threshold if threshold is None else threshold
+    num_perm = config.dedup_num_perm if num_perm is None else num_perm
+    shingle_size = config.dedup_shingle_size if shingle_size is None else shingle_size
+
+    report = {
+        "input_chunks": len(chunks),
+        "kept_chunks": len(chunks),
+        "vectors_saved": 0,
+        "clusters_merged": 0,
+        "threshold": threshold
+    }
+    if len(chunks) < 2:
+        return list(chunks), report
+
+    hasher = MinHasher(num_perm)
+    signatures = np.vstack([hasher.signature(c.get(text_key, ""), shingle_size) for c in chunks])
+
+    # LSH banding: chunks of one source sharing any band are candidate pairs
+    bands, rows = _choose_bands(num_perm, threshold)
+    parent = list(range(len(chunks)))
+    sources = [c.get("source") for c in chunks]
+    for band in range(bands):
+        buckets: Dict[Tuple[Any, bytes], List[int]] = {}
+        band_slice = signatures[:, band * rows:(band + 1) * rows]
+        for idx in range(len(chunks)):
+            buckets.setdefault((sources[idx], band_slice[idx].tobytes()), []).append(idx)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                root_a, root_b = _find(parent, first), _find(parent, other)
+                if root_a == root_b:
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[int, List[int]] = {}
+    for idx in range(len(chunks)):
+        clusters.setdefault(_find(parent, idx), []).append(idx)
+
+    kept = []
+    for members in clusters.values():
+        # Keep the longest text so overlap windows lose nothing
+        keep_idx = max(members, key=lambda i: (len(chunks[i].get(text_key, "")), -i))
+        chunk = dict(chunks[keep_idx])
+        if len(members) > 1:
+            chunk["merged_sources"] = [
+                {key: chunks[i][key] for key in _PROVENANCE_KEYS if key in chunks[i]}
+                for i in members
+            ]
+            chunk["duplicates_merged"] = len(members) - 1
+            report["clusters_merged"] += 1
+        kept.append((keep_idx, chunk))
+
+    kept.sort(key=lambda item: item[0])
+    kept_chunks = [chunk for _, chunk in kept]
+
+    report["kept_chunks"] = len(kept_chunks)
+    report["vectors_saved"] = len(chunks) - len(kept_chunks)
+    logger.info(
+        f"🧹 Dedup: {report['input_chunks']} → {report['kept_chunks']} chunks "
+        f"({report['vectors_saved']} vectors saved, threshold {threshold})"
+    )
+    return kept_chunks, report
@@ -0,0 +1,156 @@
+"""
+Persistent cache of extracted PDF page text.
+
+Text extraction is the slowest part of ingestion after embedding, and its
+output only depends on the file bytes and the extractor. Pages are stored
+per (file sha256, page number, extractor version) in SQLite, so re-ingests
+and chunking experiments skip extraction for unchanged files. Bump the
+extractor version whenever extraction or cleaning changes.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Import config
+try:
+    from app.config import config
+    from app.uploads import hash_file
+except ImportError:
+    from config import config
+    from uploads import hash_file
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    sha256 TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    extract_seconds REAL NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (sha256, extractor)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    sha256 TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (sha256, extractor, page)
+);
+"""
+
+
+class ExtractCache:
+    """SQLite page-text cache with hit statistics; one connection per thread"""
+
+    def __init__(self, path: Optional[Path] = None, enabled: Optional[bool] = None):
+        self.path = Path(path) if path else config.extract_cache_path
+        self.enabled = config.extract_cache_enabled if enabled is None else enabled
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._initialized = False
+        self.reset_stats()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.files_hit = 0
+            self.files_missed = 0
+            self.pages_reused = 0
+            self.pages_extracted = 0
+            self.seconds_saved = 0.0
+
+    def get(self, sha256: str, extractor: str) -> Optional[List[str]]:
+        """Page texts for a file, or None unless every page is cached"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT page_count, extract_seconds FROM files WHERE sha256 = ? AND extractor = ?",
+            (sha256, extractor)
+        ).fetchone()
+        if row is None:
+            return None
+        page_count, extract_seconds = row
+        pages = conn.execute(
+            "SELECT text FROM pages WHERE sha256 = ? AND extractor = ? ORDER BY page",
+            (sha256, extractor)
+        ).fetchall()
+        if len(pages) != page_count:
+            return None
+        with self._stats_lock:
+            self.files_hit += 1
+            self.pages_reused += page_count
+            self.seconds_saved += extract_seconds
+        return [text for (text,) in pages]
+
+    def put(self, sha256: str, extractor: str, pages: List[str], extract_seconds: float = 0.0):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM pages WHERE sha256 = ? AND extractor = ?", (sha256, extractor))
+            conn.executemany(
+                "INSERT INTO pages (sha256, extractor, page, text) VALUES (?, ?, ?, ?)",
+                [(sha256, extractor, page_num, text) for page_num, text in enumerate(pages, 1)]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO files (sha256, extractor, page_count, extract_seconds, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sha256, extractor, len(pages), extract_seconds, time.time())
+            )
+
+    def pages(self, file_path: Path, extractor: str,
+              extract: Callable[[Path], List[str]]) -> List[str]:
+        """Cached page texts for a PDF, running `extract` only on a miss"""
+        if not self.enabled:
+            return extract(file_path)
+
+        sha256 = hash_file(file_path)
+        try:
+            cached = self.get(sha256, extractor)
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        pages = extract(file_path)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.files_missed += 1
+            self.pages_extracted += len(pages)
+        try:
+            self.put(sha256, extractor, pages, elapsed)
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache write failed: {e}")
+        return pages
+
+    def report(self) -> Dict[str, float]:
+        with self._stats_lock:
+            files = self.files_hit + self.files_missed
+            return {
+                "enabled": self.enabled,
+                "files_hit": self.files_hit,
+                "files_missed": self.files_missed,
+                "hit_rate": round(self.files_hit / files, 3) if files else 0.0,
+                "pages_reused": self.pages_reused,
+                "pages_extracted": self.pages_extracted,
+                "seconds_saved": round(self.seconds_saved, 2)
+            }
+
+
+extract_cache = ExtractCache()
@@ -0,0 +1,142 @@
+"""
+Compressed FAISS index types with exact re-scoring.
+
+"flat" keeps full float32 vectors (4 bytes per dimension). "sq8" stores one
+byte per dimension and "pq" splits each vector into pq_m sub-vectors coded
+with pq_nbits bits each. Both compressed types lose a little ranking
+precision. The full vectors are therefore kept in a memory-mapped .npy file
+next to the index, and a few times k candidates from the compressed scan are
+re-ranked with exact L2 distances. Only the candidates' rows are paged in.
+
+A sharded store trains its quantizer (the "codebook") once on the whole
+corpus, and every shard starts from a copy of it. Small shards therefore
+neither fall back to sq8 nor train PQ centroids on a handful of vectors.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Optional, Tuple
+
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+# Import config
+try:
+    from app.config import config
+except ImportError:
+    from config import config
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "sq8", "pq")
+
+
+def _pq_subquantizers(dimension: int, wanted: int) -> int:
+    """Largest divisor of the dimension not above the wanted number of sub-quantizers"""
+    for m in range(min(wanted, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def train_codebook(vectors: np.ndarray, index_type: Optional[str] = None,
+                   pq_m: Optional[int] = None, pq_nbits: Optional[int] = None) -> faiss.Index:
+    """Empty index of the configured type with its quantizer trained on these vectors"""
+    index_type = index_type or config.index_type
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {', '.join(INDEX_TYPES)}")
+    count, dimension = vectors.shape
+
+    if index_type == "pq":
+        nbits = pq_nbits or config.pq_nbits
+        if count < (1 << nbits):
+            # k-means needs at least one training point per centroid
+            logger.warning(f"⚠️  {count} vectors are too few to train PQ with {nbits} bits, using sq8")
+            index_type = "sq8"
+        else:
+            m = _pq_subquantizers(dimension, pq_m or config.pq_m)
+            index = faiss.IndexPQ(dimension, m, nbits)
+            index.train(vectors)
+
+    if index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        index.train(vectors)
+    elif index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    return index
+
+
+def trained_copy(index: faiss.Index) -> faiss.Index:
+    """Empty index sharing the trained quantizer of `index` (which may be memory-mapped)"""
+    if not is_compressed(index):
+        return faiss.IndexFlatL2(index.d)
+    copy = faiss.deserialize_index(faiss.serialize_index(index))
+    copy.reset()
+    return copy
+
+
+def build_index(vectors: np.ndarray, index_type: Optional[str] = None,
+                pq_m: Optional[int] = None, pq_nbits: Optional[int] = None,
+                codebook: Optional[faiss.Index] = None) -> faiss.Index:
+    """Fill an index of the configured type; a trained `codebook` is copied instead of training again"""
+    if codebook is not None:
+        index = trained_copy(codebook)
+    else:
+        index = train_codebook(vectors, index_type, pq_m, pq_nbits)
+    index.add(vectors)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return type(index).__name__
+
+
+def is_compressed(index: faiss.Index) -> bool:
+    return index_type_of(index) in ("sq8", "pq")
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    """IndexPQ rejects search parameters, so ID selectors cannot filter its scan"""
+    return index_type_of(index) != "pq"
+
+
+def code_bytes(index: faiss.Index) -> int:
+    """Bytes of vector codes held by the index"""
+    code_size = getattr(index, "code_size", index.d * 4)
+    return index.ntotal * code_size
+
+
+def rescore(query: np.ndarray, candidates: np.ndarray, vectors: np.ndarray,
+            k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact L2 distances for candidate ids, best k first"""
+    candidates = candidates[(candidates >= 0) & (candidates < len(vectors))]
+    if len(candidates) == 0:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+    # Sorted ids read the memory-mapped rows in file order
+    ids = np.sort(candidates)
+    rows = np.asarray(vectors[ids], dtype="float32")
+    distances = ((rows - query) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return distances[order].astype("float32"), ids[order]
+
+
+def search_subset(index: faiss.Index, query: np.ndarray, ids: np.ndarray,
+                  vectors: Optional[np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Scan an explicit id subset (filtered search on index types without selector support)"""
+    if vectors is not None:
+        return rescore(query, ids, vectors, k)
+    rows = index.reconstruct_batch(ids.astype("int64"))
+    distances = ((rows - query) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return distances[order].astype("float32"), ids[order]
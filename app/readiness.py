@@ -0,0 +1,81 @@
+"""
+Startup readiness tracking.
+
+The process binds its port straight away and loads the index in the
+background. Until that finishes, /health/live answers 200 (the process is
+up), /health/ready answers 503, and other requests get a fast 503 with a
+Retry-After header instead of waiting on the load.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTING = "starting"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# Reachable while the index is loading; the UI page only reports the index status
+UNGATED_EXACT_PATHS = ["/", "/favicon.ico", "/openapi.json"]
+UNGATED_PREFIXES = ["/health", "/metrics", "/static/", "/docs"]
+
+# Exact paths match whole; prefixes match themselves or anything below them
+_UNGATED_PATH_RE = re.compile(
+    "^(?:"
+    + "|".join(re.escape(p) for p in UNGATED_EXACT_PATHS)
+    + ")$|^(?:"
+    + "|".join(re.escape(p.rstrip("/")) + "(?:/|$)" for p in UNGATED_PREFIXES)
+    + ")"
+)
+
+
+class Readiness:
+    """Phase of the startup load, shared by the gate middleware and health endpoints"""
+
+    def __init__(self):
+        self.phase = STARTING
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.load_started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == READY
+
+    @property
+    def gating(self) -> bool:
+        """Requests are turned away only while the load is still pending"""
+        return self.phase in (STARTING, LOADING)
+
+    def begin(self):
+        self.phase = LOADING
+        self.load_started_at = time.time()
+
+    def mark_ready(self):
+        self.phase = READY
+        self.ready_at = time.time()
+        logger.info(f"✅ Ready {self.ready_at - self.started_at:.2f}s after start")
+
+    def mark_failed(self, error: str):
+        self.phase = FAILED
+        self.error = error
+        self.ready_at = time.time()
+        logger.error(f"❌ Startup load failed: {error}")
+
+    @staticmethod
+    def is_ungated(path: str) -> bool:
+        return _UNGATED_PATH_RE.match(path) is not None
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "error": self.error,
+            "uptime_seconds": round(now - self.started_at, 3),
+            "loading_seconds": round((self.ready_at or now) - self.load_started_at, 3) if self.load_started_at else None
+        }
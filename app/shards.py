@@ -0,0 +1,313 @@
+"""
+Bounded index shards with parallel scatter-gather search.
+
+Source documents are packed, in order, into shards of up to
+shard_max_chunks chunks. A source stays in one shard unless it is larger
+than that. A shard is three files under <vector store>/shards/:
+<id>.index (FAISS), <id>.pkl (chunk text and metadata) and, for compressed
+index types, <id>.npy (re-scoring vectors). shards.json lists the shards in
+order, which is also the order of the store's global chunk positions.
+Adding, replacing or removing a document therefore rewrites only the
+shards holding it. codebook.index is the store's trained, empty index; new
+shards start from a copy of it, so every shard shares one quantizer.
+
+A search fans out across shards on a thread pool. Each shard returns its best
+k with distances already sorted, and heapq.merge keeps the global top k.
+Packing keeps the shard count, and so the fan-out cost, proportional to the
+corpus size rather than to the number of documents.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import logging
+import os
+import pickle
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+# Import config
+try:
+    from app.config import config
+    from app.filters import IndexFilter
+    from app.quantization import build_index, trained_copy, index_type_of, is_compressed, code_bytes, rescore, supports_selector, search_subset
+except ImportError:
+    from config import config
+    from filters import IndexFilter
+    from quantization import build_index, trained_copy, index_type_of, is_compressed, code_bytes, rescore, supports_selector, search_subset
+
+logger = logging.getLogger(__name__)
+
+SHARDS_DIR = "shards"
+SHARDS_MANIFEST = "shards.json"
+CODEBOOK_FILE = "codebook.index"
+LEGACY_SHARD = "legacy"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Shard:
+    """One index file with the chunks it holds, positions 0..n-1"""
+
+    def __init__(self, shard_id: str, index: faiss.Index, chunks: List[str], metadata: List[Dict[str, Any]],
+                 vectors: Optional[np.ndarray] = None, mmapped: bool = False, dirty: bool = True):
+        self.id = shard_id
+        self.index = index
+        self.chunks = chunks
+        self.metadata = metadata
+        # Full-precision vectors for re-scoring a compressed index (memory-mapped once loaded)
+        self.vectors = vectors
+        # True when the index is a read-only mapping of the file on disk
+        self.mmapped = mmapped
+        # Changed since it was last written
+        self.dirty = dirty
+        self.sources = sorted({meta.get("source", "unknown") for meta in metadata})
+
+    @classmethod
+    def build(cls, shard_id: str, vectors: np.ndarray, chunks: List[str], metadata: List[Dict[str, Any]],
+              codebook: Optional[faiss.Index] = None) -> "Shard":
+        index = build_index(vectors, codebook=codebook)
+        return cls(shard_id, index, chunks, metadata, vectors if is_compressed(index) else None)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def index_type(self) -> str:
+        return index_type_of(self.index)
+
+    def memory_bytes(self) -> int:
+        return code_bytes(self.index)
+
+    def _writable_index(self) -> faiss.Index:
+        """Private copy to modify; other searches may be scanning this one"""
+        if self.mmapped:
+            # A clone of a mapped index still views the file, and writing to it aborts
+            return faiss.deserialize_index(faiss.serialize_index(self.index))
+        return faiss.clone_index(self.index)
+
+    def with_added(self, vectors: np.ndarray, chunks: List[str], metadata: List[Dict[str, Any]]) -> "Shard":
+        """A copy with chunks appended; in-flight searches keep the old one"""
+        index = self._writable_index()
+        index.add(vectors)
+        kept = np.vstack([self.vectors, vectors]) if self.vectors is not None else None
+        return Shard(self.id, index, self.chunks + list(chunks), self.metadata + list(metadata), kept)
+
+    def without(self, positions: List[int]) -> "Shard":
+        """A copy with the given local positions removed"""
+        index = self._writable_index()
+        # Flat indexes compact on removal, so positions stay aligned with chunks
+        index.remove_ids(faiss.IDSelectorBatch(np.array(positions, dtype="int64")))
+        doomed = set(positions)
+        kept = np.delete(self.vectors, positions, axis=0) if self.vectors is not None else None
+        return Shard(self.id, index,
+                     [c for i, c in enumerate(self.chunks) if i not in doomed],
+                     [m for i, m in enumerate(self.metadata) if i not in doomed], kept)
+
+    def search(self, query: np.ndarray, k: int, offset: int,
+               mask: Optional[np.ndarray] = None) -> List[Tuple[float, int]]:
+        """Best k (distance, global position) pairs, closest first"""
+        if len(self.chunks) == 0 or (mask is not None and not mask.any()):
+            return []
+        search_params = None
+        index_filter = None
+        if mask is not None:
+            if not supports_selector(self.index):
+                # Index type without selector support: scan just the matching rows
+                distances, ids = search_subset(self.index, query[0], np.flatnonzero(mask), self.vectors, k)
+                return [(float(d), offset + int(i)) for d, i in zip(distances, ids)]
+            index_filter = IndexFilter(mask)
+            search_params = index_filter.params
+
+        # A compressed index over-fetches and re-ranks with exact distances
+        if self.vectors is not None and config.rescore_enabled:
+            _, candidates = self.index.search(query, k * config.rescore_factor, params=search_params)
+            distances, ids = rescore(query[0], candidates[0], self.vectors, k)
+        else:
+            distances, ids = self.index.search(query, k, params=search_params)
+            distances, ids = distances[0], ids[0]
+        return [(float(d), offset + int(i)) for d, i in zip(distances, ids) if i >= 0]
+
+
+def shard_id(source: str, part: int = 0) -> str:
+    """File-safe, stable shard name for one part of a source document"""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", os.path.splitext(source)[0]).strip("_-")[:40] or "source"
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}-{digest}-{part}"
+
+
+def plan_shards(metadata: List[Dict[str, Any]], max_chunks: Optional[int] = None,
+                taken: Optional[set] = None) -> List[Tuple[str, List[int]]]:
+    """Pack chunk positions into shards of at most max_chunks, keeping each source whole when it fits"""
+    max_chunks = max_chunks or config.shard_max_chunks
+    taken = set(taken or ())
+    by_source: Dict[str, List[int]] = {}
+    for i, meta in enumerate(metadata):
+        by_source.setdefault(meta.get("source", "unknown"), []).append(i)
+
+    groups: List[List[int]] = []
+    current: List[int] = []
+    for positions in by_source.values():
+        # A source that fits in a shard of its own is not split across two
+        if current and len(current) + len(positions) > max_chunks and len(positions) <= max_chunks:
+            groups.append(current)
+            current = []
+        for position in positions:
+            if len(current) == max_chunks:
+                groups.append(current)
+                current = []
+            current.append(position)
+    if current:
+        groups.append(current)
+
+    plan = []
+    for positions in groups:
+        # Named after the first source in the shard
+        source = metadata[positions[0]].get("source", "unknown")
+        part = 0
+        while shard_id(source, part) in taken:
+            part += 1
+        name = shard_id(source, part)
+        taken.add(name)
+        plan.append((name, positions))
+    return plan
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.search_threads, thread_name_prefix="shard-search")
+        return _executor
+
+
+def search_shards(shards: List[Shard], offsets: List[int], query: np.ndarray, k: int,
+                  mask: Optional[np.ndarray] = None) -> Tuple[List[float], List[int]]:
+    """Scatter the query over shards, gather the global top k"""
+    jobs = []
+    for shard, offset in zip(shards, offsets):
+        shard_mask = mask[offset:offset + len(shard)] if mask is not None else None
+        # A filter that excludes a whole shard skips it without a FAISS call
+        if len(shard) and (shard_mask is None or shard_mask.any()):
+            jobs.append((shard, offset, shard_mask))
+
+    if len(jobs) <= 1 or config.search_threads <= 1:
+        per_shard = [shard.search(query, k, offset, shard_mask) for shard, offset, shard_mask in jobs]
+    else:
+        futures = [_pool().submit(shard.search, query, k, offset, shard_mask) for shard, offset, shard_mask in jobs]
+        per_shard = [future.result() for future in futures]
+
+    best = list(islice(heapq.merge(*per_shard), k))
+    return [d for d, _ in best], [i for _, i in best]
+
+
+def shard_files(directory: Path, name: str) -> Dict[str, Path]:
+    base = directory / SHARDS_DIR
+    return {"index": base / f"{name}.index", "chunks": base / f"{name}.pkl", "vectors": base / f"{name}.npy"}
+
+
+def _replace(path: Path, write) -> None:
+    """Write through a temp file so readers never see a partial file"""
+    tmp = str(path) + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def write_shard(directory: Path, shard: Shard):
+    files = shard_files(directory, shard.id)
+    files["index"].parent.mkdir(parents=True, exist_ok=True)
+    _replace(files["index"], lambda tmp: faiss.write_index(shard.index, tmp))
+
+    def dump_chunks(tmp):
+        with open(tmp, "wb") as f:
+            pickle.dump({"chunks": shard.chunks, "metadata": shard.metadata}, f)
+    _replace(files["chunks"], dump_chunks)
+
+    if shard.vectors is not None:
+        def dump_vectors(tmp):
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(shard.vectors, dtype="float32"))
+        _replace(files["vectors"], dump_vectors)
+    elif files["vectors"].exists():
+        os.remove(files["vectors"])
+    shard.dirty = False
+
+
+def read_index(index_path: Path) -> Tuple[faiss.Index, bool]:
+    """Map the index read-only when configured so workers share its pages"""
+    if config.mmap_index:
+        try:
+            # IO_FLAG_MMAP still copies flat codes into private memory; MMAP_IFC views the file
+            return faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP_IFC), True
+        except RuntimeError as e:
+            # Not every index type supports mapping; fall back to a private copy
+            logger.info(f"Index cannot be memory-mapped ({e}), reading into memory")
+    return faiss.read_index(str(index_path)), False
+
+
+def read_vectors(vectors_path: Path, index: faiss.Index) -> Optional[np.ndarray]:
+    """Memory-map the re-scoring vectors of a compressed index"""
+    if not is_compressed(index):
+        return None
+    if not vectors_path.exists():
+        logger.warning(f"⚠️  No {vectors_path.name} next to the {index_type_of(index)} index, "
+                       f"searching without exact re-scoring")
+        return None
+    vectors = np.load(vectors_path, mmap_mode="r")
+    if len(vectors) != index.ntotal:
+        logger.warning(f"⚠️  Re-scoring vectors in {vectors_path.name} do not match the index, ignoring them")
+        return None
+    return vectors
+
+
+def read_shard(directory: Path, name: str) -> Shard:
+    files = shard_files(directory, name)
+    index, mmapped = read_index(files["index"])
+    with open(files["chunks"], "rb") as f:
+        data = pickle.load(f)
+    if index.ntotal != len(data["chunks"]):
+        raise ValueError(f"Shard {name} has {index.ntotal} vectors for {len(data['chunks'])} chunks")
+    return Shard(name, index, data["chunks"], data["metadata"], read_vectors(files["vectors"], index),
+                 mmapped=mmapped, dirty=False)
+
+
+def write_codebook(directory: Path, codebook: Optional[faiss.Index]):
+    path = directory / CODEBOOK_FILE
+    if codebook is not None:
+        _replace(path, lambda tmp: faiss.write_index(codebook, tmp))
+    elif path.exists():
+        os.remove(path)
+
+
+def read_codebook(directory: Path) -> Optional[faiss.Index]:
+    """The store's trained empty index, if it was saved with one"""
+    path = directory / CODEBOOK_FILE
+    return faiss.read_index(str(path)) if path.exists() else None
+
+
+def remove_stale_files(directory: Path, keep: List[str]):
+    """Delete shard files no longer listed in the manifest"""
+    base = directory / SHARDS_DIR
+    if not base.exists():
+        return
+    keep = set(keep)
+    for path in base.iterdir():
+        name = path.name.split(".", 1)[0]
+        if name not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove stale shard file {path.name}: {e}")
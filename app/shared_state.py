@@ -0,0 +1,169 @@
+"""
+Small cross-process store for multi-worker deployments.
+
+Each uvicorn worker keeps its own vector store, LLM client and task table.
+This SQLite file is the one thing they share: version counters that tell a
+worker to reload its index or config, and task snapshots so progress can be
+read from whichever worker happens to serve the request. Writers of an index
+also serialize on a lock file next to it (index_write_lock).
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker only
+    fcntl = None
+
+# Import config
+try:
+    from app.config import config
+except ImportError:
+    from config import config
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = "index_version"
+CONFIG_VERSION = "config_version"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, updated);
+"""
+
+
+class SharedState:
+    """SQLite-backed key/value and task store; one connection per thread"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else config.shared_state_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    # ---- key/value ----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        self._conn().execute(
+            "INSERT INTO kv (key, value, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+            (key, json.dumps(value), time.time())
+        )
+
+    def bump(self, key: str) -> int:
+        """Atomically increment a counter and return the new value"""
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO kv (key, value, updated) VALUES (?, '1', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1, updated = excluded.updated",
+            (key, time.time())
+        )
+        return self.get(key, 0)
+
+    def versions(self) -> Dict[str, int]:
+        """Index and config versions in one read (checked on every request)"""
+        rows = self._conn().execute(
+            "SELECT key, value FROM kv WHERE key IN (?, ?)", (INDEX_VERSION, CONFIG_VERSION)
+        ).fetchall()
+        found = {key: json.loads(value) for key, value in rows}
+        return {INDEX_VERSION: found.get(INDEX_VERSION, 0), CONFIG_VERSION: found.get(CONFIG_VERSION, 0)}
+
+    # ---- tasks ----
+
+    def put_task(self, task_id: str, snapshot: Dict[str, Any]):
+        self._conn().execute(
+            "INSERT INTO tasks (task_id, status, data, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, data = excluded.data, "
+            "updated = excluded.updated",
+            (task_id, snapshot.get("status", "pending"), json.dumps(snapshot), time.time())
+        )
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_tasks(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recently updated tasks first"""
+        if status:
+            rows = self._conn().execute(
+                "SELECT data FROM tasks WHERE status = ? ORDER BY updated DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT data FROM tasks ORDER BY updated DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune_tasks(self, keep: int):
+        """Delete finished tasks beyond the newest `keep`"""
+        self._conn().execute(
+            "DELETE FROM tasks WHERE status IN ('completed', 'failed', 'cancelled') AND task_id NOT IN ("
+            "SELECT task_id FROM tasks WHERE status IN ('completed', 'failed', 'cancelled') "
+            "ORDER BY updated DESC LIMIT ?)",
+            (keep,)
+        )
+
+
+shared_state = SharedState()
+
+
+def publish_index_change(key: str = INDEX_VERSION):
+    """Tell every worker the on-disk index changed; never fails the caller"""
+    try:
+        return shared_state.bump(key)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not publish index change: {e}")
+        return None
+
+
+@contextmanager
+def index_write_lock(key: str = INDEX_VERSION):
+    """
+    Exclusive cross-process lock for changing the index published under `key`.
+    Blocks until other writers (workers, ingest.py) have saved.
+    """
+    path = config.shared_state_path.parent / f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', key)}.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
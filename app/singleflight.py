@@ -0,0 +1,108 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers that ask for the same key share one in-flight
+execution. Blocking calls share the final result; streamed calls share a
+broadcast that replays what has been produced so far to late joiners.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+try:
+    from app.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Broadcast:
+    """Append-only chunk buffer that any number of subscribers can follow"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.chunks) or self.done)
+                pending = self.chunks[position:]
+                finished = self.done
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if finished and position >= len(self.chunks):
+                return
+
+
+class SingleFlight:
+    """Deduplicates concurrent work by key"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    def _forget(self, table: Dict[str, Any], key: str, value: Any):
+        if table.get(key) is value:
+            del table[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        The shared work runs as its own task, so a caller disconnecting does
+        not cancel it for the others. Returns (result, shared).
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(self._calls, key, t))
+            # Mark the exception retrieved even if every caller went away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        else:
+            metrics.incr("singleflight_coalesced")
+            logger.info(f"🔗 Coalesced request onto in-flight pipeline ({len(key)} char key)")
+        return await asyncio.shield(task), shared
+
+    def stream(self, key: str, producer: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Follow the in-flight stream for key, starting one from producer() if needed"""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+
+            async def pump():
+                try:
+                    async for chunk in producer():
+                        await broadcast.publish(chunk)
+                except Exception as e:
+                    logger.error(f"Streamed pipeline failed: {e}")
+                    await broadcast.publish(f"\nSystem error: {str(e)}")
+                finally:
+                    await broadcast.close()
+                    self._forget(self._streams, key, broadcast)
+
+            asyncio.ensure_future(pump())
+        else:
+            metrics.incr("singleflight_coalesced_streams")
+        return broadcast.subscribe()
@@ -0,0 +1,171 @@
+"""
+Child processes whose output is streamed without blocking the event loop.
+
+Output is read with asyncio subprocess pipes, split into lines on \\n or \\r
+(progress bars from `ollama pull` redraw with \\r), kept in a bounded
+history, and fanned out to any number of listeners. Late listeners get the
+history replayed first. terminate() really stops the child.
+"""
+import asyncio
+import logging
+import re
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+_ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+class StreamedProcess:
+    """One child process and the listeners following its output"""
+
+    def __init__(self, name: str, args: List[str], cwd: Optional[str] = None,
+                 env: Optional[Dict[str, str]] = None, history: int = 500,
+                 on_exit: Optional[Callable[[int], Awaitable[List[str]]]] = None):
+        self.name = name
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.on_exit = on_exit
+        self.history = deque(maxlen=history)
+        self.returncode: Optional[int] = None
+        self.done = False
+        self.cancelled = False
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._listeners: Set[asyncio.Queue] = set()
+        self._line_callbacks: List[Callable[[str], None]] = []
+        self._finished = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    async def start(self) -> "StreamedProcess":
+        self._process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.DEVNULL,
+            cwd=self.cwd,
+            env=self.env
+        )
+        logger.info(f"▶️  Started {self.name} (pid {self._process.pid})")
+        self._pump_task = asyncio.create_task(self._pump())
+        return self
+
+    def on_line(self, callback: Callable[[str], None]):
+        """Synchronous per-line callback, run on the event loop (keep it cheap)"""
+        self._line_callbacks.append(callback)
+
+    def _emit(self, line: str):
+        self.history.append(line)
+        for callback in self._line_callbacks:
+            try:
+                callback(line)
+            except Exception as e:
+                logger.warning(f"{self.name} line callback failed: {e}")
+        for queue in self._listeners:
+            queue.put_nowait(line)
+
+    async def _pump(self):
+        pending = ""
+        try:
+            while True:
+                chunk = await self._process.stdout.read(4096)
+                if not chunk:
+                    break
+                pending += _ANSI_RE.sub("", chunk.decode("utf-8", errors="replace"))
+                parts = _LINE_BREAK_RE.split(pending)
+                pending = parts.pop()
+                for part in parts:
+                    if part.strip():
+                        self._emit(part + "\n")
+            if pending.strip():
+                self._emit(pending + "\n")
+
+            self.returncode = await self._process.wait()
+            if self.on_exit:
+                try:
+                    for line in await self.on_exit(self.returncode):
+                        self._emit(line)
+                except Exception as e:
+                    logger.error(f"{self.name} exit handler failed: {e}")
+                    self._emit(f"❌ {e}\n")
+        finally:
+            self.done = True
+            self._finished.set()
+            for queue in self._listeners:
+                queue.put_nowait(None)
+            logger.info(f"⏹️  {self.name} exited with code {self.returncode}")
+
+    async def listen(self, replay: bool = True) -> AsyncIterator[str]:
+        """Lines as they arrive; disconnecting a listener does not stop the process"""
+        queue: asyncio.Queue = asyncio.Queue()
+        if replay:
+            for line in list(self.history):
+                queue.put_nowait(line)
+        if self.done:
+            queue.put_nowait(None)
+        else:
+            self._listeners.add(queue)
+        try:
+            while True:
+                line = await queue.get()
+                if line is None:
+                    return
+                yield line
+        finally:
+            self._listeners.discard(queue)
+
+    async def wait(self) -> Optional[int]:
+        await self._finished.wait()
+        return self.returncode
+
+    async def terminate(self, grace: float = 5.0):
+        """SIGTERM, then SIGKILL if the child has not exited within `grace` seconds"""
+        if self._process is None or self._process.returncode is not None:
+            return
+        self.cancelled = True
+        self._process.terminate()
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=grace)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} ignored SIGTERM, killing")
+            self._process.kill()
+        await self.wait()
+
+
+class ProcessManager:
+    """Named singleton processes, so a second caller attaches instead of starting a duplicate"""
+
+    def __init__(self):
+        self._processes: Dict[str, StreamedProcess] = {}
+        self._lock = asyncio.Lock()
+
+    def get(self, name: str) -> Optional[StreamedProcess]:
+        process = self._processes.get(name)
+        return process if process and not process.done else None
+
+    async def start_or_attach(self, name: str, args: List[str], **kwargs) -> Tuple[StreamedProcess, bool]:
+        """(process, started) where started is False if an existing run was joined"""
+        async with self._lock:
+            running = self.get(name)
+            if running:
+                return running, False
+            process = StreamedProcess(name, args, **kwargs)
+            await process.start()
+            self._processes[name] = process
+            return process, True
+
+    async def terminate(self, name: str) -> bool:
+        process = self.get(name)
+        if not process:
+            return False
+        await process.terminate()
+        return True
+
+
+process_manager = ProcessManager()
@@ -0,0 +1,151 @@
+"""
+Server-sent events for background task progress.
+
+TaskRegistry updates arrive from worker threads; the bus numbers them,
+keeps a bounded replay buffer for Last-Event-ID resume, and hands them to
+each subscriber's asyncio queue with call_soon_threadsafe.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+try:
+    from app.tasks import TERMINAL_STATUSES
+except ImportError:
+    from tasks import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(data: Dict[str, Any], event: str = "progress", event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("loop", "queue", "task_id", "overflowed")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, task_id: Optional[str], max_queue: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.task_id = task_id
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]):
+        """Runs on the subscriber's loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client; end its stream so it reconnects and resumes from its last id
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class TaskEventBus:
+    """Fan-out of task progress deltas to SSE subscribers"""
+
+    def __init__(self, buffer_size: int = 1000, max_queue: int = 256):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: List[_Subscriber] = []
+        self._max_queue = max_queue
+
+    def publish(self, delta: Dict[str, Any]):
+        """Called from any thread; never blocks on subscribers"""
+        with self._lock:
+            self._seq += 1
+            event = dict(delta, id=self._seq)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+
+        for sub in subscribers:
+            if sub.task_id is None or sub.task_id == event["task_id"]:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.offer, event)
+                except RuntimeError:
+                    # Loop already closed
+                    self._remove(sub)
+
+    def _remove(self, sub: _Subscriber):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def _backlog(self, last_event_id: Optional[int], task_id: Optional[str]):
+        """Buffered events after last_event_id, or None if the buffer no longer reaches back that far"""
+        with self._lock:
+            if last_event_id is None or last_event_id > self._seq:
+                return None
+            if self._buffer and last_event_id < self._buffer[0]["id"] - 1:
+                return None
+            return [e for e in self._buffer
+                    if e["id"] > last_event_id and (task_id is None or e["task_id"] == task_id)]
+
+    async def stream(self, task_id: Optional[str] = None, last_event_id: Optional[int] = None,
+                     snapshot: Optional[Callable[[], Any]] = None,
+                     heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """
+        SSE frames for one task (closing once it finishes) or for all tasks.
+        `snapshot` supplies full state when there is nothing to resume from.
+        """
+        sub = _Subscriber(asyncio.get_running_loop(), task_id, self._max_queue)
+        with self._lock:
+            self._subscribers.append(sub)
+
+        try:
+            yield "retry: 3000\n\n"
+
+            backlog = self._backlog(last_event_id, task_id)
+            if backlog is None:
+                # Take the id first: an update racing the snapshot is then re-sent, not lost
+                with self._lock:
+                    current = self._seq
+                state = snapshot() if snapshot else None
+                if state is not None:
+                    yield format_sse(state, event="snapshot", event_id=current)
+                    if task_id and state.get("status") in TERMINAL_STATUSES:
+                        return
+                    last_event_id = current
+                backlog = []
+
+            for event in backlog:
+                yield format_sse(event, event_id=event["id"])
+                last_event_id = event["id"]
+                if task_id and event["status"] in TERMINAL_STATUSES:
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if event is None:
+                    return
+                # Already delivered from the backlog
+                if last_event_id is not None and event["id"] <= last_event_id:
+                    continue
+                yield format_sse(event, event_id=event["id"])
+                if task_id and event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            self._remove(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+task_events = TaskEventBus()
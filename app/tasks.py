@@ -0,0 +1,316 @@
+"""
+Registry for background tasks (reindexing, model installs).
+
+Each task has its own lock and a bounded log, active tasks are indexed
+separately from finished ones, and finished tasks are evicted beyond a
+retention limit. Snapshots can optionally be written to the shared SQLite
+store, so progress survives restarts and other workers can read it. A
+snapshot is written when the status changes, and for progress changes at
+most once per persist_interval; listeners only get the new log line.
+Persisted tasks record the process that owns them, so a task whose worker
+died is marked interrupted instead of staying "running" forever.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+psutil = lazy_import("psutil")
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_owner: Optional[Dict[str, Any]] = None
+
+
+def current_owner() -> Dict[str, Any]:
+    """This process; the start time tells it apart from a later process given the same pid"""
+    global _owner
+    if _owner is None or _owner["pid"] != os.getpid():
+        _owner = {"pid": os.getpid(), "started": psutil.Process().create_time()}
+    return _owner
+
+
+def owner_alive(owner: Optional[Dict[str, Any]]) -> bool:
+    if not owner:
+        return False
+    try:
+        return abs(psutil.Process(owner["pid"]).create_time() - owner["started"]) < 1
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.Error:
+        # Exists but cannot be inspected; assume it is still the owner
+        return True
+
+
+class _Task:
+    __slots__ = ("task_id", "progress", "message", "status", "start_time", "end_time",
+                 "duration", "logs", "lock", "owner", "persisted_status", "persisted_progress",
+                 "persisted_at")
+
+    def __init__(self, task_id: str, max_logs: int, owner: Optional[Dict[str, Any]] = None):
+        self.task_id = task_id
+        self.progress = 0
+        self.message = ""
+        self.status = "pending"
+        self.start_time = datetime.now(timezone.utc).isoformat()
+        self.end_time = None
+        self.duration = None
+        self.logs = deque(maxlen=max_logs)
+        self.lock = threading.Lock()
+        self.owner = owner
+        # What the task store last received, for throttling writes
+        self.persisted_status = None
+        self.persisted_progress = None
+        self.persisted_at = 0.0
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any], max_logs: int) -> "_Task":
+        task = cls(data["task_id"], max_logs, data.get("owner"))
+        task.progress = data.get("progress", 0)
+        task.message = data.get("message", "")
+        task.status = data.get("status", "pending")
+        task.start_time = data.get("start_time", task.start_time)
+        task.end_time = data.get("end_time")
+        task.duration = data.get("duration")
+        task.logs.extend(data.get("logs", []))
+        return task
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = self._fields()
+        data["logs"] = list(self.logs)
+        if self.owner:
+            data["owner"] = self.owner
+        return data
+
+    def event(self, log: Optional[str]) -> Dict[str, Any]:
+        """Progress delta for listeners: the fields plus the one new log line"""
+        data = self._fields()
+        data["log"] = log
+        return data
+
+    def _fields(self) -> Dict[str, Any]:
+        data = {
+            "task_id": self.task_id,
+            "progress": self.progress,
+            "message": self.message,
+            "status": self.status,
+            "start_time": self.start_time
+        }
+        if self.end_time:
+            data["end_time"] = self.end_time
+            data["duration"] = self.duration
+        return data
+
+    def finish(self, status: str):
+        now = datetime.now(timezone.utc)
+        self.status = status
+        self.end_time = now.isoformat()
+        self.duration = (now - datetime.fromisoformat(self.start_time.replace('Z', '+00:00'))).total_seconds()
+
+
+class TaskRegistry:
+    """Thread-safe task table with bounded retention"""
+
+    def __init__(self, max_completed: int = 50, max_logs: int = 100, store=None,
+                 persist_interval: float = 1.0):
+        self.max_completed = max_completed
+        self.max_logs = max_logs
+        self.store = store
+        # Minimum seconds between stored progress updates of one task
+        self.persist_interval = persist_interval
+        # Guards the three maps only; task fields are guarded by each task's lock
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, _Task] = {}
+        self._active: "OrderedDict[str, _Task]" = OrderedDict()
+        self._completed: "OrderedDict[str, _Task]" = OrderedDict()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _get_or_create(self, task_id: str) -> _Task:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                task = _Task(task_id, self.max_logs, current_owner() if self.store is not None else None)
+                self._tasks[task_id] = task
+                self._active[task_id] = task
+            return task
+
+    def _retire(self, task: _Task):
+        """Move a finished task out of the active index, evicting the oldest finished ones"""
+        with self._lock:
+            self._active.pop(task.task_id, None)
+            self._completed[task.task_id] = task
+            self._completed.move_to_end(task.task_id)
+            while len(self._completed) > self.max_completed:
+                evicted, _ = self._completed.popitem(last=False)
+                self._tasks.pop(evicted, None)
+
+    def update(self, task_id: str, progress: int, message: str, status: str = "running") -> Dict[str, Any]:
+        """Record progress; returns the delta sent to listeners"""
+        task = self._get_or_create(task_id)
+        with task.lock:
+            line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+            task.logs.append(line)
+            # A cancelled task stays cancelled even if its worker reports more progress
+            if task.status != "cancelled":
+                task.progress = progress
+                task.message = message
+                if status in TERMINAL_STATUSES:
+                    task.finish(status)
+                else:
+                    task.status = status
+            event = task.event(line)
+            # The full snapshot (with logs) is only copied when it is going to the store
+            snapshot = task.snapshot() if self._due_for_store(task) else None
+
+        finished = event["status"] in TERMINAL_STATUSES
+        if finished:
+            self._retire(task)
+        if snapshot is not None:
+            self._persist(snapshot, prune=finished)
+        self._notify(event)
+        return event
+
+    def _due_for_store(self, task: _Task) -> bool:
+        """Status changes always, progress changes throttled (caller holds task.lock)"""
+        if self.store is None:
+            return False
+        now = time.monotonic()
+        if task.status == task.persisted_status and (
+                task.progress == task.persisted_progress or now - task.persisted_at < self.persist_interval):
+            return False
+        task.persisted_status = task.status
+        task.persisted_progress = task.progress
+        task.persisted_at = now
+        return True
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        """'cancelled', 'not_running', or None if the task is unknown here"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None:
+            return None
+
+        with task.lock:
+            if task.status != "running":
+                return "not_running"
+            line = f"[{datetime.now().strftime('%H:%M:%S')}] Task cancelled by user"
+            task.message = "Task cancelled by user"
+            task.logs.append(line)
+            task.finish("cancelled")
+            event = task.event(line)
+            snapshot = task.snapshot()
+
+        self._retire(task)
+        self._persist(snapshot, prune=True)
+        self._notify(event)
+        return "cancelled"
+
+    def has(self, task_id: str) -> bool:
+        """Whether this process holds the task (as opposed to only the store)"""
+        with self._lock:
+            return task_id in self._tasks
+
+    def is_cancelled(self, task_id: str) -> bool:
+        with self._lock:
+            task = self._tasks.get(task_id)
+        return task is not None and task.status == "cancelled"
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is not None:
+            with task.lock:
+                return task.snapshot()
+
+        # Finished before a restart, evicted, or owned by another worker
+        if self.store is not None:
+            try:
+                return self.store.get_task(task_id)
+            except Exception as e:
+                logger.warning(f"Task store lookup failed: {e}")
+        return None
+
+    def active(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            tasks = list(self._active.values())
+        return [task.snapshot() for task in tasks if task.status == "running"]
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recently finished tasks, oldest first"""
+        with self._lock:
+            tasks = list(self._completed.values())[-limit:]
+        return [task.snapshot() for task in tasks]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._active)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Called with a progress delta (no log history) after every change"""
+        self._listeners.append(listener)
+
+    def _notify(self, event: Dict[str, Any]):
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Task listener failed: {e}")
+
+    def _persist(self, snapshot: Dict[str, Any], prune: bool = False):
+        if self.store is None:
+            return
+        try:
+            self.store.put_task(snapshot["task_id"], snapshot)
+            if prune:
+                self.store.prune_tasks(self.max_completed)
+        except Exception as e:
+            logger.warning(f"Could not persist task {snapshot['task_id']}: {e}")
+
+    def restore(self, mark_interrupted: bool = True):
+        """
+        Reload tasks from the store after a restart. Unfinished ones are marked
+        interrupted; with mark_interrupted=False (several workers) only those
+        whose owning process has exited.
+        """
+        if self.store is None:
+            return
+        try:
+            snapshots = self.store.list_tasks(limit=self.max_completed * 2)
+        except Exception as e:
+            logger.warning(f"Could not restore tasks: {e}")
+            return
+
+        restored = 0
+        for data in reversed(snapshots):
+            if data["task_id"] in self._tasks:
+                continue
+            task = _Task.from_snapshot(data, self.max_logs)
+            if task.status not in TERMINAL_STATUSES:
+                # With several workers another one may still be running it
+                if not mark_interrupted and owner_alive(task.owner):
+                    continue
+                task.message = "Interrupted by server restart"
+                task.logs.append(f"[{datetime.now().strftime('%H:%M:%S')}] Interrupted by server restart")
+                task.finish("failed")
+                self._persist(task.snapshot())
+            with self._lock:
+                self._tasks[task.task_id] = task
+            self._retire(task)
+            restored += 1
+
+        if restored:
+            logger.info(f"📋 Restored {restored} tasks from the task store")
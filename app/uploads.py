@@ -0,0 +1,153 @@
+"""
+Streamed PDF uploads with content hashing.
+
+Uploads are copied in chunks to a temp file in the target directory (off
+the event loop), hashed while they stream, and renamed into place with
+os.replace, so a half-written PDF is never visible. A small manifest of
+content hashes tells new, updated, unchanged and duplicate uploads apart.
+It records the content the index holds: the ingest queue writes an entry
+once a file has been indexed, not when the upload lands.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Import config
+try:
+    from app.config import config
+except ImportError:
+    from config import config
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileManifest:
+    """filename -> {sha256, size, updated}, stored as JSON next to the extracted data"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else config.data_dir / "pdf_manifest.json"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        tmp = str(self.path) + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(filename)
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def find_by_hash(self, sha256: str) -> Optional[str]:
+        with self._lock:
+            for filename, entry in self._entries.items():
+                if entry["sha256"] == sha256:
+                    return filename
+        return None
+
+    def record(self, filename: str, sha256: str, size: int):
+        with self._lock:
+            self._entries[filename] = {
+                "sha256": sha256,
+                "size": size,
+                "updated": datetime.now(timezone.utc).isoformat()
+            }
+            self._save()
+
+    def remove(self, filename: str):
+        with self._lock:
+            if self._entries.pop(filename, None) is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    def sync(self, directory: Path, indexed: Iterable[str]):
+        """Hash indexed files on disk that the manifest does not know about yet (e.g. after a full ingest)"""
+        if not directory.exists():
+            return
+        indexed = set(indexed)
+        for path in directory.glob("*.pdf"):
+            if path.name in indexed and self.get(path.name) is None:
+                self.record(path.name, hash_file(path), path.stat().st_size)
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stream_to_temp(source, directory: Path) -> Tuple[str, str, int]:
+    """Copy a file object to a temp file in `directory`, hashing as it goes (blocking)"""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=str(directory), prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                block = source.read(CHUNK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def store_upload(source, filename: str, directory: Path, manifest: FileManifest) -> Dict[str, Any]:
+    """
+    Stream one upload into `directory` (blocking; call from a threadpool).
+    status is "new", "updated", "unchanged" (already indexed with this content) or
+    "duplicate" (same content indexed under another name). The manifest is not
+    touched here; the ingest queue records the hash once the file is indexed.
+    """
+    filename = os.path.basename(filename)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path, sha256, size = stream_to_temp(source, directory)
+    result = {"name": filename, "sha256": sha256, "size": size}
+
+    existing = manifest.get(filename)
+    if existing and existing["sha256"] == sha256 and (directory / filename).exists():
+        os.unlink(tmp_path)
+        result["status"] = "unchanged"
+        return result
+
+    duplicate_of = manifest.find_by_hash(sha256)
+    if duplicate_of and duplicate_of != filename and (directory / duplicate_of).exists():
+        os.unlink(tmp_path)
+        result["status"] = "duplicate"
+        result["duplicate_of"] = duplicate_of
+        return result
+
+    os.replace(tmp_path, directory / filename)
+    result["status"] = "updated" if existing else "new"
+    return result
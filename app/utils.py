@@ -1,63 +1,207 @@
-import faiss
-import numpy as np
+from __future__ import annotations
+
 import pickle
 import os
 import json
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Tuple
+import threading
 import re
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+# Heavy imports load on first use
+try:
+    from app.lazy_imports import lazy_import
+except ImportError:
+    from lazy_imports import lazy_import
+np = lazy_import("numpy")
+
 # Import config
 try:
     from app.config import config
 except ImportError:
     from config import config
 
+try:
+    from app.corpus_stats import CorpusStats
+    from app.filters import MetadataBitmaps
+    from app.ai.reduction import Reducer, fit_reducer
+    from app.quantization import train_codebook, trained_copy
+    from app.shards import (Shard, plan_shards, search_shards, read_shard, read_index, read_vectors,
+                            write_shard, read_codebook, write_codebook, remove_stale_files,
+                            SHARDS_MANIFEST, LEGACY_SHARD)
+    from app.shared_state import shared_state, publish_index_change, index_write_lock, INDEX_VERSION
+except ImportError:
+    from corpus_stats import CorpusStats
+    from filters import MetadataBitmaps
+    from ai.reduction import Reducer, fit_reducer
+    from quantization import train_codebook, trained_copy
+    from shards import (Shard, plan_shards, search_shards, read_shard, read_index, read_vectors,
+                        write_shard, read_codebook, write_codebook, remove_stale_files,
+                        SHARDS_MANIFEST, LEGACY_SHARD)
+    from shared_state import shared_state, publish_index_change, index_write_lock, INDEX_VERSION
+
 logger = logging.getLogger(__name__)
 
 class VectorStore:
-    def __init__(self):
-        self.index = None
+    def __init__(self, embeddings=None, path: Path = None, version_key: str = INDEX_VERSION):
+        # Directory holding the index files (a named collection has its own)
+        self.path = Path(path) if path else config.vector_store_path
+        # Shared-state counter other workers watch for this index
+        self.version_key = version_key
+        # Size-bounded index shards; chunk positions run through them in order
+        self.shards: List[Shard] = []
+        self._offsets: List[int] = []
+        # Trained empty index every shard is built from (one quantizer per store)
+        self.codebook = None
+        self._codebook_dirty = False
+        # Projection fitted at ingest (PCA / Matryoshka), applied to documents and queries
+        self.reducer = None
+        # Concatenation of the shards' chunks and metadata, indexed by global position
         self.chunks = []
         self.metadata = []
         self.loaded = False
+        # Shared index version this copy corresponds to (multi-worker sync)
+        self.shared_version = None
+        self.stats = CorpusStats()
+        self._stats_summary = None
+        # Per-field metadata bitmaps for filtered search (None = rebuild on next use)
+        self._bitmaps = None
+        # Bumped whenever the searchable contents change
+        self.index_version = 0
+        # Keeps the index and the embeddings that query it consistent across a model swap
+        self._swap_lock = threading.Lock()
         
         # Use config settings
         self.embedding_model = config.embedding_model
         self.ollama_base_url = config.ollama_base_url
         
-        # Initialize embeddings
-        self._init_embeddings()
+        # Embeddings client, created on first use (an injected backend, e.g. for benchmarks, is kept as-is)
+        self._embeddings_injected = embeddings is not None
+        self._embeddings = embeddings
+        # Model the current client was created for
+        self._embeddings_for = self.embedding_model if embeddings is not None else None
+    
+    @property
+    def embeddings(self):
+        """Client for embedding_model; importing langchain is slow, so this waits for the first search or ingest"""
+        if not self._embeddings_injected and self._embeddings_for != self.embedding_model:
+            self._embeddings = self._make_embeddings(self.embedding_model)
+            self._embeddings_for = self.embedding_model
+        return self._embeddings
+    
+    @embeddings.setter
+    def embeddings(self, value):
+        self._embeddings = value
+        self._embeddings_for = self.embedding_model
     
     def _init_embeddings(self):
-        """Initialize embeddings with fallback options"""
+        """Drop the embeddings client; the next use creates one for the current model"""
+        if self._embeddings_injected:
+            return
+        self._embeddings_for = None
+    
+    def _make_embeddings(self, model: str):
+        """Embeddings client for a model, or None if no backend is installed"""
+        if self._embeddings_injected:
+            return self.embeddings
         try:
             # First try the newer langchain-ollama
             try:
                 from langchain_ollama import OllamaEmbeddings
-                self.embeddings = OllamaEmbeddings(
-                    model=self.embedding_model,
-                    base_url=self.ollama_base_url
+                embeddings = OllamaEmbeddings(
+                    model=model,
+                    base_url=self.ollama_base_url,
+                    keep_alive=config.ollama_keep_alive
                 )
-                logger.info(f"✅ Using langchain_ollama embeddings with model: {self.embedding_model}")
+                logger.info(f"✅ Using langchain_ollama embeddings with model: {model}")
+                return embeddings
             except ImportError:
                 # Fallback to langchain_community
                 try:
                     from langchain_community.embeddings import OllamaEmbeddings
-                    self.embeddings = OllamaEmbeddings(
-                        model=self.embedding_model,
+                    embeddings = OllamaEmbeddings(
+                        model=model,
                         base_url=self.ollama_base_url
                     )
-                    logger.info(f"✅ Using langchain_community embeddings with model: {self.embedding_model}")
+                    logger.info(f"✅ Using langchain_community embeddings with model: {model}")
+                    return embeddings
                 except ImportError:
                     logger.error("❌ Neither langchain_ollama nor langchain_community available")
-                    self.embeddings = None
+                    return None
         except Exception as e:
             logger.error(f"❌ Failed to initialize embeddings: {e}")
-            self.embeddings = None
+            return None
+    
+    @property
+    def needs_reembedding(self) -> bool:
+        """The loaded index was built with a different model than the configured one"""
+        return self.loaded and bool(self.chunks) and self.embedding_model != config.embedding_model
     
-    def create_index(self, texts: List[str], metadata_list: List[Dict] = None):
+    def build_shadow(self, embedding_model: str, embeddings=None, batch_size: int = 32,
+                     progress_callback: Callable[[int, int], None] = None) -> Dict[str, Any]:
+        """
+        Re-embed the cached chunk text with another model into a second index
+        and swap it in. Searches keep using the old index/model pair until the
+        swap, which replaces both under one lock.
+        """
+        embeddings = embeddings or self._make_embeddings(embedding_model)
+        if not embeddings:
+            raise RuntimeError(f"No embeddings backend available for {embedding_model}")
+        
+        for attempt in range(3):
+            version = self.index_version
+            shards = list(self.shards)
+            chunks = list(self.chunks)
+            
+            vectors = []
+            for start in range(0, len(chunks), batch_size):
+                vectors.extend(embeddings.embed_documents(chunks[start:start + batch_size]))
+                if progress_callback:
+                    progress_callback(min(start + batch_size, len(chunks)), len(chunks))
+            
+            if not vectors:
+                raise RuntimeError("No chunks to re-embed")
+            vectors_array = np.array(vectors).astype('float32')
+            reducer = fit_reducer(vectors_array)
+            if reducer:
+                vectors_array = reducer.apply(vectors_array)
+            codebook = train_codebook(vectors_array)
+            
+            # Same shard layout, new vectors
+            shadow = []
+            start = 0
+            for shard in shards:
+                shadow.append(Shard.build(shard.id, vectors_array[start:start + len(shard)],
+                                          shard.chunks, shard.metadata, codebook))
+                start += len(shard)
+            
+            # A save by another process reloads this copy, which also makes the shadow stale
+            with self.exclusive_update():
+                with self._swap_lock:
+                    # Chunks added or removed while embedding: the shadow is stale, build again
+                    if self.index_version != version:
+                        logger.info("Index changed during shadow build, restarting")
+                        continue
+                    old_model = self.embedding_model
+                    self._set_shards(shadow)
+                    self.reducer = reducer
+                    self._set_codebook(codebook)
+                    # Model first: the client is recorded as belonging to the current model
+                    self.embedding_model = embedding_model
+                    self.embeddings = embeddings
+                
+                self.save()
+            logger.info(f"🔁 Swapped index {old_model} → {embedding_model} ({len(chunks)} chunks, "
+                        f"dimension {vectors_array.shape[1]})")
+            return {"chunks": len(chunks), "dimension": int(vectors_array.shape[1]),
+                    "previous_model": old_model, "embedding_model": embedding_model}
+        
+        raise RuntimeError("Index kept changing during the shadow build")
+    
+    def create_index(self, texts: List[str], metadata_list: List[Dict] = None, persist: bool = True):
         """Create FAISS index using configured embedding model"""
         if not self.embeddings:
             logger.error("Embeddings not available. Please install langchain-ollama or langchain-community")
@@ -76,79 +220,376 @@ class VectorStore:
             # Debug: Check embedding dimensions
             logger.info(f"Embedding dimension: {embeddings_array.shape[1]}")
             
-            # Create FAISS index
+            # Optional PCA / Matryoshka reduction, fitted on this corpus
+            self.reducer = fit_reducer(embeddings_array)
+            if self.reducer:
+                embeddings_array = self.reducer.apply(embeddings_array)
+            
+            # One quantizer (flat, sq8 or pq per config) trained on the whole corpus, copied into each shard
             dimension = embeddings_array.shape[1]
-            self.index = faiss.IndexFlatL2(dimension)
-            self.index.add(embeddings_array)
+            codebook = train_codebook(embeddings_array)
+            metadata_list = metadata_list if metadata_list else [{} for _ in texts]
+            shards = [
+                Shard.build(name, embeddings_array[positions], [texts[i] for i in positions],
+                            [metadata_list[i] for i in positions], codebook)
+                for name, positions in plan_shards(metadata_list)
+            ]
             
-            # Store metadata
-            self.chunks = texts
-            self.metadata = metadata_list if metadata_list else [{} for _ in texts]
+            with self._swap_lock:
+                self._set_shards(shards)
+                self._set_codebook(codebook)
+            self.stats = CorpusStats.from_chunks(self.chunks, self.metadata)
+            self._stats_summary = None
+            self._bitmaps = MetadataBitmaps(self.chunks, self.metadata)
             self.loaded = True
             
             # Save
-            self.save()
+            if persist:
+                self.save()
             
-            logger.info(f"✅ Created index with {len(texts)} chunks, dimension {dimension}")
+            logger.info(f"✅ Created {self._index_type()} index with {len(texts)} chunks in "
+                        f"{len(shards)} shards, dimension {dimension}")
             
         except Exception as e:
             logger.error(f"❌ Failed to create index: {e}")
             raise
     
+    def add_texts(self, texts: List[str], metadata_list: List[Dict] = None, persist: bool = True):
+        """Append chunks to the existing index, updating the corpus stats incrementally"""
+        if not texts:
+            return
+        if not self.shards:
+            self.create_index(texts, metadata_list, persist=persist)
+            return
+        if not self.embeddings:
+            logger.error("Embeddings not available, cannot add chunks")
+            return
+        
+        metadata_list = metadata_list if metadata_list else [{} for _ in texts]
+        while True:
+            embeddings, reducer = self.embeddings, self.reducer
+            embeddings_array = np.array(embeddings.embed_documents(texts)).astype('float32')
+            if reducer:
+                embeddings_array = reducer.apply(embeddings_array)
+            with self._swap_lock:
+                # A shadow build swapped models while embedding: redo with the new one
+                if self.embeddings is not embeddings or self.reducer is not reducer:
+                    continue
+                self._set_shards(self._shards_with(embeddings_array, list(texts), list(metadata_list)))
+                for text, meta in zip(texts, metadata_list):
+                    self.stats.add(text, meta)
+            break
+        
+        if persist:
+            self.save()
+        logger.info(f"➕ Added {len(texts)} chunks ({len(self.chunks)} total)")
+    
+    def remove_source(self, source: str, persist: bool = True) -> int:
+        """Remove every chunk that came from one source document"""
+        if not self.shards:
+            return 0
+        
+        with self._swap_lock:
+            shards, removed = self._shards_without(source)
+            if not removed:
+                return 0
+            for text, meta in removed:
+                self.stats.remove(text, meta)
+            self._set_shards(shards)
+        
+        if persist:
+            self.save()
+        logger.info(f"➖ Removed {len(removed)} chunks from {source}")
+        return len(removed)
+    
+    def replace_source(self, source: str, texts: List[str], metadata_list: List[Dict] = None,
+                       persist: bool = True) -> Tuple[int, int]:
+        """Swap a document's chunks for a new version in one step; searches see the old or the new one"""
+        if not texts:
+            return self.remove_source(source, persist=persist), 0
+        if not self.embeddings:
+            # Raised rather than logged: the ingest queue must not treat the file as indexed
+            raise RuntimeError("Embeddings not available, cannot replace chunks")
+        if not self.shards:
+            self.create_index(texts, metadata_list, persist=persist)
+            return 0, len(texts)
+        
+        metadata_list = metadata_list if metadata_list else [{} for _ in texts]
+        while True:
+            embeddings, reducer = self.embeddings, self.reducer
+            embeddings_array = np.array(embeddings.embed_documents(texts)).astype('float32')
+            if reducer:
+                embeddings_array = reducer.apply(embeddings_array)
+            with self._swap_lock:
+                # A shadow build swapped models while embedding: redo with the new one
+                if self.embeddings is not embeddings or self.reducer is not reducer:
+                    continue
+                shards, removed = self._shards_without(source)
+                self._set_shards(self._shards_with(embeddings_array, list(texts), list(metadata_list), shards))
+                for text, meta in removed:
+                    self.stats.remove(text, meta)
+                for text, meta in zip(texts, metadata_list):
+                    self.stats.add(text, meta)
+            break
+        
+        if persist:
+            self.save()
+        logger.info(f"🔄 Replaced {source}: {len(removed)} chunks out, {len(texts)} in ({len(self.chunks)} total)")
+        return len(removed), len(texts)
+    
+    @contextmanager
+    def exclusive_update(self, reload: bool = True):
+        """
+        Hold the cross-process write lock while changing and saving this index.
+        Each worker has its own copy, and save() writes the whole shard list, so
+        a copy older than the last save elsewhere is reloaded first; otherwise
+        that save's shards would be dropped and their files deleted.
+        """
+        with index_write_lock(self.version_key):
+            if reload:
+                self._reload_if_stale()
+            yield self
+    
+    def _reload_if_stale(self):
+        try:
+            current = shared_state.get(self.version_key, 0)
+        except Exception as e:
+            logger.warning(f"Could not read shared index version: {e}")
+            return
+        if current == self.shared_version or not (self.loaded or current):
+            return
+        logger.info(f"🔄 Index version {current} was saved by another process, reloading before writing")
+        self.load()
+        # Nothing on disk (e.g. cleared) is an empty store to write into, not a failed reload
+        if not self.loaded and self._index_on_disk():
+            raise RuntimeError(f"Could not reload index version {current} before writing")
+    
+    def _shards_without(self, source: str) -> Tuple[List[Shard], List[Tuple[str, Dict]]]:
+        """The shard list minus one source's chunks, and the (text, metadata) removed (caller holds _swap_lock)"""
+        # Only shards holding the source are copied; the rest are kept as they are
+        shards, removed = [], []
+        for shard in self.shards:
+            doomed = [i for i, meta in enumerate(shard.metadata) if meta.get('source') == source]
+            if not doomed:
+                shards.append(shard)
+                continue
+            removed.extend((shard.chunks[i], shard.metadata[i]) for i in doomed)
+            if len(doomed) < len(shard):
+                shards.append(shard.without(doomed))
+        return shards, removed
+    
+    def _shards_with(self, vectors: np.ndarray, texts: List[str], metadata_list: List[Dict],
+                     shards: List[Shard] = None) -> List[Shard]:
+        """A shard list (the current one by default) with new chunks packed onto its end (caller holds _swap_lock)"""
+        shards = list(self.shards if shards is None else shards)
+        codebook = self._current_codebook()
+        for name, positions in plan_shards(metadata_list, taken={shard.id for shard in shards}):
+            rows = vectors[positions]
+            group_chunks = [texts[i] for i in positions]
+            group_metadata = [metadata_list[i] for i in positions]
+            # Top up the last shard while it has room, otherwise start a new one
+            if shards and len(shards[-1]) + len(positions) <= config.shard_max_chunks:
+                shards[-1] = shards[-1].with_added(rows, group_chunks, group_metadata)
+            else:
+                shards.append(Shard.build(name, rows, group_chunks, group_metadata, codebook))
+        return shards
+    
+    def _current_codebook(self):
+        """Trained empty index for new shards (caller holds _swap_lock)"""
+        if self.codebook is None and self.shards:
+            # Saved before the store kept a codebook: take the quantizer of an existing shard
+            self._set_codebook(trained_copy(self.shards[0].index))
+        return self.codebook
+    
+    def _set_codebook(self, codebook):
+        self.codebook = codebook
+        self._codebook_dirty = True
+    
+    def _set_shards(self, shards: List[Shard]):
+        """Install a shard list and rebuild the global chunk views (caller holds _swap_lock)"""
+        offsets, chunks, metadata = [], [], []
+        for shard in shards:
+            offsets.append(len(chunks))
+            chunks.extend(shard.chunks)
+            metadata.extend(shard.metadata)
+        self.shards = shards
+        self._offsets = offsets
+        self.chunks = chunks
+        self.metadata = metadata
+        self._stats_summary = None
+        self._bitmaps = None
+        self.index_version += 1
+    
+    def _index_type(self):
+        types = sorted({shard.index_type for shard in self.shards})
+        return ", ".join(types) if types else None
+    
+    def _save_manifest(self):
+        """Write the corpus stats next to the index"""
+        with open(self.path / "manifest.json", 'w') as f:
+            json.dump({
+                'embedding_model': self.embedding_model,
+                'index_type': self._index_type(),
+                'shards': len(self.shards),
+                'reduction': self.reducer.describe() if self.reducer else None,
+                'chunk_count': len(self.chunks),
+                'stats': self.stats.to_dict()
+            }, f)
+    
+    def _load_stats(self):
+        """Stats from the manifest, rebuilt once if it is missing or stale"""
+        manifest_path = self.path / "manifest.json"
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('chunk_count') == len(self.chunks):
+                self.stats = CorpusStats.from_dict(manifest.get('stats', {}))
+                self._stats_summary = None
+                return
+        except (OSError, ValueError):
+            pass
+        
+        logger.info("📊 Rebuilding corpus stats for index manifest")
+        self.stats = CorpusStats.from_chunks(self.chunks, self.metadata)
+        self._stats_summary = None
+        try:
+            self._save_manifest()
+        except OSError as e:
+            logger.warning(f"Could not write index manifest: {e}")
+    
     def save(self):
-        """Save to configured vector store path"""
-        if not self.index:
+        """Save to configured vector store path, rewriting only changed shards"""
+        if not self.loaded:
             logger.warning("No index to save")
             return
             
-        os.makedirs(config.vector_store_path, exist_ok=True)
+        os.makedirs(self.path, exist_ok=True)
         
         try:
-            # Save FAISS index
-            faiss.write_index(self.index, str(config.vector_store_path / "vector_index.bin"))
-            
-            # Save metadata
-            with open(config.vector_store_path / "metadata.pkl", 'wb') as f:
-                pickle.dump({
-                    'chunks': self.chunks,
-                    'metadata': self.metadata,
-                    'embedding_model': self.embedding_model
+            with self._swap_lock:
+                shards = list(self.shards)
+                reducer = self.reducer
+                codebook, codebook_dirty = self.codebook, self._codebook_dirty
+                self._codebook_dirty = False
+            
+            # Each file is written to a temp file and swapped in, so workers
+            # that have an old shard mapped keep reading it until they reload
+            written = 0
+            for shard in shards:
+                if shard.dirty:
+                    write_shard(self.path, shard)
+                    written += 1
+            
+            if reducer:
+                reducer.save(self.path)
+            else:
+                Reducer.remove(self.path)
+            if codebook_dirty:
+                write_codebook(self.path, codebook)
+            
+            # The shard list is the commit point; files it no longer names go afterwards
+            manifest_path = self.path / SHARDS_MANIFEST
+            with open(str(manifest_path) + ".tmp", 'w') as f:
+                json.dump({
+                    'embedding_model': self.embedding_model,
+                    'shards': [{'id': shard.id, 'chunks': len(shard), 'sources': shard.sources,
+                                'index_type': shard.index_type} for shard in shards]
                 }, f)
+            os.replace(str(manifest_path) + ".tmp", manifest_path)
+            remove_stale_files(self.path, [shard.id for shard in shards])
+            
+            # A single-file index from before sharding has been migrated now
+            for legacy in ("vector_index.bin", "metadata.pkl", "vectors.npy"):
+                if (self.path / legacy).exists():
+                    os.remove(self.path / legacy)
+            
+            self._save_manifest()
             
-            logger.info(f"💾 Saved vector store to {config.vector_store_path}")
+            # Other workers reload on their next request
+            self.shared_version = publish_index_change(self.version_key)
+            
+            logger.info(f"💾 Saved vector store to {self.path} ({written} of {len(shards)} shards written)")
             
         except Exception as e:
             logger.error(f"❌ Failed to save vector store: {e}")
     
+    def _read_shards(self):
+        """Shards listed in shards.json, or a legacy single-file index as one shard"""
+        manifest_path = self.path / SHARDS_MANIFEST
+        if not manifest_path.exists():
+            index_path = self.path / "vector_index.bin"
+            logger.info(f"📂 Loading FAISS index from {index_path} as a single shard")
+            index, mmapped = read_index(index_path)
+            with open(self.path / "metadata.pkl", 'rb') as f:
+                data = pickle.load(f)
+            # Dirty, so the first save moves it into the shard layout
+            shard = Shard(LEGACY_SHARD, index, data['chunks'], data['metadata'],
+                          read_vectors(self.path / "vectors.npy", index), mmapped=mmapped, dirty=True)
+            return [shard], data.get('embedding_model', 'unknown')
+        
+        for attempt in range(3):
+            try:
+                with open(manifest_path, 'r') as f:
+                    layout = json.load(f)
+                logger.info(f"📂 Loading {len(layout['shards'])} shards from {self.path}")
+                shards = [read_shard(self.path, entry['id']) for entry in layout['shards']]
+                return shards, layout.get('embedding_model', 'unknown')
+            except (OSError, ValueError) as e:
+                # Another process saved while this one read; the new shard list is consistent
+                if attempt == 2:
+                    raise
+                logger.info(f"Shards changed while loading ({e}), retrying")
+                time.sleep(0.1)
+    
+    def _index_on_disk(self) -> bool:
+        has_shards = (self.path / SHARDS_MANIFEST).exists()
+        has_legacy = (self.path / "vector_index.bin").exists() and (self.path / "metadata.pkl").exists()
+        return has_shards or has_legacy
+    
     def load(self):
         """Load from configured vector store path"""
-        index_path = config.vector_store_path / "vector_index.bin"
-        metadata_path = config.vector_store_path / "metadata.pkl"
+        # Read the version first; a save racing this load only causes one extra reload.
+        # Recorded even when there is no index, so workers do not retry the load on every request
+        try:
+            self.shared_version = shared_state.get(self.version_key, 0)
+        except Exception as e:
+            logger.warning(f"Could not read shared index version: {e}")
         
-        if not index_path.exists() or not metadata_path.exists():
-            logger.warning(f"Vector store not found at {config.vector_store_path}")
+        if not self._index_on_disk():
+            logger.warning(f"Vector store not found at {self.path}")
             logger.info("💡 Run ingestion first: python ingest.py")
             return
             
         try:
-            # Load FAISS index
-            logger.info(f"📂 Loading FAISS index from {index_path}")
-            self.index = faiss.read_index(str(index_path))
+            shards, stored_model = self._read_shards()
+            reducer = Reducer.load(self.path)
+            codebook = read_codebook(self.path)
+            for shard in shards:
+                if reducer and reducer.output_dim != shard.index.d:
+                    raise ValueError(f"Projection outputs {reducer.output_dim}-d vectors "
+                                     f"but shard {shard.id} is {shard.index.d}-d")
+                if codebook is not None and codebook.d != shard.index.d:
+                    raise ValueError(f"Codebook is {codebook.d}-d but shard {shard.id} is {shard.index.d}-d")
+            logger.info(f"Stored with embedding model: {stored_model}")
             
-            # Load metadata
-            logger.info(f"📂 Loading metadata from {metadata_path}")
-            with open(metadata_path, 'rb') as f:
-                data = pickle.load(f)
-                self.chunks = data['chunks']
-                self.metadata = data['metadata']
-                stored_model = data.get('embedding_model', 'unknown')
-                logger.info(f"Stored with embedding model: {stored_model}")
+            with self._swap_lock:
+                self._set_shards(shards)
+                self.reducer = reducer
+                self.codebook = codebook
+                self._codebook_dirty = False
             
-            # Reinitialize embeddings
-            self._init_embeddings()
+            # Queries must be embedded with the model the index was built with
+            if stored_model != 'unknown':
+                if stored_model != config.embedding_model:
+                    logger.warning(f"⚠️  Index was built with {stored_model}, configured model is "
+                                   f"{config.embedding_model}; serving with {stored_model} until re-embedded")
+                self.embedding_model = stored_model
+            
+            self._load_stats()
+            self._bitmaps = MetadataBitmaps(self.chunks, self.metadata)
             
             self.loaded = True
-            logger.info(f"✅ Loaded vector store with {len(self.chunks)} chunks")
+            logger.info(f"✅ Loaded vector store with {len(self.chunks)} chunks in {len(self.shards)} shards")
             
             # Debug: Show sample chunks
             if self.chunks:
@@ -158,8 +599,21 @@ class VectorStore:
             logger.error(f"❌ Failed to load vector store: {e}")
             self.loaded = False
     
-    def search(self, query: str, k: int = None) -> List[Dict[str, Any]]:
-        """Search using configured settings"""
+    def memory_bytes(self) -> int:
+        """Rough in-memory size: the vectors plus the chunk text"""
+        if not self.shards:
+            return 0
+        # Re-scoring vectors are memory-mapped and only paged in for candidates
+        return sum(shard.memory_bytes() for shard in self.shards) + sum(len(c) for c in self.chunks)
+    
+    def _current_bitmaps(self) -> MetadataBitmaps:
+        """Bitmaps matching the current chunks (caller holds _swap_lock)"""
+        if self._bitmaps is None or self._bitmaps.size != len(self.chunks):
+            self._bitmaps = MetadataBitmaps(self.chunks, self.metadata)
+        return self._bitmaps
+    
+    def search(self, query: str, k: int = None, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Search using configured settings; `filters` is a spec from app.filters.parse_filters"""
         if not self.loaded:
             logger.warning("Vector store not loaded")
             return []
@@ -173,33 +627,31 @@ class VectorStore:
             k = config.search_default_k
         
         try:
-            # Get query embedding
-            query_embedding = self.embeddings.embed_query(query)
-            query_vector = np.array([query_embedding]).astype('float32')
+            # A consistent snapshot: index and embeddings are read as a pair so a model swap
+            # cannot mix them, and mutations install new shard lists instead of editing these
+            with self._swap_lock:
+                shards, offsets = self.shards, self._offsets
+                chunks, metadata = self.chunks, self.metadata
+                embeddings, reducer = self.embeddings, self.reducer
+                bitmaps = self._current_bitmaps() if filters else None
             
-            # Search
-            distances, indices = self.index.search(query_vector, k)
+            # Filters become per-shard ID selectors, so only matching vectors are scored
+            mask = None
+            if bitmaps is not None:
+                mask = bitmaps.mask(filters)
+                if not mask.any():
+                    logger.info(f"🔍 No chunks match filters {filters}")
+                    return []
             
-            results = []
-            for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-                if idx < 0 or idx >= len(self.chunks):
-                    continue
-                
-                content = self.chunks[idx]
-                
-                # Calculate score (inverse of distance, higher is better)
-                score = 1.0 / (1.0 + distance)
-                
-                results.append({
-                    'content': content,
-                    'score': score,
-                    'distance': float(distance),
-                    'metadata': self.metadata[idx] if idx < len(self.metadata) else {},
-                    'index': idx
-                })
+            # Get query embedding
+            query_embedding = embeddings.embed_query(query)
+            query_vector = np.array([query_embedding]).astype('float32')
+            if reducer:
+                query_vector = reducer.apply(query_vector)
             
-            # Sort by score (descending)
-            results.sort(key=lambda x: x['score'], reverse=True)
+            # Scatter over the shards in parallel, merge their top k
+            distances, indices = search_shards(shards, offsets, query_vector, k, mask)
+            results = self._build_results(distances, indices, chunks, metadata)
             
             # Log search results for debugging
             if results:
@@ -215,29 +667,56 @@ class VectorStore:
             logger.error(f"❌ Search failed: {e}")
             return []
     
+    def _build_results(self, distances, indices, chunks: List[str] = None,
+                       metadata: List[Dict] = None) -> List[Dict[str, Any]]:
+        """Turn one row of FAISS distances/indices into scored result dicts"""
+        chunks = self.chunks if chunks is None else chunks
+        metadata = self.metadata if metadata is None else metadata
+        results = []
+        for distance, idx in zip(distances, indices):
+            if idx < 0 or idx >= len(chunks):
+                continue
+            
+            content = chunks[idx]
+            
+            # Calculate score (inverse of distance, higher is better)
+            score = 1.0 / (1.0 + distance)
+            
+            results.append({
+                'content': content,
+                'score': score,
+                'distance': float(distance),
+                'metadata': metadata[idx] if idx < len(metadata) else {},
+                'index': idx
+            })
+        
+        # Sort by score (descending)
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results
+    
     def get_stats(self) -> Dict[str, Any]:
-        """Get statistics about the vector store"""
+        """Get statistics about the vector store (precomputed, no corpus scan)"""
         if not self.loaded:
             return {"status": "not_loaded"}
         
+        if self._stats_summary is None:
+            self._stats_summary = self.stats.summary()
+        
         stats = {
             "status": "loaded",
             "total_chunks": len(self.chunks),
-            "index_size": self.index.ntotal if self.index else 0,
+            "index_size": sum(shard.index.ntotal for shard in self.shards),
+            "index_type": self._index_type(),
+            "configured_index_type": config.index_type,
+            "shards": len(self.shards),
+            "mmapped_shards": sum(1 for shard in self.shards if shard.mmapped),
+            "reduction": self.reducer.describe() if self.reducer else None,
+            "index_memory_bytes": self.memory_bytes(),
             "embedding_model": self.embedding_model,
             "loaded": self.loaded,
             "sample_chunks": min(3, len(self.chunks))
         }
-        
-        # Count chunks with common keywords
-        keyword_counts = {}
-        keywords_to_check = ['myloft', 'library', 'borrowing', 'e-resources', 'plagiarism']
-        
-        for keyword in keywords_to_check:
-            count = sum(1 for chunk in self.chunks if keyword.lower() in chunk.lower())
-            keyword_counts[keyword] = count
-        
-        stats["keyword_counts"] = keyword_counts
+        stats.update({k: v for k, v in self._stats_summary.items() if k != "total_chunks"})
         
         return stats
 
@@ -0,0 +1,251 @@
+"""
+Watch the PDF directory and feed changed files to the incremental ingest queue.
+
+Uses watchdog (inotify on Linux) when it is installed and falls back to
+polling the directory otherwise. Events are debounced per file: a PDF is
+only handled once it has been quiet, with a stable size and mtime, for the
+debounce period, so a slow SFTP copy produces one ingest instead of dozens.
+Content hashes in the upload manifest filter out touches and re-copies. The
+manifest is only updated by the ingest queue once a file is indexed, so a
+lost or failed ingest is queued again by the next change or restart.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+# Import config
+try:
+    from app.config import config
+    from app.ingest_queue import UPSERT, REMOVE
+    from app.uploads import hash_file
+except ImportError:
+    from config import config
+    from ingest_queue import UPSERT, REMOVE
+    from uploads import hash_file
+
+logger = logging.getLogger(__name__)
+
+Signature = Optional[Tuple[int, int]]
+
+
+def is_watched_pdf(filename: str) -> bool:
+    # Dot files include the .upload-*.part temp files written by /upload
+    return filename.lower().endswith(".pdf") and not filename.startswith(".")
+
+
+def _signature(path: Path) -> Signature:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "PdfWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.notify(os.path.basename(path))
+
+
+class PdfWatcher:
+    """Debounced directory watcher that enqueues added, modified and removed PDFs"""
+
+    def __init__(self, directory: Path, ingest_queue, manifest,
+                 indexed_sources: Optional[Callable[[], Optional[Iterable[str]]]] = None,
+                 debounce: Optional[float] = None, poll_interval: Optional[float] = None,
+                 use_watchdog: bool = True):
+        self.directory = Path(directory)
+        self.ingest_queue = ingest_queue
+        self.manifest = manifest
+        self.indexed_sources = indexed_sources
+        self.debounce = config.watch_debounce if debounce is None else debounce
+        self.poll_interval = config.watch_poll_interval if poll_interval is None else poll_interval
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+        self._pending: Dict[str, Tuple[float, Signature]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._snapshot: Dict[str, Signature] = {}
+        self.enqueued = 0
+        self.skipped_unchanged = 0
+        self.last_event: Optional[float] = None
+
+    @property
+    def mode(self) -> str:
+        return "watchdog" if self.use_watchdog else "polling"
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        if self.use_watchdog:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), str(self.directory), recursive=False)
+                self._observer.start()
+            except Exception as e:
+                logger.warning(f"watchdog observer failed ({e}), polling {self.directory} instead")
+                self._observer = None
+                self.use_watchdog = False
+        self._thread = threading.Thread(target=self._run, name="pdf-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watching {self.directory} for PDF changes ({self.mode})")
+
+    def stop(self):
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def notify(self, filename: str):
+        """Record a change; the file is handled once it has been quiet for `debounce` seconds"""
+        if not is_watched_pdf(filename):
+            return
+        with self._lock:
+            self._pending[filename] = (time.monotonic() + self.debounce, _signature(self.directory / filename))
+        self.last_event = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sorted(self._pending)
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "mode": self.mode,
+            "directory": str(self.directory),
+            "pending": pending,
+            "enqueued": self.enqueued,
+            "skipped_unchanged": self.skipped_unchanged,
+            "last_event": self.last_event
+        }
+
+    def _run(self):
+        try:
+            self.reconcile()
+        except Exception as e:
+            logger.error(f"❌ Initial PDF directory scan failed: {e}")
+
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.wait(min(0.5, self.debounce or 0.5)):
+            if not self.use_watchdog and time.monotonic() >= next_poll:
+                self._poll()
+                next_poll = time.monotonic() + self.poll_interval
+            self._flush()
+
+    def _scan(self) -> Dict[str, Signature]:
+        try:
+            names = [name for name in os.listdir(self.directory) if is_watched_pdf(name)]
+        except OSError:
+            return {}
+        return {name: _signature(self.directory / name) for name in names}
+
+    def _poll(self):
+        snapshot = self._scan()
+        for name in set(snapshot) | set(self._snapshot):
+            if snapshot.get(name) != self._snapshot.get(name):
+                self.notify(name)
+        self._snapshot = snapshot
+
+    def reconcile(self):
+        """Catch up with changes made while the server was down"""
+        self._snapshot = self._scan()
+        sources = self.indexed_sources() if self.indexed_sources else None
+        if sources is None:
+            # No index to compare against yet; a full ingest builds it
+            return
+        indexed = set(sources)
+        for name in self._snapshot:
+            if name not in indexed:
+                # Never indexed, or its ingest failed or was cut short: whatever the manifest says
+                self._enqueue(name, UPSERT)
+            elif self.manifest.get(name) is None:
+                # Indexed by a full ingest before the manifest existed
+                self.manifest.record(name, hash_file(self.directory / name), self._snapshot[name][1])
+            else:
+                self._handle(name)
+        # Only files this server saw on disk; an index shipped without its PDFs is left alone
+        for name in self.manifest.names():
+            if name not in self._snapshot:
+                self._handle(name)
+
+    def _flush(self):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for name, (deadline, signature) in list(self._pending.items()):
+                if now < deadline:
+                    continue
+                current = _signature(self.directory / name)
+                if current != signature:
+                    # Still being written
+                    self._pending[name] = (now + self.debounce, current)
+                    continue
+                del self._pending[name]
+                due.append(name)
+        for name in due:
+            try:
+                self._handle(name)
+            except Exception as e:
+                logger.error(f"❌ Could not process change to {name}: {e}")
+
+    def _handle(self, name: str):
+        path = self.directory / name
+        entry = self.manifest.get(name)
+        if path.exists():
+            sha256 = hash_file(path)
+            if entry and entry["sha256"] == sha256:
+                self.skipped_unchanged += 1
+                return
+            # The queue records the new hash once the file is indexed
+            self._enqueue(name, UPSERT)
+        elif entry is not None:
+            self._enqueue(name, REMOVE)
+
+    def _enqueue(self, name: str, action: str):
+        self.ingest_queue.enqueue(name, action)
+        self.enqueued += 1
+        logger.info(f"👀 {name} {'changed' if action == UPSERT else 'removed'}, queued for ingestion")
+
+
+def claim_watch_lock(path: Path):
+    """
+    Non-blocking exclusive lock so only one process (of several workers)
+    watches the directory. Returns the open lock file to keep, or None.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "a")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
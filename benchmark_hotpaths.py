@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the pure-Python hot paths.
+
+Covers format_context, extract_key_query_terms, app/pdf/chunker.chunk_text,
+ingest.create_chunks, VectorStore result construction and get_stats, each
+over a synthetic corpus of 1k/10k/100k chunks. Timings are compared
+against benchmark_baseline.json so regressions show up in review.
+
+Run:    python benchmark_hotpaths.py               (compare with baseline)
+        python benchmark_hotpaths.py --update-baseline
+        python benchmark_hotpaths.py --sizes 1000,10000 --only get_stats
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.config import config
+from app.utils import VectorStore, format_context, extract_key_query_terms
+from app.pdf.chunker import chunk_text
+from app.ai.hashing_embeddings import HashingEmbeddings
+from app.corpus_stats import CorpusStats
+import ingest
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+VOCABULARY = (
+    "library borrowing books loan period return renewal fines overdue students lecturers "
+    "staff circulation desk opening hours weekdays saturday closed myloft e-resources "
+    "journals databases access login portal credentials past exam papers plagiarism "
+    "turnitin citation referencing apa catalogue opac reference section reading room "
+    "printing photocopy membership card clearance policy procedure steps request"
+).split()
+
+
+def make_corpus(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Deterministic chunk dicts shaped like the ingest output"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = rng.choices(VOCABULARY, k=rng.randint(6, 14))
+            sentences.append(" ".join(words).capitalize() + ".")
+        content = " ".join(sentences)
+        corpus.append({
+            "content": content,
+            "source": f"guide_{i % 7}.pdf",
+            "page": i // 20 + 1,
+            "chunk_id": f"{i:08x}"
+        })
+    return corpus
+
+
+def make_store(corpus: List[Dict[str, Any]]) -> VectorStore:
+    store = VectorStore(embeddings=HashingEmbeddings())
+    store.chunks = [c["content"] for c in corpus]
+    store.metadata = corpus
+    store.stats = CorpusStats.from_chunks(store.chunks, store.metadata)
+    store.loaded = True
+    return store
+
+
+def bench_format_context(corpus, size) -> Tuple[Callable, int]:
+    results = [{"content": c["content"], "score": 0.5} for c in corpus]
+    windows = [results[i:i + 5] for i in range(0, len(results), 5)]
+    return (lambda: [format_context(w, max_length=3000) for w in windows]), len(windows)
+
+
+def bench_extract_key_query_terms(corpus, size):
+    queries = [" ".join(c["content"].split()[:12]) for c in corpus]
+    return (lambda: [extract_key_query_terms(q) for q in queries]), len(queries)
+
+
+def bench_chunk_text(corpus, size):
+    text = "\n".join(c["content"] for c in corpus)
+    return (lambda: chunk_text(text, chunk_size=1000, overlap=200)), 1
+
+
+def bench_create_chunks(corpus, size):
+    lines = []
+    for i, c in enumerate(corpus):
+        if i % 50 == 0:
+            lines.append(f"SECTION {i // 50 + 1}: Synthetic section")
+        lines.append(c["content"])
+    text = "\n".join(lines)
+    return (lambda: ingest.create_chunks(text, "synthetic.pdf")), 1
+
+
+def bench_search_results(corpus, size):
+    store = make_store(corpus)
+    rng = np.random.default_rng(11)
+    k = 30
+    queries = max(1, size // k)
+    rows = [
+        (np.sort(rng.random(k).astype("float32")), rng.integers(0, size, k).astype("int64"))
+        for _ in range(queries)
+    ]
+    return (lambda: [store._build_results(d, i) for d, i in rows]), queries
+
+
+def bench_get_stats(corpus, size):
+    store = make_store(corpus)
+    return store.get_stats, 1
+
+
+BENCHMARKS = {
+    "format_context": bench_format_context,
+    "extract_key_query_terms": bench_extract_key_query_terms,
+    "chunk_text": bench_chunk_text,
+    "create_chunks": bench_create_chunks,
+    "search_results": bench_search_results,
+    "get_stats": bench_get_stats,
+}
+
+
+def measure(fn: Callable, repeat: int) -> List[float]:
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path microbenchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--only", help="Comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (fewer at 100k)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f).get("results", {})
+
+    print("⏱️  HOT PATH MICROBENCHMARKS")
+    print("=" * 78)
+    print(f"{'benchmark':34} {'median':>10} {'per op':>12} {'baseline':>10} {'change':>8}")
+    print("-" * 78)
+
+    results = {}
+    regressions = []
+    for size in sizes:
+        corpus = make_corpus(size)
+        repeat = args.repeat if size < 100000 else max(1, args.repeat // 2)
+        for name in names:
+            fn, ops = BENCHMARKS[name](corpus, size)
+            timings = measure(fn, repeat)
+            median = statistics.median(timings)
+            key = f"{name}[{size}]"
+            results[key] = {
+                "median_s": round(median, 6),
+                "min_s": round(min(timings), 6),
+                "ops": ops,
+                "per_op_us": round(median / ops * 1e6, 3)
+            }
+
+            old = baseline.get(key, {}).get("median_s")
+            change = ""
+            if old:
+                ratio = median / old - 1
+                change = f"{ratio:+.0%}"
+                if ratio > args.tolerance:
+                    regressions.append(f"{key}: {old * 1000:.2f}ms → {median * 1000:.2f}ms ({change})")
+            old_text = f"{old * 1000:.2f}ms" if old else "-"
+            print(f"{key:34} {median * 1000:8.2f}ms {results[key]['per_op_us']:10.2f}us {old_text:>10} {change:>8}")
+
+    print("=" * 78)
+
+    if args.update_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "updated": datetime.now(timezone.utc).isoformat(),
+                "machine": f"{platform.machine()} / Python {platform.python_version()}",
+                "chunk_size": config.chunk_size,
+                "results": merged
+            }, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print("❌ Slower than baseline:")
+        for line in regressions:
+            print(f"   • {line}")
+        sys.exit(1)
+    if baseline:
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
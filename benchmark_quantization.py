@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Memory, latency and recall of the compressed index types against IndexFlatL2.
+
+Embeds a synthetic corpus (the benchmark_hotpaths generator) with the
+deterministic HashingEmbeddings backend at the production dimension, builds
+flat, sq8 and pq indexes, and searches each with and without the exact
+re-scoring pass. recall@k is the overlap with the flat index's top k, so
+1.0 means the same results as today's exact search.
+
+Run: python benchmark_quantization.py [--chunks 20000] [--queries 200] [--output file.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import faiss
+import numpy as np
+
+from app.config import config
+from app.ai.hashing_embeddings import HashingEmbeddings
+from app.metrics import percentile
+from app.quantization import build_index, code_bytes, rescore
+from benchmark_hotpaths import make_corpus
+
+
+def embed(texts: List[str], dimension: int) -> np.ndarray:
+    return np.array(HashingEmbeddings(dimension).embed_documents(texts)).astype("float32")
+
+
+def run_variant(index, vectors, queries, max_k: int, rescore_factor: int) -> Dict[str, Any]:
+    latencies = []
+    rankings = []
+    for query in queries:
+        query = query.reshape(1, -1)
+        start = time.perf_counter()
+        if rescore_factor:
+            _, candidates = index.search(query, max_k * rescore_factor)
+            _, ids = rescore(query[0], candidates[0], vectors, max_k)
+        else:
+            _, found = index.search(query, max_k)
+            ids = found[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        rankings.append(list(ids))
+    return {"latencies_ms": latencies, "rankings": rankings}
+
+
+def recall(rankings, truth, k: int) -> float:
+    scores = [len(set(found[:k]) & set(exact[:k])) / k for found, exact in zip(rankings, truth)]
+    return round(sum(scores) / len(scores), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed index benchmark")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=768, help="Stand-in embedding dimension (nomic-embed-text: 768)")
+    parser.add_argument("--k", default="1,5,10", help="Comma-separated k values")
+    parser.add_argument("--pq-m", type=int, default=config.pq_m)
+    parser.add_argument("--pq-nbits", type=int, default=config.pq_nbits)
+    parser.add_argument("--rescore-factor", type=int, default=config.rescore_factor)
+    parser.add_argument("--output", default="quantization_benchmark_results.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    faiss.omp_set_num_threads(1)
+    k_values = sorted({int(k) for k in args.k.split(",") if k.strip()})
+    max_k = k_values[-1]
+
+    print("🗜️  INDEX QUANTIZATION BENCHMARK")
+    print("=" * 78)
+
+    corpus = make_corpus(args.chunks)
+    start = time.perf_counter()
+    vectors = embed([c["content"] for c in corpus], args.dimension)
+    print(f"📚 {len(vectors)} chunks embedded (hashing-{args.dimension}) in {time.perf_counter() - start:.1f}s")
+
+    # Queries: opening words of random chunks, so each has close neighbours
+    rng = random.Random(3)
+    query_texts = [" ".join(c["content"].split()[:10]) for c in rng.sample(corpus, min(args.queries, len(corpus)))]
+    queries = embed(query_texts, args.dimension)
+
+    variants = [("flat", "flat", 0), ("sq8", "sq8", 0), ("sq8+rescore", "sq8", args.rescore_factor),
+                ("pq", "pq", 0), ("pq+rescore", "pq", args.rescore_factor)]
+    built = {}
+    rows = []
+    truth = None
+    for name, index_type, factor in variants:
+        if index_type not in built:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, pq_m=args.pq_m, pq_nbits=args.pq_nbits)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_seconds = built[index_type]
+
+        run = run_variant(index, vectors, queries, max_k, factor)
+        if truth is None:
+            truth = run["rankings"]
+        latencies = sorted(run["latencies_ms"])
+        row = {
+            "variant": name,
+            "index_class": type(index).__name__,
+            "code_bytes": code_bytes(index),
+            "serialized_bytes": int(faiss.serialize_index(index).size),
+            "rescore_vectors_bytes": int(vectors.nbytes) if factor else 0,
+            "build_seconds": round(build_seconds, 3),
+            "latency_p50_ms": round(percentile(latencies, 50), 3),
+            "latency_p95_ms": round(percentile(latencies, 95), 3)
+        }
+        for k in k_values:
+            row[f"recall@{k}"] = recall(run["rankings"], truth, k)
+        rows.append(row)
+
+    flat_bytes = rows[0]["code_bytes"]
+    print(f"\n{'variant':<13} {'codes MB':>9} {'vs flat':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          + " ".join(f"{'R@' + str(k):>6}" for k in k_values))
+    for row in rows:
+        print(f"{row['variant']:<13} {row['code_bytes'] / 1e6:>9.2f} {row['code_bytes'] / flat_bytes:>7.0%} "
+              f"{row['latency_p50_ms']:>8.3f} {row['latency_p95_ms']:>8.3f} "
+              + " ".join(f"{row[f'recall@{k}']:>6.3f}" for k in k_values))
+    print("\nℹ️  Re-scoring vectors are memory-mapped from disk; only candidate rows are paged in.")
+
+    result = {
+        "run": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "chunks": len(vectors),
+            "queries": len(queries),
+            "embedding_backend": f"hashing-{args.dimension}",
+            "pq_m": args.pq_m,
+            "pq_nbits": args.pq_nbits,
+            "rescore_factor": args.rescore_factor,
+            "k_values": k_values
+        },
+        "variants": rows
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"💾 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
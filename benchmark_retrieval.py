@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval benchmark built on expected_answers.json.
+
+Runs every expected-answer query against the in-process VectorStore. The
+chunks come from the real index on disk (or data/extracted_chunks.json)
+and are re-embedded with the deterministic HashingEmbeddings backend, so
+the numbers only move when chunking, dedup or the index type change.
+
+A chunk counts as relevant to a query when it contains at least
+--min-hits of the query's expected keywords. recall@k is normalized by
+min(k, relevant chunks), so a perfect ranking scores 1.0.
+
+Run: python benchmark_retrieval.py [--baseline old_results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import config
+from app.utils import VectorStore
+from app.ai.hashing_embeddings import HashingEmbeddings
+from app.metrics import percentile
+
+
+def load_corpus(store: VectorStore, chunks_file: str):
+    """Chunks and metadata from the real index, falling back to the extracted chunks file"""
+    store.load()
+    if store.loaded and store.chunks:
+        return list(store.chunks), list(store.metadata), str(config.vector_store_path)
+
+    if os.path.exists(chunks_file):
+        with open(chunks_file, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        return [c["content"] for c in chunks], chunks, chunks_file
+
+    return [], [], None
+
+
+def relevant_ids(chunks: List[str], keywords: List[str], min_hits: int) -> set:
+    needed = min(min_hits, len(keywords))
+    lowered = [k.lower() for k in keywords]
+    relevant = set()
+    for idx, chunk in enumerate(chunks):
+        text = chunk.lower()
+        if sum(1 for k in lowered if k in text) >= needed:
+            relevant.add(idx)
+    return relevant
+
+
+def evaluate_query(store: VectorStore, query: str, relevant: set, k_values: List[int], repeat: int) -> Dict[str, Any]:
+    max_k = max(k_values)
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = store.search(query, k=max_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    ranked = [r["index"] for r in results]
+    metrics = {}
+    for k in k_values:
+        hits = sum(1 for idx in ranked[:k] if idx in relevant)
+        metrics[f"recall@{k}"] = hits / min(k, len(relevant))
+
+    reciprocal_rank = 0.0
+    for rank, idx in enumerate(ranked, 1):
+        if idx in relevant:
+            reciprocal_rank = 1.0 / rank
+            break
+    metrics["mrr"] = reciprocal_rank
+    metrics["latencies_ms"] = latencies
+    return metrics
+
+
+def summarize(rows: List[Dict[str, Any]], k_values: List[int]) -> Dict[str, Any]:
+    latencies = sorted(l for row in rows for l in row["latencies_ms"])
+    summary = {"queries": len(rows)}
+    for k in k_values:
+        summary[f"recall@{k}"] = round(sum(r[f"recall@{k}"] for r in rows) / len(rows), 4)
+    summary["mrr"] = round(sum(r["mrr"] for r in rows) / len(rows), 4)
+    summary["latency_p50_ms"] = round(percentile(latencies, 50), 3)
+    summary["latency_p95_ms"] = round(percentile(latencies, 95), 3)
+    return summary
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline_file: str, tolerance: float) -> List[str]:
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)["overall"]
+    regressions = []
+    for key, value in current.items():
+        if key.startswith("recall@") or key == "mrr":
+            old = baseline.get(key)
+            if old is not None and value < old - tolerance:
+                regressions.append(f"{key}: {old:.4f} → {value:.4f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark")
+    parser.add_argument("--expected", default="expected_answers.json")
+    parser.add_argument("--chunks-file", default=str(config.data_dir / "extracted_chunks.json"))
+    parser.add_argument("--k", default="1,3,5,10", help="Comma-separated k values")
+    parser.add_argument("--min-hits", type=int, default=2, help="Expected keywords a relevant chunk must contain")
+    parser.add_argument("--dimension", type=int, default=384, help="Stand-in embedding dimension")
+    parser.add_argument("--repeat", type=int, default=5, help="Searches per query for latency percentiles")
+    parser.add_argument("--output", default="retrieval_benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results file; exit non-zero on regression")
+    parser.add_argument("--tolerance", type=float, default=0.02)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    k_values = sorted({int(k) for k in args.k.split(",") if k.strip()})
+
+    print("📏 OFFLINE RETRIEVAL BENCHMARK")
+    print("=" * 70)
+
+    with open(args.expected, "r") as f:
+        expected = json.load(f)["expected_responses"]
+
+    store = VectorStore(embeddings=HashingEmbeddings(args.dimension))
+    chunks, metadata, corpus_source = load_corpus(store, args.chunks_file)
+    if not chunks:
+        print("❌ No chunks found. Run ingestion first.")
+        sys.exit(1)
+
+    print(f"📚 Corpus: {len(chunks)} chunks from {corpus_source}")
+    build_start = time.perf_counter()
+    store.create_index(chunks, metadata, persist=False)
+    build_seconds = time.perf_counter() - build_start
+    print(f"🔧 Built stand-in index ({store.get_stats()['index_type']}, {len(store.shards)} shards, "
+          f"dim {args.dimension}) in {build_seconds:.2f}s")
+
+    per_query = []
+    skipped = []
+    for category, info in expected.items():
+        relevant = relevant_ids(store.chunks, info["expected_keywords"], args.min_hits)
+        if not relevant:
+            skipped.append(category)
+            print(f"   ⚠️  {category}: no chunk contains the expected keywords, skipped")
+            continue
+
+        row = evaluate_query(store, info["query"], relevant, k_values, args.repeat)
+        row.update({"category": category, "query": info["query"], "relevant_chunks": len(relevant)})
+        per_query.append(row)
+        print(f"   {category:12} recall@{k_values[-1]}={row[f'recall@{k_values[-1]}']:.2f} "
+              f"mrr={row['mrr']:.2f} relevant={len(relevant)}")
+
+    if not per_query:
+        print("❌ No judgeable queries.")
+        sys.exit(1)
+
+    categories = {}
+    for row in per_query:
+        categories.setdefault(row["category"], []).append(row)
+
+    overall = summarize(per_query, k_values)
+    result = {
+        "run": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "corpus_source": corpus_source,
+            "chunks": len(chunks),
+            "embedding_backend": f"hashing-{args.dimension}",
+            "index_type": store.get_stats()["index_type"],
+            "shards": len(store.shards),
+            "index_build_seconds": round(build_seconds, 3),
+            "k_values": k_values,
+            "min_keyword_hits": args.min_hits
+        },
+        "overall": overall,
+        "categories": {name: summarize(rows, k_values) for name, rows in categories.items()},
+        "skipped_categories": skipped,
+        "queries": [{k: v for k, v in row.items() if k != "latencies_ms"} for row in per_query]
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n{'=' * 70}")
+    print("📊 OVERALL")
+    for key, value in overall.items():
+        print(f"   {key}: {value}")
+    print(f"\n💾 Results saved to: {args.output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(overall, args.baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"   • {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
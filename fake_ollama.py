@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Fake Ollama server for load tests.
+
+Implements the parts of the Ollama API the app uses: /api/tags,
+/api/chat (streaming and non-streaming), /api/embeddings and /api/embed.
+Latency, token rate and answer length are configurable, so /chat can be
+load-tested without touching the real model.
+
+Run: python fake_ollama.py --port 11435 --latency-ms 50 --token-rate 25
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.ai.hashing_embeddings import HashingEmbeddings
+
+DEFAULT_MODELS = ["llama3.2:1b", "nomic-embed-text:latest", "all-minilm:latest"]
+
+
+class FakeOllamaSettings:
+    def __init__(self, latency_ms: float = 50, token_rate: float = 25, tokens: int = 40,
+                 load_ms: float = 0, dimension: int = 768, models=None):
+        self.latency_ms = latency_ms
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.load_ms = load_ms
+        self.models = models or DEFAULT_MODELS
+        self.embeddings = HashingEmbeddings(dimension)
+        self.loaded_models = set()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def make_handler(settings: FakeOllamaSettings):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _load_model(self, model: str) -> int:
+            """Simulated load_duration in ns; only the first call per model pays it"""
+            with settings.lock:
+                settings.requests += 1
+                cold = model not in settings.loaded_models
+                settings.loaded_models.add(model)
+            if cold and settings.load_ms:
+                time.sleep(settings.load_ms / 1000.0)
+                return int(settings.load_ms * 1e6)
+            return 0
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json({"models": [
+                    {"name": name, "model": name, "modified_at": _now(), "size": 0}
+                    for name in settings.models
+                ]})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            try:
+                payload = self._read_json()
+            except ValueError:
+                self._send_json({"error": "invalid JSON"}, 400)
+                return
+
+            model = payload.get("model", "")
+            if model not in settings.models:
+                self._send_json({"error": f"model '{model}' not found"}, 404)
+                return
+
+            if self.path == "/api/chat":
+                self._chat(payload, model)
+            elif self.path == "/api/embeddings":
+                load_ns = self._load_model(model)
+                time.sleep(settings.latency_ms / 1000.0)
+                self._send_json({"embedding": settings.embeddings.embed_query(payload.get("prompt", "")),
+                                 "load_duration": load_ns})
+            elif self.path == "/api/embed":
+                load_ns = self._load_model(model)
+                time.sleep(settings.latency_ms / 1000.0)
+                inputs = payload.get("input", "")
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                self._send_json({"model": model, "embeddings": settings.embeddings.embed_documents(inputs),
+                                 "load_duration": load_ns})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def _answer_tokens(self, messages):
+            question = messages[-1].get("content", "") if messages else ""
+            words = question.split()[-20:] or ["answer"]
+            return [f"{words[i % len(words)]} " for i in range(settings.tokens)]
+
+        def _chat(self, payload, model):
+            load_ns = self._load_model(model)
+            messages = payload.get("messages", [])
+
+            # An empty message list is a load request (used for warm-up)
+            if not messages:
+                self._send_json({"model": model, "created_at": _now(), "message": {"role": "assistant", "content": ""},
+                                 "done_reason": "load", "done": True, "load_duration": load_ns})
+                return
+
+            time.sleep(settings.latency_ms / 1000.0)
+            tokens = self._answer_tokens(messages)
+            delay = 1.0 / settings.token_rate if settings.token_rate > 0 else 0
+            start = time.time()
+
+            if payload.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for token in tokens:
+                    time.sleep(delay)
+                    line = {"model": model, "created_at": _now(),
+                            "message": {"role": "assistant", "content": token}, "done": False}
+                    self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                final = {"model": model, "created_at": _now(), "message": {"role": "assistant", "content": ""},
+                         "done": True, "total_duration": int((time.time() - start) * 1e9),
+                         "load_duration": load_ns, "eval_count": len(tokens)}
+                self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                return
+
+            time.sleep(delay * len(tokens))
+            self._send_json({"model": model, "created_at": _now(),
+                             "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                             "done": True, "total_duration": int((time.time() - start) * 1e9),
+                             "load_duration": load_ns, "eval_count": len(tokens)})
+
+    return Handler
+
+
+def make_server(host: str = "127.0.0.1", port: int = 11435, settings: FakeOllamaSettings = None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(settings or FakeOllamaSettings()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Fixed latency added to every call")
+    parser.add_argument("--token-rate", type=float, default=25, help="Generated tokens per second")
+    parser.add_argument("--tokens", type=int, default=40, help="Tokens per chat answer")
+    parser.add_argument("--load-ms", type=float, default=0, help="Simulated cold load on first use of a model")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated model names")
+    args = parser.parse_args()
+
+    settings = FakeOllamaSettings(
+        latency_ms=args.latency_ms,
+        token_rate=args.token_rate,
+        tokens=args.tokens,
+        load_ms=args.load_ms,
+        dimension=args.dimension,
+        models=[m.strip() for m in args.models.split(",") if m.strip()]
+    )
+    server = make_server(args.host, args.port, settings)
+    print(f"🦙 Fake Ollama listening on http://{args.host}:{args.port}")
+    print(f"   latency {args.latency_ms}ms, {args.token_rate} tokens/s, {args.tokens} tokens per answer")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
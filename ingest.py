@@ -2,6 +2,7 @@
 """
 Optimized PDF ingestion script for Library Support AI.
 """
+import argparse
 import os
 import PyPDF2
 import re
@@ -18,6 +19,11 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from app.config import config
     from app.utils import VectorStore
+    from app.shards import SHARDS_MANIFEST
+    from app.shared_state import publish_index_change
+    from app.pdf.dedup import deduplicate_chunks
+    from app.pdf.extract_cache import extract_cache
+    from app.collection_manager import CollectionManager, collection_version_key, DEFAULT_COLLECTION
     logger = logging.getLogger(__name__)
 except ImportError as e:
     print(f"Error importing config/utils: {e}")
@@ -40,15 +46,17 @@ def clean_text(text: str) -> str:
     text = re.sub(r'-\s+', '', text)  # Fix hyphenated words
     return text.strip()
 
-def extract_sections(text: str) -> dict:
-    """Extract sections from library document"""
+def extract_sections(text: str, line_pages: list = None) -> dict:
+    """Extract sections from library document as {title: [(page, line), ...]}"""
     sections = {}
     current_section = "Introduction"
     current_content = []
     
     lines = text.split('\n')
+    if line_pages is None:
+        line_pages = [None] * len(lines)
     
-    for line in lines:
+    for line, page in zip(lines, line_pages):
         line = line.strip()
         if not line:
             continue
@@ -57,28 +65,36 @@ def extract_sections(text: str) -> dict:
         if re.match(r'^SECTION\s+\d+:', line, re.IGNORECASE):
             # Save previous section
             if current_content:
-                sections[current_section] = ' '.join(current_content)
+                sections[current_section] = current_content
             
             # Start new section
             current_section = line
             current_content = []
         else:
-            current_content.append(line)
+            current_content.append((page, line))
     
     # Save the last section
     if current_content:
-        sections[current_section] = ' '.join(current_content)
+        sections[current_section] = current_content
     
     return sections
 
-def create_chunks(text: str, source: str) -> list:
-    """Create chunks from text"""
+def _word_pages(section_lines: list) -> list:
+    """Page number of every word of a section, in order"""
+    pages = []
+    for page, line in section_lines:
+        pages.extend([page] * len(line.split()))
+    return pages
+
+def create_chunks(text: str, source: str, line_pages: list = None) -> list:
+    """Create chunks from text; line_pages gives the page number of each line, recorded per chunk"""
     chunks = []
     
     # Extract sections
-    sections = extract_sections(text)
+    sections = extract_sections(text, line_pages)
     
-    for section_title, section_content in sections.items():
+    for section_title, section_lines in sections.items():
+        section_content = ' '.join(line for _, line in section_lines)
         if not section_content:
             continue
             
@@ -91,9 +107,12 @@ def create_chunks(text: str, source: str) -> list:
                 'section': section_title,
                 'chunk_id': chunk_id
             })
+            if line_pages is not None:
+                chunks[-1]['page'] = section_lines[0][0]
         else:
-            # Split long sections
+            # Split long sections; a chunk is on the page its first word is on
             words = section_content.split()
+            word_pages = _word_pages(section_lines) if line_pages is not None else None
             for i in range(0, len(words), config.chunk_size - config.chunk_overlap):
                 chunk_words = words[i:i + config.chunk_size]
                 if not chunk_words:
@@ -108,76 +127,140 @@ def create_chunks(text: str, source: str) -> list:
                     'section': section_title,
                     'chunk_id': chunk_id
                 })
+                if word_pages is not None:
+                    chunks[-1]['page'] = word_pages[i]
     
     return chunks
 
-def main():
+# Part of the extraction cache key: bump when extraction or clean_text changes
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}/clean-1"
+
+def extract_pages(file_path: Path) -> list:
+    """Cleaned text of every page (empty string for pages without text)"""
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [clean_text(page.extract_text() or "") for page in reader.pages]
+
+def extract_pdf_chunks(file_path: Path, source: str) -> list:
+    """Extract and chunk one PDF (also used for incremental ingestion)"""
+    pages = extract_cache.pages(file_path, EXTRACTOR_VERSION, extract_pages)
+    full_text = "".join(page + "\n\n" for page in pages if page)
+    
+    if not full_text.strip():
+        return []
+    # Each page ends with a blank line, so it spans its own lines plus two; page filters need these numbers
+    line_pages = []
+    for number, page in enumerate(pages, 1):
+        if page:
+            line_pages.extend([number] * (page.count('\n') + 2))
+    return create_chunks(full_text, source, line_pages)
+
+def swap_in(vector_store: VectorStore, store_path: Path):
+    """
+    Save a freshly built index next to store_path and move it into place under
+    the write lock, so readers and incremental ingests never see a half-written
+    or missing index
+    """
+    building = store_path.with_name(store_path.name + ".building")
+    retired = store_path.with_name(store_path.name + ".old")
+    with vector_store.exclusive_update(reload=False):
+        for leftover in (building, retired):
+            shutil.rmtree(leftover, ignore_errors=True)
+        vector_store.path = building
+        vector_store.save()
+        if not (building / SHARDS_MANIFEST).exists():
+            raise RuntimeError(f"Could not write the new index to {building}")
+        if store_path.exists():
+            os.rename(store_path, retired)
+        os.rename(building, store_path)
+        vector_store.path = store_path
+        # save() announced the version before the move; announce again so workers load the new files
+        vector_store.shared_version = publish_index_change(vector_store.version_key)
+    shutil.rmtree(retired, ignore_errors=True)
+
+def main(collection: str = DEFAULT_COLLECTION):
+    # A named collection reads pdfs/<name>/ and gets its own index directory
+    if collection == DEFAULT_COLLECTION:
+        pdfs_dir = config.pdfs_dir
+        store_path = config.vector_store_path
+    else:
+        pdfs_dir = config.pdfs_dir / collection
+        store_path = config.collections_dir / collection
+
     print("=" * 50)
     print("📚 Library AI Ingestion")
     print(f"⚡ Using embedding model: {config.embedding_model}")
-    print(f"📁 PDFs directory: {config.pdfs_dir}")
-    print(f"💾 Vector store: {config.vector_store_path}")
+    print(f"🗂️  Collection: {collection}")
+    print(f"📁 PDFs directory: {pdfs_dir}")
+    print(f"💾 Vector store: {store_path}")
     print("=" * 50)
 
-    # 1. Clean old data
-    if config.vector_store_path.exists():
-        print("🗑️  Cleaning old vector store...")
-        shutil.rmtree(config.vector_store_path)
-    config.vector_store_path.mkdir(parents=True, exist_ok=True)
-
-    # 2. Check PDFs
-    if not config.pdfs_dir.exists():
-        print("❌ No 'pdfs' directory found.")
+    # 1. Check PDFs (the old index keeps serving until the new one is swapped in)
+    if not pdfs_dir.exists():
+        print(f"❌ No '{pdfs_dir}' directory found.")
         return
         
-    pdf_files = [f for f in os.listdir(config.pdfs_dir) if f.lower().endswith('.pdf')]
+    pdf_files = [f for f in os.listdir(pdfs_dir) if f.lower().endswith('.pdf')]
     if not pdf_files:
         print("❌ No PDFs found.")
         return
 
     all_chunks = []
 
-    # 3. Process Files
+    # 2. Process Files
     for filename in pdf_files:
         print(f"📄 Processing: {filename}")
         try:
-            file_path = config.pdfs_dir / filename
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                full_text = ""
-                
-                for page_num, page in enumerate(reader.pages, 1):
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += clean_text(page_text) + "\n\n"
-                
-                if not full_text.strip():
-                    print(f"   ⚠️  No text extracted from {filename}")
-                    continue
-                
-                chunks = create_chunks(full_text, filename)
-                all_chunks.extend(chunks)
-                print(f"   ✅ Created {len(chunks)} chunks")
+            chunks = extract_pdf_chunks(pdfs_dir / filename, filename)
+            if not chunks:
+                print(f"   ⚠️  No text extracted from {filename}")
+                continue
+            
+            all_chunks.extend(chunks)
+            print(f"   ✅ Created {len(chunks)} chunks")
                 
         except Exception as e:
             print(f"   ❌ Failed: {e}")
 
+    cache_report = extract_cache.report()
+    if cache_report["enabled"]:
+        print(f"📦 Extraction cache: {cache_report['files_hit']}/{len(pdf_files)} files reused "
+              f"({cache_report['pages_reused']} pages, ~{cache_report['seconds_saved']}s saved), "
+              f"{cache_report['pages_extracted']} pages extracted")
+
+    # 3. Drop near-duplicate chunks
+    dedup_report = None
+    if all_chunks and config.dedup_enabled:
+        all_chunks, dedup_report = deduplicate_chunks(all_chunks)
+        print(f"🧹 Deduplicated: {dedup_report['input_chunks']} → {dedup_report['kept_chunks']} chunks "
+              f"({dedup_report['vectors_saved']} vectors saved)")
+
     # 4. Create vector store
     if all_chunks:
         try:
             print(f"🤖 Creating embeddings for {len(all_chunks)} chunks...")
             
             # Initialize vector store
-            vector_store = VectorStore()
+            vector_store = VectorStore(path=store_path, version_key=collection_version_key(collection))
             
             # Extract content for embedding
             chunk_contents = [c['content'] for c in all_chunks]
             
-            # Create index
-            vector_store.create_index(chunk_contents, all_chunks)
+            # Embed outside the lock; only the swap blocks other writers
+            vector_store.create_index(chunk_contents, all_chunks, persist=False)
+            print("🔁 Replacing the old vector store...")
+            swap_in(vector_store, store_path)
             
             print("🎉 Ingestion Complete!")
             print(f"   Total chunks: {len(all_chunks)}")
+            if dedup_report:
+                print(f"   Near-duplicates merged: {dedup_report['vectors_saved']} vectors saved")
+            if cache_report["enabled"]:
+                print(f"   Extraction cache hit rate: {cache_report['hit_rate']:.0%}")
+            if vector_store.reducer:
+                reduction = vector_store.reducer.describe()
+                print(f"   Dimension reduction: {reduction['method']} {reduction['input_dim']}-d → "
+                      f"{reduction['output_dim']}-d, retains recall@10 {reduction['retained_recall@10']:.3f}")
             print(f"   Embedding model used: {config.embedding_model}")
             
             # Count MyLOFT mentions
@@ -202,4 +285,8 @@ def main():
         print("❌ No chunks created. Check PDF extraction.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the vector index from PDFs")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION,
+                        help="Named collection to build from pdfs/<name>/ (default: the main index)")
+    args = parser.parse_args()
+    main(CollectionManager.resolve(args.collection))
@@ -128,6 +128,17 @@ def main():
         print("\n✗ No content extracted.")
         return
     
+    # Drop near-duplicate chunks (repeated headers, duplicated policy text)
+    try:
+        from app.config import config
+        from app.pdf.dedup import deduplicate_chunks
+        if config.dedup_enabled:
+            all_chunks, dedup_report = deduplicate_chunks(all_chunks)
+            print(f"\n🧹 Deduplicated: {dedup_report['input_chunks']} → {dedup_report['kept_chunks']} chunks "
+                  f"({dedup_report['vectors_saved']} vectors saved)")
+    except ImportError as e:
+        print(f"\n⚠️  Skipping deduplication: {e}")
+    
     print(f"\n✅ EXTRACTION COMPLETE")
     print(f"   Total chunks: {len(all_chunks)}")
     
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Load generator for the /chat endpoint.
+
+Sends questions from expected_answers.json at a fixed target rate (open
+loop, so a slow server does not slow the arrivals) and reports
+throughput, latency percentiles, error rates and the app's event-loop lag
+from /metrics.
+
+Against a running app:
+    python fake_ollama.py --port 11435 &
+    python load_test.py --url http://localhost:8000 --rps 5 --duration 30
+
+Or let the script start the fake Ollama and the app itself:
+    python load_test.py --spawn --rps 5 --duration 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.metrics import percentile
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_questions(path: str):
+    try:
+        with open(path, "r") as f:
+            return [info["query"] for info in json.load(f)["expected_responses"].values()]
+    except Exception:
+        return ["What are the library opening hours?", "How do I access past exam papers?"]
+
+
+def fetch_metrics(url: str):
+    try:
+        return requests.get(f"{url}/metrics", timeout=5).json()
+    except Exception:
+        return {}
+
+
+def spawn_stack(app_port: int, ollama_port: int, latency_ms: float, token_rate: float):
+    """Start the fake Ollama in-process and the app in a subprocess pointed at it"""
+    from app.config import config
+    from fake_ollama import FakeOllamaSettings, make_server
+
+    fake = make_server("127.0.0.1", ollama_port, FakeOllamaSettings(
+        latency_ms=latency_ms,
+        token_rate=token_rate,
+        models=[config.chat_model, config.embedding_model]
+    ))
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+
+    test_config = json.loads(json.dumps(config.config))
+    test_config["ollama"]["base_url"] = f"http://127.0.0.1:{ollama_port}"
+    config_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump(test_config, config_file)
+    config_file.close()
+
+    env = dict(os.environ, LIBRARY_AI_CONFIG=config_file.name)
+    app_process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=env
+    )
+
+    url = f"http://127.0.0.1:{app_port}"
+    for _ in range(120):
+        try:
+            if requests.get(f"{url}/test", timeout=1).status_code == 200:
+                break
+        except Exception:
+            pass
+        time.sleep(0.5)
+    else:
+        app_process.terminate()
+        raise RuntimeError("App did not start within 60 seconds")
+
+    def shutdown():
+        app_process.terminate()
+        try:
+            app_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app_process.kill()
+        fake.shutdown()
+        os.unlink(config_file.name)
+
+    return url, shutdown
+
+
+def run_load(url: str, questions, rps: float, duration: float, concurrency: int, unique: bool, timeout: float):
+    total = int(rps * duration)
+    results = []
+    results_lock = threading.Lock()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def send(i: int, scheduled: float):
+        question = questions[i % len(questions)]
+        if unique:
+            question = f"{question} (#{i})"
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/chat", json={"message": question}, timeout=timeout)
+            outcome = str(response.status_code)
+            if response.status_code == 200 and "error" in response.json():
+                outcome = "200-error"
+        except requests.exceptions.Timeout:
+            outcome = "timeout"
+        except Exception as e:
+            outcome = type(e).__name__
+        end = time.perf_counter()
+        with results_lock:
+            results.append({
+                "outcome": outcome,
+                "latency_ms": (end - start) * 1000,
+                # Time the request waited for a free client thread
+                "client_delay_ms": (start - scheduled) * 1000
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, scheduled)
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(results, elapsed: float, before: dict, after: dict, rps: float):
+    latencies = sorted(r["latency_ms"] for r in results)
+    outcomes = Counter(r["outcome"] for r in results)
+    ok = outcomes.get("200", 0)
+    client_delay = sorted(r["client_delay_ms"] for r in results)
+
+    summary = {
+        "target_rps": rps,
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0,
+        "success_rps": round(ok / elapsed, 2) if elapsed else 0,
+        "error_rate": round(1 - ok / len(results), 4) if results else 0,
+        "outcomes": dict(outcomes),
+        "latency_ms": {
+            f"p{p}": round(percentile(latencies, p), 1) for p in (50, 90, 95, 99)
+        },
+        "client_delay_p95_ms": round(percentile(client_delay, 95), 1)
+    }
+    if latencies:
+        summary["latency_ms"]["max"] = round(latencies[-1], 1)
+
+    lag = after.get("timings", {}).get("event_loop_lag")
+    if lag:
+        summary["event_loop_lag_ms"] = {k: lag[k] for k in ("p50_ms", "p95_ms", "max_ms")}
+
+    counters_before = before.get("counters", {})
+    summary["server_counters"] = {
+        name: value - counters_before.get(name, 0)
+        for name, value in after.get("counters", {}).items()
+        if value - counters_before.get(name, 0)
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat endpoint")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max outstanding requests")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--unique", action="store_true", help="Make every question unique (defeats coalescing)")
+    parser.add_argument("--questions", default="expected_answers.json")
+    parser.add_argument("--output", help="Write the summary JSON here")
+    parser.add_argument("--spawn", action="store_true", help="Start the fake Ollama and the app locally")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--ollama-latency-ms", type=float, default=50)
+    parser.add_argument("--ollama-token-rate", type=float, default=25)
+    args = parser.parse_args()
+
+    shutdown = None
+    url = args.url.rstrip("/")
+    if args.spawn:
+        print("🚀 Starting fake Ollama and app...")
+        url, shutdown = spawn_stack(args.app_port, args.ollama_port, args.ollama_latency_ms, args.ollama_token_rate)
+
+    try:
+        questions = load_questions(args.questions)
+        print(f"🔥 Load test: {args.rps} rps for {args.duration}s against {url}/chat")
+        before = fetch_metrics(url)
+        results, elapsed = run_load(url, questions, args.rps, args.duration, args.concurrency,
+                                    args.unique, args.timeout)
+        after = fetch_metrics(url)
+    finally:
+        if shutdown:
+            shutdown()
+
+    summary = report(results, elapsed, before, after, args.rps)
+    print("=" * 60)
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Summary saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
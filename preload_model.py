@@ -1,33 +1,30 @@
 #!/usr/bin/env python3
 """
-Pre-load model to avoid cold starts
+Pre-load the configured chat and embedding models to avoid cold starts.
+
+The app warms these models itself at startup (see app/ai/warmup.py); this
+script is for warming them by hand, e.g. after restarting Ollama.
 """
-import requests
-import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import config
+from app.ai.warmup import ModelWarmer
+
+print("Pre-loading Ollama models...")
+print(f"   Chat model: {config.chat_model}")
+print(f"   Embedding model: {config.embedding_model}")
+print(f"   keep_alive: {config.ollama_keep_alive}s")
 
-print("Pre-loading Ollama model...")
+result = ModelWarmer().warm_up()
 
-# Warm up the model with a simple request
-try:
-    start = time.time()
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": "phi",
-            "prompt": "ping",
-            "stream": False,
-            "options": {"num_predict": 10}
-        },
-        timeout=30
-    )
-    elapsed = time.time() - start
-    
-    if response.status_code == 200:
-        print(f"✅ Model loaded in {elapsed:.2f}s")
-        print(f"   First response: {response.json()['response']}")
+for kind in ("chat", "embedding"):
+    info = result[kind]
+    if info.get("ok"):
+        state = "cold load" if info["cold"] else "already resident"
+        print(f"✅ {kind.capitalize()} model '{info['model']}' ready in {info['elapsed_seconds']:.2f}s ({state})")
     else:
-        print(f"❌ Error: {response.status_code}")
-        
-except Exception as e:
-    print(f"❌ Failed to pre-load: {e}")
-    print("Make sure Ollama is running: ollama serve")
+        print(f"❌ {kind.capitalize()} model '{info['model']}' failed: {info.get('error')}")
+        print("Make sure Ollama is running: ollama serve")
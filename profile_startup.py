@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Per-module import cost of a cold start.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters (the
+default is app.main, which is what uvicorn and every worker import). It then
+reports the slowest modules by cumulative time, the self time summed per
+top-level package, and whether any dependency that should load lazily was
+imported at startup.
+
+Run: python profile_startup.py [--module app.main] [--runs 3] [--top 25] [--output file.json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# Loaded on first use (see app/lazy_imports.py); importing one at startup is a regression
+DEFERRED_MODULES = ("faiss", "numpy", "requests", "psutil", "jinja2", "uvicorn",
+                    "langchain_ollama", "langchain_community")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of -X importtime output (microseconds), in the order Python printed them"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": len(match.group(3)) // 2
+            })
+    return rows
+
+
+def profile_import(module: str = "app.main") -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and collect its import-time profile"""
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps(sorted(m for m in {list(DEFERRED_MODULES)!r} if m in sys.modules)))")
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    target = next((r for r in rows if r["module"] == module and r["depth"] == 0), None)
+    return {
+        "module": module,
+        "total_ms": target["cumulative_us"] / 1000 if target else sum(r["self_us"] for r in rows) / 1000,
+        "rows": rows,
+        "deferred_loaded": json.loads(result.stdout.strip().splitlines()[-1])
+    }
+
+
+def measure_import(module: str = "app.main", runs: int = 3) -> Dict[str, Any]:
+    """Median of several cold imports; the profile kept is the median run's"""
+    profiles = sorted((profile_import(module) for _ in range(max(1, runs))), key=lambda p: p["total_ms"])
+    median = profiles[len(profiles) // 2]
+    median["runs_ms"] = [round(p["total_ms"], 1) for p in profiles]
+    return median
+
+
+def by_package(rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Self time per top-level package, in ms"""
+    totals: Dict[str, float] = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + row["self_us"] / 1000
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    from app.config import config
+
+    parser = argparse.ArgumentParser(description="Startup import profile")
+    parser.add_argument("--module", default="app.main", help="Module to import cold")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to run (median is reported)")
+    parser.add_argument("--top", type=int, default=25, help="Rows in the slowest-module table")
+    parser.add_argument("--output", help="Optional JSON report path")
+    args = parser.parse_args()
+
+    print(f"⏱️  STARTUP IMPORT PROFILE: import {args.module}")
+    print("=" * 70)
+    profile = measure_import(args.module, args.runs)
+    rows = profile["rows"]
+    budget = config.import_budget_ms
+
+    print(f"\n{'cumulative ms':>13} {'self ms':>9}  module")
+    for row in sorted(rows, key=lambda r: r["cumulative_us"], reverse=True)[:args.top]:
+        print(f"{row['cumulative_us'] / 1000:>13.1f} {row['self_us'] / 1000:>9.1f}  {'  ' * row['depth']}{row['module']}")
+
+    packages = by_package(rows)
+    print(f"\n{'self ms':>9}  package")
+    for package, ms in list(packages.items())[:15]:
+        print(f"{ms:>9.1f}  {package}")
+
+    print(f"\n📦 {len(rows)} modules imported")
+    print(f"⏱️  import {args.module}: {profile['total_ms']:.0f} ms (median of {profile['runs_ms']}), "
+          f"budget {budget} ms {'✅' if profile['total_ms'] <= budget else '❌'}")
+    if profile["deferred_loaded"]:
+        print(f"⚠️  Imported at startup although they should load lazily: {', '.join(profile['deferred_loaded'])}")
+    else:
+        print("✅ No deferred dependency was imported at startup")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "run": {"timestamp": datetime.now(timezone.utc).isoformat(), "module": args.module,
+                        "runs_ms": profile["runs_ms"], "budget_ms": budget},
+                "total_ms": round(profile["total_ms"], 1),
+                "deferred_loaded": profile["deferred_loaded"],
+                "packages_ms": {k: round(v, 2) for k, v in packages.items()},
+                "modules": rows
+            }, f, indent=2)
+        print(f"💾 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
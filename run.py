@@ -1,21 +1,40 @@
 import sys
 import os
+import argparse
 
 # Add the app directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Now import and run
-from app.main import app
+from app.config import config
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Library Support AI server")
+    parser.add_argument("--host", default=config.server_host)
+    parser.add_argument("--port", type=int, default=config.server_port)
+    parser.add_argument("--workers", type=int, default=config.server_workers,
+                        help="Worker processes sharing the port (disables auto-reload when > 1)")
+    parser.add_argument("--no-reload", action="store_true", help="Disable auto-reload in single-worker mode")
+    args = parser.parse_args()
+
+    # Workers are separate processes that read their settings from the environment
+    os.environ["LIBRARY_AI_WORKERS"] = str(args.workers)
+
+    # Now import and run
+    from app.main import app
+
     import uvicorn
     print("🚀 Starting Library Support AI Server...")
     print("📂 PDFs directory:", os.path.join(os.getcwd(), "pdfs"))
     print("🗄️  Data directory:", os.path.join(os.getcwd(), "data"))
-    print("🌐 Web interface: http://localhost:8000")
+    print(f"🌐 Web interface: http://localhost:{args.port}")
+    if args.workers > 1:
+        print(f"👥 Workers: {args.workers} (shared state in {config.shared_state_path})")
     print("\n📊 Registered endpoints:")
     for route in app.routes:
         methods = ', '.join(route.methods) if hasattr(route, 'methods') else 'GET'
         print(f"  {methods:15} {route.path}")
-    
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+
+    if args.workers > 1:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=not args.no_reload)
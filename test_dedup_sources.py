@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Regression check for ingest-time dedup across PDFs: a paragraph two PDFs
+share must stay indexed under both, so deleting one PDF leaves the other's
+copy searchable with a source filter. Near-duplicates inside one PDF are
+still merged.
+
+Run: python test_dedup_sources.py   (or under pytest)
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.ai.hashing_embeddings import HashingEmbeddings
+from app.filters import parse_filters
+from app.pdf.dedup import deduplicate_chunks
+from app.utils import VectorStore
+
+SHARED = ("Books on short loan may be borrowed for four hours and renewed once "
+          "at the circulation desk if nobody else has requested them.")
+
+
+def test_dedup_sources():
+    chunks = [
+        {"content": SHARED, "source": "A.pdf"},
+        {"content": "The reading room on level two is reserved for silent study.", "source": "A.pdf"},
+        {"content": SHARED, "source": "B.pdf"},
+        {"content": SHARED + " Ask staff for help.", "source": "B.pdf"},
+    ]
+    kept, report = deduplicate_chunks(chunks, threshold=0.5)
+    assert report["vectors_saved"] == 1, "Only the near-duplicate inside B.pdf should merge"
+    assert sorted(c["source"] for c in kept if SHARED in c["content"]) == ["A.pdf", "B.pdf"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(embeddings=HashingEmbeddings(128), path=Path(tmp),
+                            version_key="index_version:test_dedup_sources")
+        with store.exclusive_update(reload=False):
+            store.create_index([c["content"] for c in kept], kept)
+            assert store.remove_source("A.pdf") == 2
+
+        results = store.search(SHARED, k=3, filters=parse_filters({"source": "B.pdf"}))
+        assert results and SHARED in results[0]["content"], \
+            "B.pdf lost the paragraph it shares with the deleted A.pdf"
+        assert not store.search(SHARED, k=3, filters=parse_filters({"source": "A.pdf"}))
+
+
+if __name__ == "__main__":
+    print("🧪 Testing dedup across PDFs")
+    print("=" * 50)
+    try:
+        test_dedup_sources()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ Shared paragraph survives deleting one of the PDFs")
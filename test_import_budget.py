@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Regression check for process startup: a cold `import app.main` must not
+import the dependencies that load on first use (faiss, numpy, requests,
+psutil, jinja2, uvicorn, langchain). The check compares module sets, not
+milliseconds, so it does not flake on a busy machine; run as a script it
+also reports the import time against server.import_budget_ms.
+
+Run: python test_import_budget.py   (or under pytest)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import config
+from profile_startup import measure_import, profile_import, by_package
+
+
+def test_import_budget():
+    profile = profile_import("app.main")
+    assert not profile["deferred_loaded"], \
+        f"Imported at startup instead of on first use: {', '.join(profile['deferred_loaded'])}"
+
+
+def report():
+    """Timing against the budget, for a human reading the output"""
+    profile = measure_import("app.main", runs=3)
+    slowest = ", ".join(f"{name} {ms:.0f} ms" for name, ms in list(by_package(profile["rows"]).items())[:5])
+    within = profile["total_ms"] <= config.import_budget_ms
+    print(f"{'✅' if within else '⚠️ '} import app.main: {profile['total_ms']:.0f} ms (runs {profile['runs_ms']}), "
+          f"budget {config.import_budget_ms} ms")
+    if not within:
+        print(f"   Slowest packages: {slowest}")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing startup imports")
+    print("=" * 50)
+    try:
+        test_import_budget()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        print("💡 Run: python profile_startup.py")
+        sys.exit(1)
+    print("✅ No deferred dependency is imported by app.main")
+    report()
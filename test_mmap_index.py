@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Regression check for vector_store.mmap_index: loading a shard must map its
+index file instead of copying it, so workers share the pages. The resident
+set may grow by a small fraction of the file size, never by the whole file.
+Writes to a mapped shard must go to a private copy and leave the file intact.
+
+Run: python test_mmap_index.py   (or under pytest)
+"""
+import sys
+import os
+import gc
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import psutil
+
+from app.config import config
+from app.quantization import build_index
+from app.shards import Shard, read_shard, shard_files, write_shard
+
+VECTORS = 120000
+DIMENSION = 128
+# Fraction of the file size a load may add to RSS before it counts as a copy
+MAX_RSS_SHARE = 0.25
+
+
+def measure():
+    """Map a freshly written shard; returns (shard, probe vector, file bytes, RSS growth)"""
+    mmap_index = config.config["vector_store"].get("mmap_index")
+    config.config["vector_store"]["mmap_index"] = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            vectors = np.random.default_rng(0).random((VECTORS, DIMENSION), dtype=np.float32)
+            chunks = [f"chunk {i}" for i in range(VECTORS)]
+            metadata = [{"source": "bulk.pdf"}] * VECTORS
+            write_shard(directory, Shard("bulk", build_index(vectors, "flat"), chunks, metadata))
+            probe = vectors[:1].copy()
+            del vectors
+            gc.collect()
+
+            file_bytes = shard_files(directory, "bulk")["index"].stat().st_size
+            process = psutil.Process()
+            before = process.memory_info().rss
+            shard = read_shard(directory, "bulk")
+            grown = process.memory_info().rss - before
+            # The mapping stays valid after the directory is removed
+            return shard, probe, file_bytes, grown
+    finally:
+        config.config["vector_store"]["mmap_index"] = mmap_index
+
+
+def test_mmap_index():
+    shard, probe, file_bytes, grown = measure()
+    assert shard.mmapped, "Shard was read into memory instead of mapped"
+    assert grown < file_bytes * MAX_RSS_SHARE, \
+        (f"Loading a {file_bytes / 1e6:.1f} MB index grew RSS by {grown / 1e6:.1f} MB; "
+         f"the index is being copied, not mapped")
+
+    # Writers get a private copy; the mapped shard keeps serving searches
+    added = shard.with_added(probe, ["extra"], [{"source": "extra.pdf"}])
+    trimmed = shard.without([0, 1])
+    assert len(added) == added.index.ntotal == VECTORS + 1
+    assert len(trimmed) == trimmed.index.ntotal == VECTORS - 2
+    assert shard.index.ntotal == VECTORS
+    assert shard.search(probe, 1, 0)[0][1] == 0
+
+
+def report():
+    """RSS growth against the file size, for a human reading the output"""
+    _, _, file_bytes, grown = measure()
+    print(f"✅ {file_bytes / 1e6:.1f} MB index mapped, RSS grew by {grown / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing memory-mapped index loading")
+    print("=" * 50)
+    try:
+        test_mmap_index()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    report()
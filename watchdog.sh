@@ -1,13 +1,14 @@
 #!/bin/bash
 # Updated watchdog.sh with Heartbeat
-API_URL="http://localhost:8000/health"
+# Liveness only: /health/ready is 503 while the index loads, which is not a reason to restart
+API_URL="http://localhost:8000/health/live"
 SERVICE_NAME="library-ai"
 LOG_FILE="/home/repository/library-support-ai/watchdog.log"
 
 # Add a heartbeat timestamp
 echo "$(date): Heartbeat - Checking service status..." >> $LOG_FILE
 
-STATUS=$(curl -s -o /dev/null -w "%{http_code}" $API_URL)
+STATUS=$(curl -s --max-time 5 -o /dev/null -w "%{http_code}" $API_URL)
 
 if [ $STATUS -ne 200 ]; then
     echo "$(date): ALERT - Service is DOWN ($STATUS). Restarting..." >> $LOG_FILE